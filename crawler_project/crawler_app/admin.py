@@ -1,5 +1,5 @@
 from django.contrib import admin, messages
-from .models import CrawlResult, DeleteRequest, CrawlLog
+from .models import CrawlResult, DeleteRequest, CrawlLog, CrawlJob, CachedPage, CrawlStat
 from .crawler_tools import delete_url, delete_domain, delete_all, delete_404
 
 
@@ -10,7 +10,7 @@ class CrawlResultAdmin(admin.ModelAdmin):
     search_fields = ("url", "title", "description")
 
 
-    readonly_fields = ("crawled_at", "headings", "paragraphs", "link_count", "status_code")
+    readonly_fields = ("crawled_at", "headings", "paragraphs", "link_count", "status_code", "page")
 
     actions = ["delete_selected_results", "delete_by_url", "delete_by_user", "delete_404_entries"]
 
@@ -74,3 +74,25 @@ class CrawlLogAdmin(admin.ModelAdmin):
     list_display = ("user", "message", "created_at")
     list_filter = ("user",)
     search_fields = ("message", "user__username")
+
+
+@admin.register(CrawlJob)
+class CrawlJobAdmin(admin.ModelAdmin):
+    list_display = ("user", "start_url", "status", "pages_done", "error_count", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("start_url", "user__username")
+
+
+@admin.register(CachedPage)
+class CachedPageAdmin(admin.ModelAdmin):
+    list_display = ("url", "title", "status_code", "link_count", "fetched_at")
+    list_filter = ("status_code",)
+    search_fields = ("url", "title", "description")
+    readonly_fields = ("fetched_at", "headings", "paragraphs", "links")
+
+
+@admin.register(CrawlStat)
+class CrawlStatAdmin(admin.ModelAdmin):
+    list_display = ("user", "dimension", "key", "count", "last_crawled_at")
+    list_filter = ("dimension",)
+    search_fields = ("key", "user__username")
@@ -0,0 +1,143 @@
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
+
+from .models import CrawlLog, CrawlResult, UserDataVersion
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+# Feld -> DB-Spalten; Inhaltsfelder kommen bei Verweisen aus dem Seiten-Cache (wie CrawlResult.content)
+RESULT_FIELDS = {
+    "id": ("id",),
+    "url": ("url",),
+    "title": ("title",),
+    "status_code": ("status_code",),
+    "link_count": ("link_count",),
+    "crawled_at": ("crawled_at",),
+    "description": ("description", "page_id", "page__description"),
+    "headings": ("headings", "page_id", "page__headings"),
+    "paragraphs": ("paragraphs", "page_id", "page__paragraphs"),
+}
+# headings/paragraphs nur auf Anfrage (?fields=...)
+DEFAULT_RESULT_FIELDS = ("id", "url", "title", "description", "status_code", "link_count", "crawled_at")
+LOG_FIELDS = {"id": ("id",), "message": ("message",), "created_at": ("created_at",)}
+
+
+class APIError(Exception):
+    pass
+
+
+def api_login_required(view):
+    """Wie login_required, aber mit 401-JSON statt Weiterleitung zur Login-Seite."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Anmeldung erforderlich"}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+    return wrapper
+
+
+def _data_version(request, kind):
+    """(Version, Zeitpunkt) des Benutzers; pro Request nur eine Abfrage."""
+    cached = getattr(request, "_data_version", None)
+    if cached is None:
+        cached = request._data_version = (
+            UserDataVersion.objects.filter(user_id=request.user.id).values().first() or {}
+        )
+    return cached.get(f"{kind}_version", 0), cached.get(f"{kind}_changed_at")
+
+
+def _etag(kind):
+    def etag(request, *args, **kwargs):
+        version, _ = _data_version(request, kind)
+        query = hashlib.md5(
+            "&".join(sorted(request.GET.urlencode().split("&"))).encode(), usedforsecurity=False
+        ).hexdigest()[:12]
+        return f"{kind}-{request.user.id}-{version}-{query}"
+    return etag
+
+
+def _last_modified(kind):
+    def last_modified(request, *args, **kwargs):
+        return _data_version(request, kind)[1]
+    return last_modified
+
+
+def _params(request, fields, default_fields):
+    try:
+        limit = min(max(int(request.GET.get("limit", API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+        cursor = int(request.GET["cursor"]) if request.GET.get("cursor") else None
+    except ValueError:
+        raise APIError("limit und cursor müssen Ganzzahlen sein")
+    selected = [name for name in request.GET.get("fields", "").split(",") if name] or list(default_fields)
+    unknown = [name for name in selected if name not in fields]
+    if unknown:
+        raise APIError(f"Unbekannte Felder: {', '.join(unknown)} (erlaubt: {', '.join(fields)})")
+    return limit, cursor, selected
+
+
+def _page(request, qs, fields, default_fields, serialize):
+    """Keyset-Seite (neueste zuerst): id < cursor statt OFFSET, damit jede Seite gleich günstig bleibt."""
+    limit, cursor, selected = _params(request, fields, default_fields)
+    if cursor is not None:
+        qs = qs.filter(id__lt=cursor)
+    columns = {"id"} | {column for name in selected for column in fields[name]}
+    rows = list(qs.order_by("-id").values(*columns)[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_url = None
+    if more:
+        query = request.GET.copy()
+        query["cursor"] = rows[-1]["id"]
+        next_url = f"{request.path}?{query.urlencode()}"
+    response = JsonResponse({"results": [serialize(row, selected) for row in rows], "next": next_url})
+    # Clients sollen jedes Mal revalidieren; 304 kostet nur die Versionsabfrage
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _serialize_result(row, selected):
+    item = {}
+    for name in selected:
+        value = row[name]
+        if name in ("description", "headings", "paragraphs") and row["page_id"]:
+            value = row[f"page__{name}"] or value
+        item[name] = value.isoformat() if name == "crawled_at" else value
+    return item
+
+
+def _serialize_log(row, selected):
+    return {name: row[name].isoformat() if name == "created_at" else row[name] for name in selected}
+
+
+# ✅ Ergebnisse als JSON: ?fields=url,title&status=200&host=example.com&limit=100&cursor=<id>
+@require_GET
+@api_login_required
+@condition(etag_func=_etag("results"), last_modified_func=_last_modified("results"))
+def results_api(request):
+    qs = CrawlResult.objects.filter(user=request.user)
+    try:
+        statuses = [int(s) for value in request.GET.getlist("status") for s in value.split(",") if s]
+    except ValueError:
+        raise APIError("status muss eine Ganzzahl sein")
+    if statuses:
+        qs = qs.filter(status_code__in=statuses)
+    if request.GET.get("host"):
+        qs = qs.for_host(request.GET["host"])
+    return _page(request, qs, RESULT_FIELDS, DEFAULT_RESULT_FIELDS, _serialize_result)
+
+
+# ✅ Aktivitäts-Log als JSON (neueste zuerst)
+@require_GET
+@api_login_required
+@condition(etag_func=_etag("logs"), last_modified_func=_last_modified("logs"))
+def logs_api(request):
+    qs = CrawlLog.objects.filter(user=request.user)
+    return _page(request, qs, LOG_FIELDS, tuple(LOG_FIELDS), _serialize_log)
@@ -1,5 +1,3 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from urllib.robotparser import RobotFileParser
 from datetime import datetime
@@ -10,6 +8,7 @@ import os
 import logging
 import argparse
 import sqlite3
+import threading
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,6 +17,27 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def __getattr__(name):
+    # requests/bs4 erst beim Crawlen importieren; die Lösch-Optionen der CLI brauchen sie nicht
+    if name == "requests":
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def canonical_url(url: str) -> str:
+    """Kanonische Form einer URL (ohne Fragment und abschließenden Slash) – Schlüssel für den Seiten-Cache."""
+    try:
+        parsed = urlparse(url)
+        no_frag = parsed._replace(fragment="")
+        norm = no_frag.geturl()
+        if norm.endswith("/") and no_frag.path not in ("", "/"):
+            norm = norm.rstrip("/")
+        return norm
+    except Exception:
+        return url
+
+
 class WebCrawler:
     def __init__(
         self,
@@ -27,8 +47,11 @@ class WebCrawler:
         json_file="crawled_data.json",
         save_to_json=False,
         db_path="db.sqlite3",
+        page_cache=None,
     ):
         self.start_url = start_url
+        # optionaler geteilter Seiten-Cache mit get(url) / store(url, item, links)
+        self.page_cache = page_cache
         self.max_pages = max_pages
         self.delay = delay
         self.visited = set()
@@ -48,41 +71,64 @@ class WebCrawler:
 
         self.domain = urlparse(start_url).netloc
 
-        # robots.txt laden
-        self.robot_parser = None
+        # robots.txt erst beim ersten Bedarf laden; crawl() startet den Abruf im Hintergrund
+        self._robot_parser = None
+        self._robots_loaded = False
+        self._robots_thread = None
+        self._robots_lock = threading.Lock()
+
+        # Set zur Verhinderung mehrfacher Einträge in der Queue
+        self.to_visit_set = {self.normalize_url(u) for u in self.to_visit}
+
+    # ----------------- Hilfsfunktionen -----------------
+
+    @property
+    def robot_parser(self):
+        """RobotFileParser der Start-Domain oder None; wartet beim ersten Zugriff auf den Abruf."""
+        if not self._robots_loaded:
+            self.prefetch_robots()
+            thread = self._robots_thread
+            if thread is not None:
+                thread.join()
+        return self._robot_parser
+
+    @robot_parser.setter
+    def robot_parser(self, parser):
+        self._robot_parser = parser
+        self._robots_loaded = True
+
+    def prefetch_robots(self):
+        """Startet den robots.txt-Abruf im Hintergrund (höchstens einmal)."""
+        with self._robots_lock:
+            if self._robots_thread is None and not self._robots_loaded:
+                self._robots_thread = threading.Thread(target=self.load_robots, name="robots", daemon=True)
+                self._robots_thread.start()
+
+    def load_robots(self):
+        import requests
+
+        parser = None
         robots_url = urljoin(f"https://{self.domain}", "/robots.txt")
         try:
             resp = requests.get(robots_url, headers=self.headers, timeout=5)
             if resp.status_code == 200:
-                self.robot_parser = RobotFileParser()
-                self.robot_parser.parse(resp.text.splitlines())
+                parser = RobotFileParser()
+                parser.parse(resp.text.splitlines())
                 logger.info(f"robots.txt geladen von {robots_url}")
             else:
                 logger.info(
                     f"robots.txt nicht gefunden (Status {resp.status_code}), erlaube standardmäßig alles"
                 )
-                self.robot_parser = None
         except Exception as e:
             logger.warning(
                 f"robots.txt konnte nicht geladen werden: {e}. Erlaube standardmäßig alles."
             )
-            self.robot_parser = None
-
-        # Set zur Verhinderung mehrfacher Einträge in der Queue
-        self.to_visit_set = {self.normalize_url(u) for u in self.to_visit}
-
-    # ----------------- Hilfsfunktionen -----------------
+        finally:
+            if not self._robots_loaded:
+                self.robot_parser = parser
 
     def normalize_url(self, url: str) -> str:
-        try:
-            parsed = urlparse(url)
-            no_frag = parsed._replace(fragment="")
-            norm = no_frag.geturl()
-            if norm.endswith("/") and no_frag.path not in ("", "/"):
-                norm = norm.rstrip("/")
-            return norm
-        except Exception:
-            return url
+        return canonical_url(url)
 
     def can_fetch(self, url):
         try:
@@ -225,21 +271,32 @@ class WebCrawler:
 
     # ----------------- Crawl-Logik -----------------
 
-    def extract_links(self, url, html):
-        links = []
+    def find_links(self, url, html):
+        """Alle absoluten Link-Ziele einer Seite (ungefiltert, wie sie im Seiten-Cache landen)."""
+        from bs4 import BeautifulSoup
+
         try:
             soup = BeautifulSoup(html, "html.parser")
-            for link in soup.find_all("a", href=True):
-                absolute_url = urljoin(url, link["href"])
-                norm = self.normalize_url(absolute_url)
-                if self.is_valid_url(absolute_url) and norm not in self.to_visit_set:
-                    links.append(absolute_url)
-                    self.to_visit_set.add(norm)
+            return [urljoin(url, link["href"]) for link in soup.find_all("a", href=True)]
         except Exception as e:
             logger.error(f"Fehler beim Extrahieren von Links: {e}")
+            return []
+
+    def filter_links(self, urls):
+        links = []
+        for absolute_url in urls:
+            norm = self.normalize_url(absolute_url)
+            if self.is_valid_url(absolute_url) and norm not in self.to_visit_set:
+                links.append(absolute_url)
+                self.to_visit_set.add(norm)
         return links
 
+    def extract_links(self, url, html):
+        return self.filter_links(self.find_links(url, html))
+
     def extract_content(self, url, html):
+        from bs4 import BeautifulSoup
+
         try:
             soup = BeautifulSoup(html, "html.parser")
             title_tag = soup.title
@@ -269,6 +326,8 @@ class WebCrawler:
 
     def fetch_page(self, url):
         """Holt eine Seite ab und liefert (html, status_code)."""
+        import requests
+
         if not self.can_fetch(url):
             logger.info(f"Crawling von {url} durch robots.txt verboten.")
             return None, None
@@ -288,8 +347,11 @@ class WebCrawler:
             logger.error(f"Fehler beim Abrufen von {url}: {e}")
             return None, None
 
-    def crawl(self):
+    def crawl(self, progress_callback=None):
+        """Crawlt ab start_url; progress_callback(url, status, item) wird nach jeder Seite aufgerufen."""
         logger.info(f"Starte Crawler mit: {self.start_url}")
+        # robots.txt lädt parallel zum Seiten-Cache-Lookup der ersten URL
+        self.prefetch_robots()
 
         try:
             while self.to_visit and len(self.visited) < self.max_pages:
@@ -301,19 +363,35 @@ class WebCrawler:
                 self.visited.add(norm_url)
                 logger.info(f"Crawle ({len(self.visited)}/{self.max_pages}): {norm_url}")
 
-                html, status = self.fetch_page(url)
-                if not html:
-                    continue
+                cached = self.page_cache.get(norm_url) if self.page_cache else None
+                if cached:
+                    # frische Seite aus dem geteilten Cache: kein Abruf, kein Parsen
+                    content = dict(cached["item"], url=url, page_id=cached["page_id"])
+                    status = content["status_code"]
+                    links = cached["links"]
+                else:
+                    html, status = self.fetch_page(url)
+                    if not html:
+                        if progress_callback:
+                            progress_callback(url, status, None)
+                        continue
+
+                    content = self.extract_content(url, html)
+                    links = self.find_links(url, html)
+                    if content:
+                        content["status_code"] = status if status is not None else 0
+                        if self.page_cache:
+                            content["page_id"] = self.page_cache.store(norm_url, content, links)
 
-                content = self.extract_content(url, html)
                 if content:
-                    content["status_code"] = status if status is not None else 0
                     self.data.append(content)
+                if progress_callback:
+                    progress_callback(url, status, content)
 
-                links = self.extract_links(url, html)
-                self.to_visit.extend(links)
+                self.to_visit.extend(self.filter_links(links))
 
-                time.sleep(self.delay)
+                if not cached:
+                    time.sleep(self.delay)
         except KeyboardInterrupt:
             logger.info("Crawl durch Benutzer abgebrochen (KeyboardInterrupt).")
         except Exception as e:
@@ -1,24 +1,34 @@
 from django.conf import settings
 import sqlite3
 
+from .models import CrawlStat, UserDataVersion
+from .stats import results_deleted
+
 # Django-Datenbankpfad automatisch laden
 DB_PATH = settings.DATABASES["default"]["NAME"]
 
 
-def delete_url(url):
+def _delete(where, params=()):
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
-    cur.execute("DELETE FROM crawled WHERE url = ?", (url,))
+    cur.execute("BEGIN IMMEDIATE")
+    # betroffene Zeilen für die Dashboard-Zähler merken, bevor sie verschwinden
+    cur.execute(f"SELECT user_id, url, status_code FROM crawled WHERE {where}", params)
+    rows = cur.fetchall()
+    cur.execute(f"DELETE FROM crawled WHERE {where}", params)
     conn.commit()
     conn.close()
+    results_deleted(rows)
+    # Roh-SQL umgeht die Signale: API-Caches aller Benutzer verwerfen
+    UserDataVersion.bump("results")
+
+
+def delete_url(url):
+    _delete("url = ?", (url,))
 
 
 def delete_domain(domain):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM crawled WHERE url LIKE ?", (f"%{domain}%",))
-    conn.commit()
-    conn.close()
+    _delete("url LIKE ?", (f"%{domain}%",))
 
 
 def delete_all():
@@ -27,11 +37,9 @@ def delete_all():
     cur.execute("DELETE FROM crawled")
     conn.commit()
     conn.close()
+    CrawlStat.objects.all().delete()
+    UserDataVersion.bump("results")
 
 
 def delete_404():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM crawled WHERE status_code = 404")
-    conn.commit()
-    conn.close()
+    _delete("status_code = 404")
@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .crawler import WebCrawler
+from .models import CrawlJob, CrawlLog, CrawlResult
+from .page_cache import SharedPageCache
+from .term_index import update_term_index
+
+logger = logging.getLogger(__name__)
+
+# Fortschritt laufender Crawls im Prozess (job_id -> Zustand); SSE-Streams lesen nur hier,
+# Streams in anderen Prozessen fallen auf die CrawlJob-Zeile zurück.
+_progress = {}
+_progress_lock = threading.Lock()
+PROGRESS_RETENTION = 60.0
+# ohne Lebenszeichen so lange gilt ein pending/running-Job als verwaist (Neustart, toter Thread)
+JOB_STALE_AFTER = timedelta(minutes=5)
+
+
+def publish_progress(job_id, state):
+    with _progress_lock:
+        current = _progress.setdefault(job_id, {"job_id": job_id, "version": 0})
+        current.update(state)
+        current["version"] += 1
+
+
+def get_progress(job_id):
+    with _progress_lock:
+        state = _progress.get(job_id)
+        return dict(state) if state else None
+
+
+def discard_progress(job_id):
+    with _progress_lock:
+        _progress.pop(job_id, None)
+
+
+def job_state(job, pages_per_sec=0.0, last_url=""):
+    """Zustand eines Jobs im Format der SSE-Events."""
+    percent = int(min(job.pages_done / job.max_pages, 1.0) * 100) if job.max_pages else 0
+    if job.status == "done":
+        percent = 100
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "pages_done": job.pages_done,
+        "max_pages": job.max_pages,
+        "errors": job.error_count,
+        "percent": percent,
+        "pages_per_sec": round(pages_per_sec, 2),
+        "last_url": last_url,
+    }
+
+
+def run_crawl_job(job_id):
+    """Führt einen CrawlJob aus (im Hintergrund-Thread) und speichert Ergebnisse Seite für Seite."""
+    job = CrawlJob.objects.select_related("user").get(pk=job_id)
+    job.status = "running"
+    job.started_at = job.heartbeat_at = timezone.now()
+    job.save(update_fields=["status", "started_at", "heartbeat_at"])
+    publish_progress(job.id, job_state(job))
+    started = time.monotonic()
+
+    def on_page(url, status, item):
+        job.pages_done += 1
+        if item is None or (status or 0) >= 400:
+            job.error_count += 1
+        if item:
+            defaults = {
+                "title": item["title"],
+                "link_count": item["link_count"],
+                "status_code": item["status_code"],
+                "crawled_at": timezone.now(),
+                "page_id": item.get("page_id"),
+            }
+            if item.get("page_id"):
+                # Inhalt liegt im geteilten Seiten-Cache, das Ergebnis ist nur ein Verweis
+                defaults.update(description="", headings=[], paragraphs=[])
+            else:
+                defaults.update(
+                    description=item["description"],
+                    headings=item["headings"],
+                    paragraphs=item["paragraphs"],
+                )
+            CrawlResult.objects.update_or_create(user=job.user, url=item["url"], defaults=defaults)
+            CrawlLog.objects.create(
+                user=job.user,
+                message=f"Gecrawlt: {item['url']} (Status {item.get('status_code', 200)})"
+            )
+        CrawlJob.objects.filter(pk=job.id).update(
+            pages_done=job.pages_done, error_count=job.error_count, heartbeat_at=timezone.now()
+        )
+        elapsed = time.monotonic() - started
+        publish_progress(job.id, job_state(job, job.pages_done / elapsed if elapsed else 0.0, url))
+
+    try:
+        page_cache = SharedPageCache()
+        crawler = WebCrawler(
+            start_url=job.start_url, max_pages=job.max_pages, delay=job.delay, page_cache=page_cache
+        )
+        crawler.crawl(progress_callback=on_page)
+        job.status = "done"
+        CrawlLog.objects.create(
+            user=job.user,
+            message=f"Crawler beendet für: {job.start_url} ({page_cache.hits} Seiten aus dem Cache)",
+        )
+        try:
+            # neue Ergebnisse für "Ähnliche Seiten" indexieren; ein Fehler hier macht den Crawl nicht ungültig
+            update_term_index()
+        except Exception:
+            logger.exception(f"Termindex nach Crawl-Job {job.id} nicht aktualisiert")
+    except Exception as e:
+        logger.exception(f"Crawl-Job {job.id} fehlgeschlagen")
+        job.status = "failed"
+        CrawlLog.objects.create(user=job.user, message=f"Crawler fehlgeschlagen für: {job.start_url} ({e})")
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "pages_done", "error_count", "finished_at"])
+        elapsed = time.monotonic() - started
+        publish_progress(job.id, job_state(job, job.pages_done / elapsed if elapsed else 0.0))
+        # Endzustand kurz für verbundene Streams vorhalten, danach liefert die DB ihn
+        timer = threading.Timer(PROGRESS_RETENTION, discard_progress, args=(job.id,))
+        timer.daemon = True
+        timer.start()
+
+
+def expire_stale_jobs(user=None, stale_after=JOB_STALE_AFTER):
+    """Markiert pending/running-Jobs ohne Lebenszeichen seit stale_after als fehlgeschlagen."""
+    cutoff = timezone.now() - stale_after
+    jobs = (
+        CrawlJob.objects.filter(status__in=("pending", "running"))
+        .annotate(last_seen=Coalesce("heartbeat_at", "started_at", "created_at"))
+        .filter(last_seen__lt=cutoff)
+    )
+    if user is not None:
+        jobs = jobs.filter(user=user)
+    expired = 0
+    for job in jobs.select_related("user"):
+        # nur umstellen, wenn der Job nicht inzwischen selbst fertig geworden ist
+        if CrawlJob.objects.filter(pk=job.pk, status=job.status).update(status="failed", finished_at=timezone.now()):
+            CrawlLog.objects.create(user=job.user, message=f"Crawl-Job {job.id} verwaist, als fehlgeschlagen markiert")
+            expired += 1
+    return expired
+
+
+def _run_job_thread(job_id):
+    try:
+        run_crawl_job(job_id)
+    except Exception:
+        # z.B. Fehler vor dem eigentlichen Crawl (Job laden, Status setzen): Endzustand trotzdem schreiben
+        logger.exception(f"Crawl-Job {job_id} abgebrochen")
+        CrawlJob.objects.filter(pk=job_id, status__in=("pending", "running")).update(
+            status="failed", finished_at=timezone.now()
+        )
+    finally:
+        # eigene DB-Verbindung des Threads schließen
+        connection.close()
+
+
+def start_crawl_job(job):
+    """Startet den Crawl außerhalb des Request-Threads."""
+    thread = threading.Thread(target=_run_job_thread, args=(job.id,), name=f"crawl-job-{job.id}", daemon=True)
+    thread.start()
+    return thread
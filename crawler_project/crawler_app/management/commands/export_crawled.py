@@ -0,0 +1,146 @@
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+from crawler_app.models import CrawlResult
+
+EXPORT_FIELDS = (
+    "id", "user_id", "url", "title", "description", "headings", "paragraphs", "link_count", "status_code", "crawled_at",
+)
+EXPORT_FORMATS = ("jsonl", "csv", "parquet")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise CommandError("Für Parquet wird pyarrow benötigt (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _date_filter(value, lookup):
+    """crawled_at-Filter für YYYY-MM-DD (ganzer Tag) oder einen ISO-Zeitpunkt."""
+    day = parse_date(value) if len(value) == 10 else None
+    if day:
+        return Q(**{f"crawled_at__date__{lookup}": day})
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(f"Ungültiges Datum: {value}")
+    return Q(**{f"crawled_at__{lookup}": moment})
+
+
+class Command(BaseCommand):
+    help = "Exportiert die crawled-Tabelle gestreamt als JSONL, CSV oder (mit pyarrow) Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", default="-", help="Zieldatei (- = stdout)")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, help="Standard: aus der Dateiendung, sonst jsonl")
+        parser.add_argument("--user", help="Nur Ergebnisse dieses Benutzers")
+        parser.add_argument("--host", help="Nur Seiten dieses Hosts")
+        parser.add_argument("--status", type=int, action="append", default=[], help="Nur diese HTTP-Status (mehrfach möglich)")
+        parser.add_argument("--since", help="Ab Datum (YYYY-MM-DD oder ISO-Zeitpunkt)")
+        parser.add_argument("--until", help="Bis einschließlich Datum (YYYY-MM-DD oder ISO-Zeitpunkt)")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Zeilen pro Datenbank-Abruf")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        fmt = options["format"]
+        if fmt is None:
+            ext = os.path.splitext(output)[1].lstrip(".").lower()
+            fmt = ext if ext in EXPORT_FORMATS else "jsonl"
+        if fmt == "parquet" and output == "-":
+            raise CommandError("Parquet benötigt eine Zieldatei (--output)")
+
+        start = time.perf_counter()
+        batches = self.iter_batches(self.queryset(options), options["chunk_size"])
+        if fmt == "parquet":
+            rows = self.write_parquet(batches, output)
+        else:
+            stream = self.stdout._out if output == "-" else open(output, "w", encoding="utf-8", newline="")
+            try:
+                rows = self.write_csv(batches, stream) if fmt == "csv" else self.write_jsonl(batches, stream)
+            finally:
+                if output != "-":
+                    stream.close()
+        seconds = time.perf_counter() - start
+        rate = int(rows / seconds * 60) if seconds else rows
+        # Zusammenfassung nach stderr, damit stdout-Exporte sauber bleiben
+        self.stderr.write(f"{rows} Zeilen als {fmt} exportiert in {seconds:.2f} s ({rate} Zeilen/min)")
+
+    def queryset(self, options):
+        qs = CrawlResult.objects.all()
+        if options["user"]:
+            qs = qs.filter(user__username=options["user"])
+        if options["host"]:
+            qs = qs.for_host(options["host"])
+        if options["status"]:
+            qs = qs.filter(status_code__in=options["status"])
+        if options["since"]:
+            qs = qs.filter(_date_filter(options["since"], "gte"))
+        if options["until"]:
+            qs = qs.filter(_date_filter(options["until"], "lte"))
+        return qs.order_by("id").values(
+            "id", "user_id", "url", "title", "description", "headings", "paragraphs", "link_count",
+            "status_code", "crawled_at", "page_id", "page__description", "page__headings", "page__paragraphs",
+        )
+
+    def iter_batches(self, qs, chunk_size):
+        """Zeilen in Blöcken; iterator() hält nie die ganze Tabelle im Speicher."""
+        rows = qs.iterator(chunk_size=chunk_size)
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                return
+            for row in batch:
+                # Inhalt wie CrawlResult.content: geteilte Seite, sonst das Ergebnis selbst
+                if row.pop("page_id"):
+                    row["description"] = row["description"] or row["page__description"] or ""
+                    row["headings"] = row["page__headings"] or []
+                    row["paragraphs"] = row["page__paragraphs"] or []
+                del row["page__description"], row["page__headings"], row["page__paragraphs"]
+                row["crawled_at"] = row["crawled_at"].isoformat()
+            yield batch
+
+    def write_jsonl(self, batches, stream):
+        count = 0
+        for batch in batches:
+            stream.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch))
+            count += len(batch)
+        return count
+
+    def write_csv(self, batches, stream):
+        count = 0
+        writer = csv.writer(stream)
+        writer.writerow(EXPORT_FIELDS)
+        for batch in batches:
+            writer.writerows(
+                [
+                    json.dumps(row[name], ensure_ascii=False) if name in ("headings", "paragraphs") else row[name]
+                    for name in EXPORT_FIELDS
+                ]
+                for row in batch
+            )
+            count += len(batch)
+        return count
+
+    def write_parquet(self, batches, path):
+        pa, pq = _require_pyarrow()
+        schema = pa.schema([
+            ("id", pa.int64()), ("user_id", pa.int64()), ("url", pa.string()), ("title", pa.string()),
+            ("description", pa.string()), ("headings", pa.list_(pa.string())), ("paragraphs", pa.list_(pa.string())),
+            ("link_count", pa.int64()), ("status_code", pa.int64()), ("crawled_at", pa.string()),
+        ])
+        count = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in batches:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+        return count
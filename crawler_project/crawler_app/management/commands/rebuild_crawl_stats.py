@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from crawler_app.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Baut die Dashboard-Statistiken (CrawlStat) aus der crawled-Tabelle neu auf."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", default=[], help="Nur diesen Benutzer (mehrfach möglich)")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["user"]:
+            users = dict(User.objects.filter(username__in=options["user"]).values_list("username", "id"))
+            missing = set(options["user"]) - set(users)
+            if missing:
+                raise CommandError(f"Unbekannte Benutzer: {', '.join(sorted(missing))}")
+            user_ids = list(users.values())
+        rows = rebuild_stats(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"{rows} Statistik-Zeilen neu aufgebaut."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from crawler_app.term_index import update_term_index
+
+
+class Command(BaseCommand):
+    help = "Aktualisiert den Termindex für ähnliche Seiten (neue, geänderte und gelöschte Ergebnisse)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Ergebnisse pro Schreibvorgang")
+
+    def handle(self, *args, **options):
+        stats = update_term_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Termindex aktualisiert: {stats['added']} neu, {stats['updated']} geändert, {stats['removed']} entfernt."
+        ))
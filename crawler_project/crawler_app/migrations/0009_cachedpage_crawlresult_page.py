@@ -0,0 +1,74 @@
+# Generated by Django 6.0 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_page_cache(apps, schema_editor):
+    """Überführt vorhandene Ergebnisse in den geteilten Cache (eine Seite pro URL, neuester Stand)."""
+    CachedPage = apps.get_model("crawler_app", "CachedPage")
+    CrawlResult = apps.get_model("crawler_app", "CrawlResult")
+    pages = {}
+    for result in CrawlResult.objects.order_by("url", "-crawled_at").iterator():
+        page_id = pages.get(result.url)
+        if page_id is None:
+            page = CachedPage.objects.create(
+                url=result.url,
+                title=result.title,
+                description=result.description,
+                headings=result.headings,
+                paragraphs=result.paragraphs,
+                link_count=result.link_count,
+                status_code=result.status_code,
+                fetched_at=result.crawled_at,
+            )
+            page_id = pages[result.url] = page.id
+        CrawlResult.objects.filter(pk=result.pk).update(page_id=page_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crawler_app", "0008_crawljob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CachedPage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.URLField(max_length=2000, unique=True)),
+                ("title", models.CharField(blank=True, max_length=255)),
+                ("description", models.TextField(blank=True)),
+                ("headings", models.JSONField(blank=True, default=list)),
+                ("paragraphs", models.JSONField(blank=True, default=list)),
+                ("links", models.JSONField(blank=True, default=list)),
+                ("link_count", models.IntegerField(default=0)),
+                ("status_code", models.IntegerField(default=200)),
+                ("fetched_at", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "db_table": "crawled_pages",
+            },
+        ),
+        migrations.AddField(
+            model_name="crawlresult",
+            name="page",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="results",
+                to="crawler_app.cachedpage",
+            ),
+        ),
+        migrations.RunPython(fill_page_cache, migrations.RunPython.noop),
+    ]
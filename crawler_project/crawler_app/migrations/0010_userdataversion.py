@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 10:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("crawler_app", "0009_cachedpage_crawlresult_page"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserDataVersion",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="data_version",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("results_version", models.PositiveBigIntegerField(default=0)),
+                ("results_changed_at", models.DateTimeField(blank=True, null=True)),
+                ("logs_version", models.PositiveBigIntegerField(default=0)),
+                ("logs_changed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,36 @@
-from django.db import models
+from django.db import IntegrityError, models
+from django.db.models import F, Q
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class CachedPage(models.Model):
+    """Geteilter Seiten-Cache: jede kanonische URL wird nur einmal gespeichert, unabhängig vom Benutzer."""
+    url = models.URLField(max_length=2000, unique=True)
+    title = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    headings = models.JSONField(default=list, blank=True)
+    paragraphs = models.JSONField(default=list, blank=True)
+    links = models.JSONField(default=list, blank=True)
+    link_count = models.IntegerField(default=0)
+    status_code = models.IntegerField(default=200)
+    fetched_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "crawled_pages"
+
+    def __str__(self):
+        return self.url
+
+
+class CrawlResultQuerySet(models.QuerySet):
+    def for_host(self, host):
+        """Nur URLs genau dieses Hosts (http/https, ohne Subdomains)."""
+        host = host.lower()
+        return self.filter(
+            Q(url__istartswith=f"http://{host}/") | Q(url__istartswith=f"https://{host}/")
+            | Q(url__iexact=f"http://{host}") | Q(url__iexact=f"https://{host}")
+        )
 
 
 class CrawlResult(models.Model):
@@ -12,11 +43,29 @@ class CrawlResult(models.Model):
     link_count = models.IntegerField(default=0)
     crawled_at = models.DateTimeField()
     status_code = models.IntegerField(default=200)
+    # Verweis auf den geteilten Seiteninhalt; neue Ergebnisse speichern Inhalte nur dort
+    page = models.ForeignKey(
+        CachedPage, null=True, blank=True, on_delete=models.SET_NULL, related_name="results"
+    )
+
+    objects = CrawlResultQuerySet.as_manager()
 
     class Meta:
         db_table = "crawled"  # WICHTIG: gleiche Tabelle wie der Crawler
         unique_together = ('user', 'url')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # geladener Stand für inkrementelle Statistiken (siehe stats.py)
+        instance._stats_origin = (instance.__dict__.get("url"), instance.__dict__.get("status_code"))
+        return instance
+
+    @property
+    def content(self):
+        """Objekt mit description/headings/paragraphs: die geteilte Seite oder (Altbestand) das Ergebnis selbst."""
+        return self.page if self.page_id else self
+
     def __str__(self):
         return f"{self.url} ({self.user.username})"
 
@@ -49,3 +98,87 @@ class CrawlLog(models.Model):
 
     def __str__(self):
         return f"{self.created_at}: {self.message}"
+
+
+class CrawlJob(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Wartet"),
+        ("running", "Läuft"),
+        ("done", "Fertig"),
+        ("failed", "Fehlgeschlagen"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="crawl_jobs")
+    start_url = models.URLField()
+    max_pages = models.IntegerField(default=10)
+    delay = models.FloatField(default=0.5)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    pages_done = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # letztes Lebenszeichen des Job-Threads (pro Seite); bleibt es aus, gilt der Job als verwaist
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    @property
+    def is_active(self):
+        return self.status in ("pending", "running")
+
+    def __str__(self):
+        return f"{self.start_url} ({self.get_status_display()})"
+
+
+class UserDataVersion(models.Model):
+    """Änderungszähler pro Benutzer für Ergebnisse und Logs (Grundlage für ETag/Last-Modified der API)."""
+    KINDS = ("results", "logs")
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="data_version")
+    results_version = models.PositiveBigIntegerField(default=0)
+    results_changed_at = models.DateTimeField(null=True, blank=True)
+    logs_version = models.PositiveBigIntegerField(default=0)
+    logs_changed_at = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def bump(cls, kind, user_ids=None):
+        """Erhöht den Zähler für die Benutzer (None = alle, z. B. nach Roh-SQL-Löschungen)."""
+        changes = {f"{kind}_version": F(f"{kind}_version") + 1, f"{kind}_changed_at": timezone.now()}
+        if user_ids is None:
+            cls.objects.update(**changes)
+            return
+        user_ids = set(user_ids)
+        existing = set(cls.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True))
+        cls.objects.filter(user_id__in=existing).update(**changes)
+        for user_id in user_ids - existing:
+            try:
+                cls.objects.create(user_id=user_id, **{f"{kind}_version": 1, f"{kind}_changed_at": changes[f"{kind}_changed_at"]})
+            except IntegrityError:
+                # parallel angelegt
+                cls.objects.filter(user_id=user_id).update(**changes)
+
+    def __str__(self):
+        return f"{self.user_id}: Ergebnisse v{self.results_version}, Logs v{self.logs_version}"
+
+
+class CrawlStat(models.Model):
+    """Vorberechnete Dashboard-Zähler pro Benutzer: gesamt, je Statuscode und je Host (inkrementell gepflegt)."""
+    DIMENSIONS = [
+        ("total", "Gesamt"),
+        ("status", "Statuscode"),
+        ("host", "Host"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="crawl_stats")
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    key = models.CharField(max_length=255, blank=True)
+    count = models.IntegerField(default=0)
+    last_crawled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("user", "dimension", "key")
+
+    def __str__(self):
+        return f"{self.user_id} {self.dimension}={self.key}: {self.count}"
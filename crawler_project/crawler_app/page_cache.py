@@ -0,0 +1,55 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CachedPage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_CACHE_TTL = 24 * 60 * 60
+
+CONTENT_FIELDS = ("title", "description", "headings", "paragraphs", "link_count", "status_code")
+
+
+class SharedPageCache:
+    """Benutzerübergreifender Seiten-Cache auf Basis von CachedPage (Schlüssel: kanonische URL)."""
+
+    def __init__(self, ttl=None):
+        if ttl is None:
+            ttl = getattr(settings, "CRAWL_PAGE_CACHE_TTL", DEFAULT_PAGE_CACHE_TTL)
+        self.ttl = timedelta(seconds=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url):
+        """Frische Seite als {"page_id", "item", "links"} oder None."""
+        try:
+            page = CachedPage.objects.filter(url=url, fetched_at__gte=timezone.now() - self.ttl).first()
+        except Exception as e:
+            logger.error(f"Fehler beim Lesen des Seiten-Caches für {url}: {e}")
+            page = None
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        item = {field: getattr(page, field) for field in CONTENT_FIELDS}
+        item["url"] = page.url
+        item["crawled_at"] = page.fetched_at.isoformat()
+        return {"page_id": page.id, "item": item, "links": page.links}
+
+    def store(self, url, item, links):
+        """Legt eine frisch gecrawlte Seite ab (bzw. aktualisiert sie) und gibt ihre ID zurück."""
+        try:
+            defaults = {field: item[field] for field in CONTENT_FIELDS if field in item}
+            defaults["links"] = list(links)
+            defaults["fetched_at"] = timezone.now()
+            page, _ = CachedPage.objects.update_or_create(url=url, defaults=defaults)
+            return page.id
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern im Seiten-Cache für {url}: {e}")
+            return None
+
+    def get_summary(self):
+        return {"hits": self.hits, "misses": self.misses, "ttl": int(self.ttl.total_seconds())}
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import stats
+from .models import CachedPage, CrawlLog, CrawlResult, UserDataVersion
+
+
+@receiver([post_save, post_delete], sender=CrawlResult)
+def result_changed(sender, instance, **kwargs):
+    UserDataVersion.bump("results", [instance.user_id])
+
+
+@receiver(pre_save, sender=CrawlResult)
+def result_before_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        stats.remember_origin(instance)
+
+
+@receiver(post_save, sender=CrawlResult)
+def result_stats_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        stats.result_saved(instance, created)
+
+
+@receiver(post_delete, sender=CrawlResult)
+def result_stats_deleted(sender, instance, **kwargs):
+    stats.result_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=CrawlLog)
+def log_changed(sender, instance, **kwargs):
+    UserDataVersion.bump("logs", [instance.user_id])
+
+
+@receiver(post_save, sender=CachedPage)
+def page_changed(sender, instance, created, **kwargs):
+    # neu abgerufener Inhalt ändert alle Ergebnisse, die auf die Seite verweisen
+    if not created:
+        user_ids = set(CrawlResult.objects.filter(page=instance).values_list("user_id", flat=True))
+        if user_ids:
+            UserDataVersion.bump("results", user_ids)
@@ -0,0 +1,120 @@
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import CrawlResult, CrawlStat
+
+TOP_HOSTS = 10
+
+
+def stat_keys(url, status_code):
+    """Die drei Zähler, in die ein Ergebnis eingeht: gesamt, Statuscode, Host."""
+    host = (urlsplit(url or "").hostname or "")[:255]
+    return [("total", ""), ("status", str(status_code)), ("host", host)]
+
+
+def apply_stats(user_id, delta, crawled_at=None):
+    """Verbucht {(dimension, key): Änderung}; crawled_at setzt zusätzlich den letzten Crawl-Zeitpunkt."""
+    for (dimension, key), change in delta.items():
+        if change == 0 and crawled_at is None:
+            continue
+        updates = {"count": F("count") + change}
+        if crawled_at is not None:
+            updates["last_crawled_at"] = Greatest(Coalesce("last_crawled_at", Value(crawled_at)), Value(crawled_at))
+        bucket = CrawlStat.objects.filter(user_id=user_id, dimension=dimension, key=key)
+        if bucket.update(**updates) or change <= 0:
+            continue
+        try:
+            with transaction.atomic():
+                CrawlStat.objects.create(
+                    user_id=user_id, dimension=dimension, key=key, count=change, last_crawled_at=crawled_at
+                )
+        except IntegrityError:
+            # parallel angelegt
+            bucket.update(**updates)
+
+
+def remember_origin(result):
+    """Vor dem Speichern: alten Stand festhalten, falls die Instanz nicht aus der DB geladen wurde."""
+    if result.pk and None in getattr(result, "_stats_origin", (None, None)):
+        result._stats_origin = CrawlResult.objects.filter(pk=result.pk).values_list("url", "status_code").first()
+
+
+def result_saved(result, created):
+    delta = Counter()
+    origin = getattr(result, "_stats_origin", None)
+    if not created and origin and None not in origin:
+        delta.subtract(stat_keys(*origin))
+    delta.update(stat_keys(result.url, result.status_code))
+    apply_stats(result.user_id, delta, result.crawled_at)
+    result._stats_origin = (result.url, result.status_code)
+
+
+def result_deleted(result):
+    delta = Counter()
+    delta.subtract(stat_keys(result.url, result.status_code))
+    apply_stats(result.user_id, delta)
+
+
+def results_deleted(rows):
+    """Für Löschungen per Roh-SQL: rows sind (user_id, url, status_code) der gelöschten Zeilen."""
+    per_user = {}
+    for user_id, url, status_code in rows:
+        per_user.setdefault(user_id, Counter()).subtract(stat_keys(url, status_code))
+    for user_id, delta in per_user.items():
+        apply_stats(user_id, delta)
+
+
+def user_stats(user):
+    """Dashboard-Kopf mit einer einzigen Abfrage, unabhängig von der Anzahl der Ergebnisse."""
+    stats = {"total": 0, "last_crawled_at": None, "by_status": [], "by_host": [], "other_hosts": 0}
+    hosts = []
+    for stat in CrawlStat.objects.filter(user=user, count__gt=0):
+        if stat.dimension == "total":
+            stats["total"] = stat.count
+            stats["last_crawled_at"] = stat.last_crawled_at
+        elif stat.dimension == "status":
+            stats["by_status"].append((stat.key, stat.count))
+        else:
+            hosts.append((stat.key, stat.count))
+    stats["by_status"].sort()
+    hosts.sort(key=lambda item: (-item[1], item[0]))
+    stats["by_host"] = hosts[:TOP_HOSTS]
+    stats["other_hosts"] = sum(count for _, count in hosts[TOP_HOSTS:])
+    return stats
+
+
+def rebuild_stats(user_ids=None, result_model=CrawlResult, stat_model=CrawlStat):
+    """Baut die Zähler aus crawled neu auf (Reparatur); liefert die Anzahl der Zählerzeilen."""
+    counts = Counter()
+    last = {}
+    results = result_model.objects.all()
+    if user_ids is not None:
+        results = results.filter(user_id__in=user_ids)
+    for user_id, url, status_code, crawled_at in results.values_list(
+        "user_id", "url", "status_code", "crawled_at"
+    ).iterator(chunk_size=2000):
+        for dimension, key in stat_keys(url, status_code):
+            bucket = (user_id, dimension, key)
+            counts[bucket] += 1
+            if crawled_at and (bucket not in last or crawled_at > last[bucket]):
+                last[bucket] = crawled_at
+    with transaction.atomic():
+        stale = stat_model.objects.all()
+        if user_ids is not None:
+            stale = stale.filter(user_id__in=user_ids)
+        stale.delete()
+        stat_model.objects.bulk_create(
+            [
+                stat_model(
+                    user_id=user_id, dimension=dimension, key=key, count=count,
+                    last_crawled_at=last.get((user_id, dimension, key)),
+                )
+                for (user_id, dimension, key), count in counts.items()
+            ],
+            batch_size=1000,
+        )
+    return len(counts)
@@ -0,0 +1,167 @@
+import logging
+import re
+import sys
+import threading
+from array import array
+
+from django.db import connection, transaction
+
+from .models import CrawlResult
+
+logger = logging.getLogger(__name__)
+
+# Gleiches Tabellenformat wie TermIndex in webcrawler.py (term_vocab, term_docs, term_meta in
+# derselben DB): Term-IDs und gewichtete Häufigkeiten pro crawled-Zeile als int32-Arrays.
+_TERM_RE = re.compile(r"[^\W_]{2,}")
+STOPWORDS = frozenset("""
+aber als am an auch auf aus bei bis das dass dem den der des die dies diese ein eine einem einen einer eines er es
+für hat im in ist mit nach nicht noch nur oder sich sie sind so über um und vom von vor war wie wir wird zu zum zur
+a an and are as at be by for from has in is it of on or that the this to was with
+""".split())
+TERM_FIELD_WEIGHTS = (3, 2, 1)  # Titel, Überschriften, Absätze
+
+_matrix_cache = {}
+_matrix_lock = threading.Lock()
+
+
+def _require_scipy():
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise RuntimeError("Für ähnliche Seiten werden numpy und scipy benötigt (pip install numpy scipy)") from e
+    return np, sparse
+
+
+def tokenize(text):
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in STOPWORDS and not term.isdigit()]
+
+
+def document_terms(title, headings, paragraphs):
+    """Gewichtete Termhäufigkeiten einer Seite."""
+    counts = {}
+    for weight, text in zip(TERM_FIELD_WEIGHTS, (title or "", " ".join(headings), " ".join(paragraphs))):
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + weight
+    return counts
+
+
+def _int32_blob(values):
+    values = array("i", values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _ensure_tables(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS term_vocab (id INTEGER PRIMARY KEY, term TEXT UNIQUE)")
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS term_docs "
+        "(doc_id INTEGER PRIMARY KEY, url TEXT, crawled_at TEXT, terms BLOB, counts BLOB)"
+    )
+    cursor.execute("CREATE TABLE IF NOT EXISTS term_meta (key TEXT PRIMARY KEY, value INTEGER)")
+
+
+def _term_ids(cursor, terms):
+    terms = list(terms)
+    cursor.executemany("INSERT OR IGNORE INTO term_vocab (term) VALUES (%s)", [(t,) for t in terms])
+    ids = {}
+    for i in range(0, len(terms), 500):
+        chunk = terms[i:i + 500]
+        cursor.execute(f"SELECT term, id FROM term_vocab WHERE term IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        ids.update(cursor.fetchall())
+    return ids
+
+
+def update_term_index(batch_size=500):
+    """Indexiert neue und geänderte Ergebnisse (crawled_at), entfernt gelöschte; liefert die Zähler."""
+    stats = {"added": 0, "updated": 0, "removed": 0}
+    with transaction.atomic(), connection.cursor() as cursor:
+        _ensure_tables(cursor)
+        cursor.execute("DELETE FROM term_docs WHERE doc_id NOT IN (SELECT id FROM crawled)")
+        stats["removed"] = cursor.rowcount
+        cursor.execute(
+            """
+            SELECT c.id, c.url, c.crawled_at, d.doc_id IS NOT NULL
+            FROM crawled c LEFT JOIN term_docs d ON d.doc_id = c.id
+            WHERE d.doc_id IS NULL OR d.crawled_at IS NOT c.crawled_at OR d.url IS NOT c.url
+            """
+        )
+        stale = cursor.fetchall()
+        for i in range(0, len(stale), batch_size):
+            chunk = {row[0]: row for row in stale[i:i + batch_size]}
+            docs = []
+            # Inhalt über CrawlResult.content, damit Verweise auf den Seiten-Cache mitzählen
+            for result in CrawlResult.objects.filter(id__in=chunk).select_related("page"):
+                content = result.content
+                docs.append((chunk[result.id], document_terms(result.title, content.headings, content.paragraphs)))
+            ids = _term_ids(cursor, {term for _, counts in docs for term in counts})
+            cursor.executemany(
+                "INSERT OR REPLACE INTO term_docs (doc_id, url, crawled_at, terms, counts) VALUES (%s, %s, %s, %s, %s)",
+                [
+                    (row[0], row[1], row[2], _int32_blob(ids[t] for t in counts), _int32_blob(counts.values()))
+                    for row, counts in docs
+                ],
+            )
+        stats["updated"] = sum(1 for row in stale if row[3])
+        stats["added"] = len(stale) - stats["updated"]
+        if stale or stats["removed"]:
+            cursor.execute(
+                "INSERT INTO term_meta (key, value) VALUES ('version', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+    return stats
+
+
+def _load_matrix():
+    """(doc_ids, Matrix) mit L2-normierten TF-IDF-Zeilen, pro Prozess bis zur nächsten Änderung zwischengespeichert."""
+    np, sparse = _require_scipy()
+    with connection.cursor() as cursor:
+        _ensure_tables(cursor)
+        cursor.execute("SELECT value FROM term_meta WHERE key = 'version'")
+        version = cursor.fetchone()
+        key = (connection.settings_dict["NAME"], version)
+        with _matrix_lock:
+            if _matrix_cache.get("key") == key:
+                return _matrix_cache["value"]
+        cursor.execute("SELECT doc_id, terms, counts FROM term_docs ORDER BY doc_id")
+        rows = cursor.fetchall()
+    doc_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    lengths = np.array([len(row[1]) // 4 for row in rows], dtype=np.int64)
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.frombuffer(b"".join(bytes(row[1]) for row in rows), dtype="<i4")
+    tf = np.frombuffer(b"".join(bytes(row[2]) for row in rows), dtype="<i4").astype(np.float64)
+    num_terms = int(indices.max()) + 1 if len(indices) else 1
+    # geglättete idf, sublineare tf
+    df = np.bincount(indices, minlength=num_terms)
+    data = (1.0 + np.log(tf)) * (np.log((1.0 + len(rows)) / (1.0 + df)) + 1.0)[indices]
+    row_of = np.repeat(np.arange(len(rows)), lengths)
+    data /= np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(rows)))[row_of]
+    value = (doc_ids, sparse.csr_matrix((data, indices, indptr), shape=(len(rows), num_terms)))
+    with _matrix_lock:
+        _matrix_cache.update(key=key, value=value)
+    return value
+
+
+def is_indexed(result):
+    """Ob das Ergebnis im Termindex steht (der Index wird nach Crawls bzw. per update_term_index ergänzt)."""
+    np, _ = _require_scipy()
+    doc_ids, _ = _load_matrix()
+    row = np.searchsorted(doc_ids, result.id)
+    return bool(row < len(doc_ids) and doc_ids[row] == result.id)
+
+
+def related_results(result, k=10):
+    """Die k ähnlichsten Ergebnisse desselben Benutzers als Liste von (CrawlResult, Score)."""
+    np, _ = _require_scipy()
+    doc_ids, matrix = _load_matrix()
+    row = np.searchsorted(doc_ids, result.id)
+    if row >= len(doc_ids) or doc_ids[row] != result.id:
+        return []
+    scores = matrix.dot(matrix[row].T).toarray().ravel()
+    own = CrawlResult.objects.filter(user_id=result.user_id).exclude(url=result.url).values_list("id", flat=True)
+    candidates = np.flatnonzero(np.isin(doc_ids, np.fromiter(own, dtype=np.int64)) & (scores > 0))
+    top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+    by_id = CrawlResult.objects.in_bulk([int(doc_ids[i]) for i in top])
+    return [(by_id[int(doc_ids[i])], round(float(scores[i]), 4)) for i in top if int(doc_ids[i]) in by_id]
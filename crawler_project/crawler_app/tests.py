@@ -1,3 +1,354 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import term_index
+from .crawler import WebCrawler
+from .jobs import _run_job_thread, get_progress, run_crawl_job
+from .models import CachedPage, CrawlJob, CrawlLog, CrawlResult, CrawlStat
+from .page_cache import SharedPageCache
+from .stats import results_deleted, user_stats
+from .term_index import related_results, update_term_index
+
+
+class FakeCrawler:
+    """Ersetzt den echten Crawler: liefert zwei Seiten, eine davon fehlerhaft."""
+
+    def __init__(self, start_url, max_pages=50, delay=1, **kwargs):
+        self.start_url = start_url
+
+    def crawl(self, progress_callback=None):
+        item = {
+            "url": self.start_url,
+            "title": "Start",
+            "description": "",
+            "headings": ["H1"],
+            "paragraphs": ["Text"],
+            "link_count": 1,
+            "status_code": 200,
+        }
+        progress_callback(self.start_url, 200, item)
+        progress_callback(self.start_url + "kaputt", None, None)
+        return [item]
+
+
+class CrawlJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def test_start_crawl_runs_in_background_job(self):
+        with patch("crawler_app.views.start_crawl_job") as start_job:
+            response = self.client.post(reverse("start_crawl"), {
+                "start_url": "https://example.com/", "max_pages": 5, "delay": 0,
+            })
+        job = CrawlJob.objects.get(user=self.user)
+        self.assertRedirects(response, reverse("crawl_job", args=[job.id]))
+        start_job.assert_called_once_with(job)
+
+        # ein zweites Formular wird auf den laufenden Job umgeleitet
+        with patch("crawler_app.views.start_crawl_job") as start_job:
+            response = self.client.post(reverse("start_crawl"), {
+                "start_url": "https://example.org/", "max_pages": 5, "delay": 0,
+            })
+        self.assertRedirects(response, reverse("crawl_job", args=[job.id]))
+        start_job.assert_not_called()
+
+    def test_stale_job_does_not_block_new_crawl(self):
+        # Job eines abgestürzten Servers: steht auf running, meldet sich aber nicht mehr
+        stale = CrawlJob.objects.create(user=self.user, start_url="https://example.com/", status="running")
+        CrawlJob.objects.filter(pk=stale.pk).update(
+            created_at=timezone.now() - timedelta(hours=1), heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        with patch("crawler_app.views.start_crawl_job") as start_job:
+            response = self.client.post(reverse("start_crawl"), {
+                "start_url": "https://example.org/", "max_pages": 5, "delay": 0,
+            })
+        job = CrawlJob.objects.exclude(pk=stale.pk).get(user=self.user)
+        self.assertRedirects(response, reverse("crawl_job", args=[job.id]))
+        start_job.assert_called_once_with(job)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, "failed")
+        self.assertIsNotNone(stale.finished_at)
+
+    def test_job_thread_marks_job_failed_on_unexpected_error(self):
+        job = CrawlJob.objects.create(user=self.user, start_url="https://example.com/")
+        with patch("crawler_app.jobs.run_crawl_job", side_effect=RuntimeError("kaputt")), \
+                patch("crawler_app.jobs.connection"):
+            _run_job_thread(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    def test_run_crawl_job_saves_results_and_publishes_progress(self):
+        job = CrawlJob.objects.create(user=self.user, start_url="https://example.com/", max_pages=2)
+        with patch("crawler_app.jobs.WebCrawler", FakeCrawler):
+            run_crawl_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.pages_done, job.error_count), ("done", 2, 1))
+        self.assertTrue(CrawlResult.objects.filter(user=self.user, url="https://example.com/").exists())
+        state = get_progress(job.id)
+        self.assertEqual((state["status"], state["percent"]), ("done", 100))
+
+    async def test_progress_stream_sends_events(self):
+        user = await User.objects.acreate(username="bob")
+        job = await CrawlJob.objects.acreate(
+            user=user, start_url="https://example.com/", max_pages=4, status="done", pages_done=4,
+        )
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse("crawl_job_events", args=[job.id]))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn("event: progress", body)
+        self.assertIn('"pages_done": 4', body)
+        self.assertIn("event: done", body)
+
+        other = await User.objects.acreate(username="eve")
+        await self.async_client.aforce_login(other)
+        response = await self.async_client.get(reverse("crawl_job_events", args=[job.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class SharedPageCacheTests(TestCase):
+    PAGE = (
+        "<html><head><title>Start</title></head><body>"
+        "<h1>Willkommen</h1><p>Text</p><a href='/weiter'>weiter</a></body></html>"
+    )
+
+    def crawl_as(self, username, cache):
+        user = User.objects.create_user(username)
+        job = CrawlJob.objects.create(user=user, start_url="https://example.com/", max_pages=1, delay=0)
+
+        # robots.txt wird erst im Crawl geladen und schlägt hier fehl (alles erlaubt)
+        with patch("crawler_app.crawler.requests.get", side_effect=Exception("offline")), \
+                patch("crawler_app.jobs.SharedPageCache", return_value=cache), \
+                patch.object(WebCrawler, "fetch_page", return_value=(self.PAGE, 200)) as fetch:
+            run_crawl_job(job.id)
+        return CrawlResult.objects.get(user=user), fetch.call_count
+
+    def test_second_user_reuses_fresh_page(self):
+        cache = SharedPageCache(ttl=3600)
+        first, fetches = self.crawl_as("alice", cache)
+        self.assertEqual(fetches, 1)
+        second, fetches = self.crawl_as("bob", cache)
+        self.assertEqual(fetches, 0)
+        self.assertEqual(cache.get_summary()["hits"], 1)
+
+        # beide Ergebnisse verweisen auf dieselbe gespeicherte Seite
+        self.assertEqual(CachedPage.objects.count(), 1)
+        self.assertEqual(first.page_id, second.page_id)
+        self.assertEqual(second.paragraphs, [])
+        self.assertEqual(second.content.headings, ["Willkommen"])
+        self.assertEqual(second.content.links, ["https://example.com/weiter"])
+
+    def test_stale_page_is_fetched_again(self):
+        self.crawl_as("alice", SharedPageCache(ttl=3600))
+        _, fetches = self.crawl_as("bob", SharedPageCache(ttl=0))
+        self.assertEqual(fetches, 1)
+        self.assertEqual(CachedPage.objects.count(), 1)
+
+
+class TermIndexTests(TestCase):
+    def setUp(self):
+        # Rollback zwischen Tests setzt die Indexversion zurück, der Matrix-Cache des Prozesses nicht
+        term_index._matrix_cache.clear()
+        self.user = User.objects.create_user("alice", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def add(self, user, url, title, paragraphs, page=None):
+        return CrawlResult.objects.create(
+            user=user, url=url, title=title, paragraphs=paragraphs, crawled_at=timezone.now(), page=page
+        )
+
+    def test_related_results_ranked_by_tfidf_and_scoped_to_user(self):
+        python = self.add(self.user, "https://example.com/python", "Python Tutorial", ["Python Listen und Schleifen"])
+        page = CachedPage.objects.create(
+            url="https://example.com/py2", headings=["Python Schleifen"], paragraphs=["Listen in Python"],
+            fetched_at=timezone.now(),
+        )
+        similar = self.add(self.user, page.url, "Mehr Python", [], page=page)
+        self.add(self.user, "https://example.com/kochen", "Kochen", ["Rezepte und Zutaten"])
+        other = User.objects.create_user("bob", password="pw-12345")
+        self.add(other, "https://example.org/python", "Python Tutorial", ["Python Listen und Schleifen"])
+
+        self.assertEqual(update_term_index()["added"], 4)
+        self.assertEqual(update_term_index(), {"added": 0, "updated": 0, "removed": 0})
+        related = related_results(python)
+        # Inhalt aus dem Seiten-Cache zählt mit, fremde und unähnliche Seiten fehlen
+        self.assertEqual([r.id for r, _ in related], [similar.id])
+
+        response = self.client.get(reverse("related_pages", args=[python.id]))
+        self.assertContains(response, "https://example.com/py2")
+        self.assertNotContains(response, "example.org")
+
+        similar.delete()
+        self.assertEqual(update_term_index()["removed"], 1)
+        self.assertEqual(related_results(python), [])
+
+    def test_view_only_reads_index_and_command_updates_it(self):
+        first = self.add(self.user, "https://example.com/a", "Python", ["Python Listen"])
+        self.add(self.user, "https://example.com/b", "Python", ["Python Schleifen"])
+
+        # ohne Index schreibt die Seite nichts, sondern meldet den fehlenden Eintrag
+        with patch("crawler_app.term_index.update_term_index") as update:
+            response = self.client.get(reverse("related_pages", args=[first.id]))
+        update.assert_not_called()
+        self.assertContains(response, "noch nicht im Ähnlichkeitsindex")
+        self.assertNotContains(response, "https://example.com/b<")
+
+        out = StringIO()
+        call_command("update_term_index", stdout=out)
+        self.assertIn("2 neu", out.getvalue())
+        response = self.client.get(reverse("related_pages", args=[first.id]))
+        self.assertNotContains(response, "noch nicht im Ähnlichkeitsindex")
+        self.assertContains(response, "https://example.com/b<")
+
+    def test_finished_crawl_job_updates_index(self):
+        job = CrawlJob.objects.create(user=self.user, start_url="https://example.com/", max_pages=2)
+        with patch("crawler_app.jobs.WebCrawler", FakeCrawler):
+            run_crawl_job(job.id)
+        result = CrawlResult.objects.get(user=self.user, url="https://example.com/")
+        self.assertEqual(update_term_index(), {"added": 0, "updated": 0, "removed": 0})
+        self.assertEqual(related_results(result), [])
+
+
+class ExportCrawledTests(TestCase):
+    def test_export_streams_filtered_rows_with_shared_content(self):
+        user = User.objects.create_user("alice")
+        now = timezone.now()
+        page = CachedPage.objects.create(
+            url="https://example.com/b", description="Geteilt", headings=["H"], paragraphs=["P"], fetched_at=now
+        )
+        CrawlResult.objects.create(user=user, url="https://example.com/a", title="A", crawled_at=now)
+        CrawlResult.objects.create(user=user, url=page.url, title="B", crawled_at=now, page=page)
+        CrawlResult.objects.create(user=user, url="https://example.com/c", status_code=404, crawled_at=now)
+        CrawlResult.objects.create(user=user, url="https://example.com.evil/x", crawled_at=now)
+        CrawlResult.objects.create(user=user, url="https://example.com/alt", crawled_at=now - timedelta(days=10))
+
+        out = StringIO()
+        call_command(
+            "export_crawled", host="example.com", status=[200], since=(now - timedelta(days=1)).date().isoformat(),
+            chunk_size=1, stdout=out, stderr=StringIO(),
+        )
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["url"] for row in rows], ["https://example.com/a", "https://example.com/b"])
+        self.assertEqual(rows[1]["description"], "Geteilt")
+        self.assertEqual(rows[1]["paragraphs"], ["P"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "export.csv")
+            call_command("export_crawled", output=path, status=[404], stderr=StringIO())
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "user_id", "url"])
+        self.assertEqual(len(lines), 2)
+
+
+class ResultsAPITests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw-12345")
+        self.client.force_login(self.user)
+        now = timezone.now()
+        page = CachedPage.objects.create(
+            url="https://example.com/geteilt", description="Geteilt", paragraphs=["P"], fetched_at=now
+        )
+        for i in range(5):
+            CrawlResult.objects.create(user=self.user, url=f"https://example.com/{i}", title=f"T{i}", crawled_at=now)
+        CrawlResult.objects.create(user=self.user, url=page.url, crawled_at=now, page=page)
+        CrawlResult.objects.create(user=self.user, url="https://other.org/", status_code=404, crawled_at=now)
+        CrawlResult.objects.create(
+            user=User.objects.create_user("bob"), url="https://example.com/fremd", crawled_at=now
+        )
+
+    def test_keyset_pages_with_field_selection_and_filters(self):
+        url = reverse("api_results")
+        data = self.client.get(url, {"host": "example.com", "limit": 4, "fields": "url,paragraphs"}).json()
+        self.assertEqual(len(data["results"]), 4)
+        self.assertEqual(set(data["results"][0]), {"url", "paragraphs"})
+        # neueste zuerst, Inhalt aus dem Seiten-Cache
+        self.assertEqual(data["results"][0], {"url": "https://example.com/geteilt", "paragraphs": ["P"]})
+        rest = self.client.get(data["next"]).json()
+        self.assertEqual([r["url"] for r in rest["results"]], ["https://example.com/1", "https://example.com/0"])
+        self.assertIsNone(rest["next"])
+
+        data = self.client.get(url, {"status": "404"}).json()
+        self.assertEqual([r["url"] for r in data["results"]], ["https://other.org/"])
+        self.assertNotIn("headings", data["results"][0])
+        self.assertEqual(self.client.get(url, {"fields": "user"}).status_code, 400)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_conditional_requests_return_304_until_results_change(self):
+        url = reverse("api_results")
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        with self.assertNumQueries(3):  # Session, Benutzer, Versionszähler
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # andere Parameter sind eine andere Repräsentation
+        self.assertEqual(self.client.get(url, {"limit": 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Logs und Ergebnisse fremder Benutzer lassen das ETag unverändert
+        CrawlLog.objects.create(user=self.user, message="x")
+        CrawlResult.objects.create(
+            user=User.objects.get(username="bob"), url="https://example.com/neu", crawled_at=timezone.now()
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        CrawlResult.objects.filter(user=self.user, status_code=404).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        logs = self.client.get(reverse("api_logs")).json()
+        self.assertEqual([log["message"] for log in logs["results"]], ["x"])
+
+
+class CrawlStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def test_counters_follow_writes_and_deletes_and_can_be_rebuilt(self):
+        now = timezone.now()
+        CrawlResult.objects.create(user=self.user, url="https://a.example/1", crawled_at=now - timedelta(days=1))
+        CrawlResult.objects.create(user=self.user, url="https://a.example/2", crawled_at=now - timedelta(days=2))
+        CrawlResult.objects.create(user=self.user, url="https://b.example/", status_code=404, crawled_at=now)
+        # Recrawl per update_or_create ändert den Status
+        CrawlResult.objects.update_or_create(
+            user=self.user, url="https://a.example/2", defaults={"status_code": 500, "crawled_at": now}
+        )
+
+        expected = {
+            "total": 3,
+            "last_crawled_at": now,
+            "by_status": [("200", 1), ("404", 1), ("500", 1)],
+            "by_host": [("a.example", 2), ("b.example", 1)],
+            "other_hosts": 0,
+        }
+        with self.assertNumQueries(1):
+            self.assertEqual(user_stats(self.user), expected)
+
+        CrawlResult.objects.filter(status_code=404).delete()
+        stats = user_stats(self.user)
+        self.assertEqual((stats["total"], stats["by_host"]), (2, [("a.example", 2)]))
+        # Roh-SQL-Löschungen (crawler_tools) verbuchen die vorher gelesenen Zeilen
+        results_deleted([(self.user.id, "https://a.example/2", 500)])
+        self.assertEqual(user_stats(self.user)["by_status"], [("200", 1)])
+
+        # Reparatur nach Änderungen an den Signalen vorbei
+        CrawlStat.objects.filter(dimension="host").update(count=99)
+        call_command("rebuild_crawl_stats", stdout=StringIO())
+        self.assertEqual(user_stats(self.user)["by_host"], [("a.example", 2)])
 
-# Create your tests here.
+        response = self.client.get(reverse("dashboard"))
+        self.assertContains(response, "a.example: 2")
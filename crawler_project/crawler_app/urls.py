@@ -1,8 +1,13 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("dashboard/", views.dashboard, name="dashboard"),
     path("crawl/", views.start_crawl, name="start_crawl"),
+    path("crawl/<int:job_id>/", views.crawl_job, name="crawl_job"),
+    path("crawl/<int:job_id>/events/", views.crawl_job_events, name="crawl_job_events"),
+    path("results/<int:result_id>/related/", views.related_pages, name="related_pages"),
+    path("api/results/", api.results_api, name="api_results"),
+    path("api/logs/", api.logs_api, name="api_logs"),
     path("request-delete/", views.request_delete_view, name="request_delete"),
 ]
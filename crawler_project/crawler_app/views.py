@@ -1,11 +1,22 @@
-from django.shortcuts import render, redirect
+import asyncio
+import json
+import time
+
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
 from django.contrib import messages
+from django.http import Http404, HttpResponseForbidden, StreamingHttpResponse
 
 from .forms import CrawlForm, DeleteRequestForm
-from .models import CrawlResult, CrawlLog
-from .crawler import WebCrawler   # dein Crawler
+from .models import CrawlResult, CrawlLog, CrawlJob
+from .jobs import expire_stale_jobs, get_progress, job_state, start_crawl_job
+from .stats import user_stats
+from .term_index import is_indexed, related_results
+
+# SSE: Abfrageintervall für Fortschritt im Prozess bzw. aus der DB, Keepalive in Sekunden
+SSE_INTERVAL = 0.25
+SSE_DB_INTERVAL = 1.0
+SSE_KEEPALIVE = 15.0
 
 
 # ✅ Dashboard mit Logs + Ergebnissen
@@ -17,6 +28,7 @@ def dashboard(request):
     return render(request, "crawler_app/dashboard.html", {
         "results": results,
         "logs": logs,
+        "stats": user_stats(request.user),
     })
 
 
@@ -36,55 +48,29 @@ def start_crawl(request):
                 messages.warning(request, "Diese Seite wurde bereits gecrawlt!")
                 return redirect("dashboard")
 
+            # ✅ Kein zweiter Crawl, solange einer läuft
+            # verwaiste Jobs (Server-Neustart, toter Thread) blockieren keinen neuen Crawl
+            expire_stale_jobs(request.user)
+            active = CrawlJob.objects.filter(user=request.user, status__in=("pending", "running")).first()
+            if active:
+                messages.info(request, "Es läuft bereits ein Crawl.")
+                return redirect("crawl_job", job_id=active.id)
+
             # ✅ Log: Crawl gestartet
             CrawlLog.objects.create(
                 user=request.user,
                 message=f"Crawler gestartet für: {start_url}"
             )
 
-            crawler = WebCrawler(
+            # ✅ Crawl läuft im Hintergrund, Fortschritt kommt per Server-Sent Events
+            job = CrawlJob.objects.create(
+                user=request.user,
                 start_url=start_url,
                 max_pages=form.cleaned_data["max_pages"],
-                delay=form.cleaned_data["delay"]
-            )
-
-
-            total = form.cleaned_data["max_pages"]
-
-            # ✅ Crawl Schritt für Schritt
-            for i, item in enumerate(crawler.crawl()):
-                progress = int(((i + 1) / total) * 100)
-
-                # ✅ Ergebnis speichern
-                CrawlResult.objects.update_or_create(
-                    user=request.user,
-                    url=item["url"],
-                    defaults={
-                    "title": item["title"],
-                    "description": item["description"],
-                    "headings": item["headings"],
-                    "paragraphs": item["paragraphs"],
-                    "link_count": item["link_count"],
-                    "status_code": item["status_code"],
-                    "crawled_at": timezone.now(),
-                    }
-                )
-
-
-                # ✅ Log für jede gecrawlte Seite
-                CrawlLog.objects.create(
-                    user=request.user,
-                    message=f"Gecrawlt: {item['url']} (Status {item.get('status_code', 200)})"
-                )
-
-            # ✅ Log: Crawl beendet
-            CrawlLog.objects.create(
-                user=request.user,
-                message=f"Crawler beendet für: {start_url}"
+                delay=form.cleaned_data["delay"],
             )
-
-            messages.success(request, "Crawl erfolgreich abgeschlossen!")
-            return redirect("dashboard")
+            start_crawl_job(job)
+            return redirect("crawl_job", job_id=job.id)
 
     else:
         form = CrawlForm()
@@ -95,6 +81,78 @@ def start_crawl(request):
     })
 
 
+# ✅ Ähnliche Seiten zu einem Ergebnis (TF-IDF über Titel, Überschriften, Absätze)
+@login_required
+def related_pages(request, result_id):
+    result = get_object_or_404(CrawlResult, pk=result_id, user=request.user)
+    # ✅ Nur lesen: der Index wird nach jedem Crawl bzw. per "manage.py update_term_index" gepflegt
+    try:
+        related = related_results(result)
+        if not related and not is_indexed(result):
+            messages.info(request, "Diese Seite ist noch nicht im Ähnlichkeitsindex, bitte später erneut versuchen.")
+    except RuntimeError as e:
+        messages.error(request, str(e))
+        related = []
+    return render(request, "crawler_app/related_pages.html", {
+        "result": result,
+        "related": related,
+    })
+
+
+# ✅ Fortschrittsseite eines Crawls
+@login_required
+def crawl_job(request, job_id):
+    job = get_object_or_404(CrawlJob, pk=job_id, user=request.user)
+    return render(request, "crawler_app/crawl_job.html", {
+        "job": job,
+        "state": job_state(job),
+    })
+
+
+async def _progress_events(job_id):
+    last_version = None
+    last_sent = time.monotonic()
+    while True:
+        state = get_progress(job_id)
+        if state is None:
+            # Job läuft in einem anderen Prozess oder ist längst fertig: Zustand aus der DB
+            job = await CrawlJob.objects.filter(pk=job_id).afirst()
+            if job is None:
+                return
+            state = job_state(job)
+            version = (job.status, job.pages_done, job.error_count)
+            interval = SSE_DB_INTERVAL
+        else:
+            version = state.pop("version")
+            interval = SSE_INTERVAL
+
+        if version != last_version:
+            last_version = version
+            last_sent = time.monotonic()
+            yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+            if state["status"] in ("done", "failed"):
+                yield f"event: done\ndata: {json.dumps(state)}\n\n"
+                return
+        elif time.monotonic() - last_sent > SSE_KEEPALIVE:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        await asyncio.sleep(interval)
+
+
+# ✅ Live-Fortschritt als Server-Sent Events (ASGI)
+async def crawl_job_events(request, job_id):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+    if not await CrawlJob.objects.filter(pk=job_id, user=user).aexists():
+        raise Http404("Crawl nicht gefunden")
+    return StreamingHttpResponse(
+        _progress_events(job_id),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ✅ Löschanfrage an Admin senden
 @login_required
 def request_delete_view(request):
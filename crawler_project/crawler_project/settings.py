@@ -90,3 +90,7 @@ USE_TZ = True
 
 # Static files
 STATIC_URL = "static/"
+
+
+# Geteilter Seiten-Cache: so lange (Sekunden) gilt eine gecrawlte Seite für alle Benutzer als frisch
+CRAWL_PAGE_CACHE_TTL = 24 * 60 * 60
@@ -16,7 +16,15 @@ async function initDB() {
     // Kopiere Daten in FTS5 Tabelle, wenn nicht schon da
     const count = db.exec("SELECT COUNT(*) FROM crawled_fts")[0].values[0][0];
     if (count == 0) {
-        const data = db.exec("SELECT url, title, description, headings, paragraphs, link_count, crawled_at, status_code FROM crawled");
+        // Inhalte neuer Ergebnisse liegen im geteilten Seiten-Cache (crawled_pages)
+        const data = db.exec(`
+            SELECT c.url, c.title,
+                   COALESCE(NULLIF(c.description, ''), p.description, ''),
+                   CASE WHEN c.page_id IS NOT NULL THEN p.headings ELSE c.headings END,
+                   CASE WHEN c.page_id IS NOT NULL THEN p.paragraphs ELSE c.paragraphs END,
+                   c.link_count, c.crawled_at, c.status_code
+            FROM crawled c LEFT JOIN crawled_pages p ON p.id = c.page_id
+        `);
         data[0].values.forEach(row => {
             db.run("INSERT INTO crawled_fts (url, title, description, headings, paragraphs, link_count, crawled_at, status_code) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row);
         });
@@ -27,7 +35,16 @@ function search() {
     const query = document.getElementById('searchInput').value;
     if (!query) return;
 
-    const results = db.exec(`SELECT url, title, description, crawled_at FROM crawled_fts WHERE crawled_fts MATCH ?`, [query]);
+    // mit Link-Ranking (webcrawler.py --rank): BM25 um bis zu Faktor 2 nach PageRank verstärken
+    const hasRank = db.exec("SELECT 1 FROM pragma_table_info('crawled') WHERE name = 'pagerank'").length > 0;
+    const sql = hasRank
+        ? `SELECT crawled_fts.url, crawled_fts.title, crawled_fts.description, crawled_fts.crawled_at
+           FROM crawled_fts
+           LEFT JOIN (SELECT url, MAX(pagerank) AS pagerank FROM crawled GROUP BY url) r ON r.url = crawled_fts.url
+           WHERE crawled_fts MATCH ?
+           ORDER BY bm25(crawled_fts) * (1 + COALESCE(r.pagerank / (SELECT NULLIF(MAX(pagerank), 0) FROM crawled), 0))`
+        : `SELECT url, title, description, crawled_at FROM crawled_fts WHERE crawled_fts MATCH ? ORDER BY bm25(crawled_fts)`;
+    const results = db.exec(sql, [query]);
     const resultsDiv = document.getElementById('results');
     resultsDiv.innerHTML = '';
 
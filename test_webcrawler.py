@@ -1,8 +1,38 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import json
+import os
+import tempfile
+import gzip
+import threading
+import time
+import zlib
+import sqlite3
+import subprocess
+import sys
 
-from webcrawler import WebCrawler
+from webcrawler import (
+    WebCrawler, CrawlProfiler, URLCanonicalizer, RobotsMatcher, decode_html,
+    Frontier, path_pattern_scorer, DEFAULT_SCORERS, BREADTH_FIRST_SCORERS, TrapDetector,
+    ClusterCoordinator, ClusterWorker, partition_for,
+    HostController, parse_retry_after,
+    HTTPCache, freshness_lifetime, iter_hrefs,
+    LinkGraph, rank_link_graph,
+    RecrawlPlanner, DueURL, estimate_change_rate,
+    CrawlRecord, ExtractionProfile, TermIndex, export_crawled,
+    dedupe_json_file, compact_crawled_table, main,
+)
+
+
+def make_response(text, status=200, headers=None):
+    m = MagicMock()
+    m.status_code = status
+    m.text = text
+    m.encoding = 'utf-8'
+    m.headers = {'Content-Type': 'text/html; charset=utf-8'} if headers is None else headers
+    body = text.encode('utf-8')
+    m.iter_content.side_effect = lambda chunk_size=1: (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    return m
 
 
 class TestWebCrawlerIntegration(unittest.TestCase):
@@ -17,19 +47,15 @@ class TestWebCrawlerIntegration(unittest.TestCase):
         self.mock_get = self.requests_patcher.start()
         self.addCleanup(self.requests_patcher.stop)
 
-        def requests_side_effect(url, headers=None, timeout=None):
+        def requests_side_effect(url, headers=None, timeout=None, stream=False):
             # robots.txt
             if url.rstrip('/').endswith('/robots.txt'):
-                m = MagicMock()
-                m.status_code = 200
-                m.text = "User-agent: *\nDisallow:"
-                return m
+                return make_response("User-agent: *\nDisallow:", headers={'Content-Type': 'text/plain'})
             # simple HTML for pages
-            m = MagicMock()
-            m.status_code = 200
-            m.text = '<html><head><title>Test Page</title><meta name="description" content="desc"></head>' \
-                     '<body><h1>H1</h1><p>para</p><a href="/link1">L</a></body></html>'
-            return m
+            return make_response(
+                '<html><head><title>Test Page</title><meta name="description" content="desc"></head>'
+                '<body><h1>H1</h1><p>para</p><a href="/link1">L</a></body></html>'
+            )
 
         self.mock_get.side_effect = requests_side_effect
 
@@ -59,7 +85,7 @@ class TestWebCrawlerIntegration(unittest.TestCase):
 
     def test_fetch_page_handles_error(self):
         # make requests.get raise for page fetch
-        def raise_on_page(url, headers=None, timeout=None):
+        def raise_on_page(url, headers=None, timeout=None, stream=False):
             if url.rstrip('/').endswith('/robots.txt'):
                 m = MagicMock(); m.status_code = 200; m.text = "User-agent: *\nDisallow:"; return m
             raise RuntimeError("network error")
@@ -68,6 +94,63 @@ class TestWebCrawlerIntegration(unittest.TestCase):
         page = self.crawler.fetch_page('https://example.com/some')
         self.assertIsNone(page)
 
+    def test_fetch_page_guards_content_type_and_size(self):
+        html = '<html><body>' + 'x' * 100 + '</body></html>'
+        responses = {
+            'https://example.com/img': make_response('PNG', headers={'Content-Type': 'image/png'}),
+            'https://example.com/big': make_response(html, headers={'Content-Type': 'text/html', 'Content-Length': '999999'}),
+            'https://example.com/chunked': make_response(html, headers={'Content-Type': 'text/html'}),
+        }
+        self.mock_get.side_effect = lambda url, **kwargs: responses[url]
+        self.crawler.max_page_bytes = 50
+        self.assertIsNone(self.crawler.fetch_page('https://example.com/img'))
+        self.assertIsNone(self.crawler.fetch_page('https://example.com/big'))
+        self.assertEqual(len(self.crawler.fetch_page('https://example.com/chunked')), 50)
+        self.assertEqual(self.crawler.skipped['content_type'], 1)
+        self.assertEqual(self.crawler.skipped['too_large'], 1)
+        self.assertEqual(self.crawler.skipped['truncated'], 1)
+        for response in responses.values():
+            response.close.assert_called_once()
+        self.assertTrue(all(kwargs.get('stream') for _, kwargs in self.mock_get.call_args_list[-3:]))
+
+    def test_decode_html_charset_paths(self):
+        text = 'Grüße'
+        self.assertEqual(decode_html(text.encode('latin-1'), 'text/html; charset=ISO-8859-1')[1:], ('cp1252', 'header'))
+        self.assertEqual(decode_html(b'\xef\xbb\xbf' + text.encode('utf-8'), 'text/html; charset=latin-1')[:3:2], (text, 'bom'))
+        meta = '<html><head><meta charset="windows-1252"></head><body>Grüße</body></html>'.encode('cp1252')
+        self.assertEqual(decode_html(meta, 'text/html')[2], 'meta')
+        http_equiv = b'<meta http-equiv="Content-Type" content="text/html; charset=koi8-r">' + 'Привет'.encode('koi8-r')
+        decoded, encoding, source = decode_html(http_equiv)
+        self.assertEqual((encoding, source), ('koi8-r', 'meta'))
+        self.assertIn('Привет', decoded)
+        self.assertEqual(decode_html(text.encode('utf-8'))[1:], ('utf-8', 'utf-8'))
+
+    def test_fetch_page_records_charset_path(self):
+        self.crawler.fetch_page('https://example.com/page')
+        self.assertEqual(self.crawler.charset_stats['header']['pages'], 1)
+
+    def test_binary_extensions_skipped_before_request(self):
+        calls = self.mock_get.call_count
+        self.assertIsNone(self.crawler.fetch_page('https://example.com/report.PDF'))
+        self.assertEqual(self.mock_get.call_count, calls)
+        self.assertFalse(self.crawler.is_valid_url('https://example.com/photo.jpg'))
+        self.crawler.skip_binary_extensions = False
+        self.assertTrue(self.crawler.is_valid_url('https://example.com/photo.jpg'))
+
+    def test_skipped_url_does_not_consume_politeness_delay(self):
+        crawler = WebCrawler('https://example.com', max_pages=5, delay=2)
+        crawler.robot_parser = RobotsMatcher()
+        crawler.robot_parser.parse(['User-agent: *', 'Disallow: /privat'])
+        crawler.to_visit.pop()  # Start-URL
+        crawler.to_visit.push('https://example.com/a.pdf')
+        crawler.to_visit.push('https://example.com/privat/x')
+        calls = self.mock_get.call_count
+        self.assertFalse(crawler.crawl_next())
+        self.assertFalse(crawler.crawl_next())
+        self.assertEqual(self.mock_get.call_count, calls)
+        self.assertEqual(crawler.skipped['extension'], 1)
+        self.assertEqual(crawler.ready_in(), 0)
+
     def test_crawl_respects_max_pages_and_saves_data(self):
         data = self.crawler.crawl()
         # max_pages=3 so visited should be <=3
@@ -78,6 +161,29 @@ class TestWebCrawlerIntegration(unittest.TestCase):
                 self.assertIn('url', item)
                 self.assertIn('title', item)
 
+    def test_construction_defers_robots_db_and_heavy_imports(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            calls = self.mock_get.call_count
+            crawler = WebCrawler('https://example.com', max_pages=1, delay=0, save_to_db=True,
+                                 db_path=os.path.join(tmp, 'lazy.db'))
+            self.assertEqual(self.mock_get.call_count, calls)
+            self.assertEqual(os.listdir(tmp), [])
+            crawler.crawl()
+            self.assertIsNotNone(crawler.robot_parser)
+            self.assertIn('lazy.db', os.listdir(tmp))
+        result = subprocess.run(
+            [sys.executable, '-c', 'import sys, webcrawler; print("requests" in sys.modules, "bs4" in sys.modules)'],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        self.assertEqual(result.stdout.split(), ['False', 'False'])
+
+    def test_lazy_attributes_raise_attribute_error_when_load_fails(self):
+        crawler = WebCrawler('https://example.com', max_pages=1, delay=0)
+        with patch.object(WebCrawler, 'load_existing_data', side_effect=RuntimeError('kaputt')):
+            self.assertFalse(hasattr(crawler, 'visited'))
+            self.assertIsNone(getattr(crawler, 'data', None))
+        self.assertEqual(crawler.visited, set())
+
     def test_start_url_already_in_existing_data_aborts(self):
         # simulate existing JSON with start_url present
         existing = [{'url': 'https://example.com', 'title': 'old'}]
@@ -92,6 +198,768 @@ class TestWebCrawlerIntegration(unittest.TestCase):
             # data should equal the loaded existing data
             self.assertEqual(crawler2.data, existing)
 
+    def test_normalize_url_canonicalizes_variants(self):
+        canonical = "https://example.com/a/b?page=2&q=x"
+        variants = [
+            "https://EXAMPLE.com:443/a/b/?q=x&page=2",
+            "https://example.com/a/./c/../b?utm_source=news&page=2&q=x#top",
+            "https://example.com/a/b;jsessionid=ABC?page=2&q=x&sessionid=1&fbclid=z",
+        ]
+        for url in variants:
+            self.assertEqual(self.crawler.normalize_url(url), canonical)
+        self.assertEqual(self.crawler.normalize_url("http://example.com:8080"), "http://example.com:8080/")
+        self.assertEqual(self.crawler.normalize_url("https://example.com/%7euser"), "https://example.com/~user")
+
+    def test_canonicalizer_configuration_and_cache(self):
+        canonicalizer = URLCanonicalizer(strip_params=["ref", "trk_*"], sort_query=False, cache_size=8)
+        self.assertEqual(
+            canonicalizer.normalize("https://example.com/?z=1&ref=a&trk_id=2&a=3&utm_source=x"),
+            "https://example.com/?z=1&a=3&utm_source=x",
+        )
+        canonicalizer.normalize("https://example.com/?z=1&ref=a&trk_id=2&a=3&utm_source=x")
+        self.assertEqual(canonicalizer.cache_info().hits, 1)
+
+    def test_extract_links_dedupes_url_variants(self):
+        html = '<a href="/p?b=2&a=1">1</a><a href="/p/?a=1&b=2&utm_medium=x">2</a><a href="/P">3</a>'
+        links = self.crawler.extract_links("https://example.com", html)
+        self.assertEqual(links, ["https://example.com/p?a=1&b=2", "https://example.com/P"])
+
+    def test_robots_matcher_wildcards_and_longest_match(self):
+        matcher = RobotsMatcher()
+        matcher.parse([
+            "User-agent: *",
+            "Disallow: /private",
+            "Allow: /private/public",
+            "Disallow: /*.pdf$",
+            "Disallow: /*?sessionid=",
+            "Allow: /search$",
+            "Disallow: /search",
+            "Sitemap: https://example.com/sitemap.xml",
+            "",
+            "User-agent: OtherBot",
+            "Disallow: /",
+        ])
+        ua = self.crawler.headers["User-Agent"]
+        self.assertFalse(matcher.allowed(ua, "/private/x"))
+        self.assertTrue(matcher.allowed(ua, "/private/public/x"))
+        self.assertFalse(matcher.allowed(ua, "/docs/file.pdf"))
+        self.assertTrue(matcher.allowed(ua, "/docs/file.pdf?download=1"))
+        self.assertFalse(matcher.allowed(ua, "/list?sessionid=1"))
+        self.assertTrue(matcher.allowed(ua, "/search"))
+        self.assertFalse(matcher.allowed(ua, "/search?q=x"))
+        self.assertTrue(matcher.allowed(ua, "/other"))
+        self.assertFalse(matcher.can_fetch("OtherBot/1.0", "https://example.com/other"))
+        self.assertEqual(matcher.sitemaps, ["https://example.com/sitemap.xml"])
+        matcher.allowed(ua, "/private/x")
+        self.assertEqual(matcher.cache_info(ua).hits, 1)
+
+    def test_is_valid_url_uses_robots_rules(self):
+        self.crawler.robot_parser = RobotsMatcher()
+        self.crawler.robot_parser.parse(["User-agent: *", "Disallow: /*/edit"])
+        self.assertFalse(self.crawler.is_valid_url("https://example.com/wiki/edit"))
+        self.assertTrue(self.crawler.is_valid_url("https://example.com/wiki/view"))
+
+    def test_frontier_orders_by_score_and_enforces_limits(self):
+        scorers = list(DEFAULT_SCORERS) + [(path_pattern_scorer({r'/page/\d+': -5}), 1.0)]
+        frontier = Frontier(scorers=scorers, max_depth=2, path_budgets={'/blog': 1})
+        frontier.push('https://example.com/page/2', depth=1)
+        frontier.push('https://example.com/a', depth=1)
+        frontier.push('https://example.com/b', depth=1)
+        frontier.push('https://example.com/blog/1', depth=2)
+        frontier.push('https://example.com/blog/2', depth=2)
+        self.assertFalse(frontier.push('https://example.com/deep', depth=3))
+        self.assertFalse(frontier.push('https://example.com/a', depth=1))
+        frontier.add_inlink('https://example.com/b')
+        order = []
+        while True:
+            entry = frontier.pop()
+            if entry is None:
+                break
+            order.append(entry)
+        self.assertEqual(order, [
+            ('https://example.com/b', 1),
+            ('https://example.com/a', 1),
+            ('https://example.com/blog/1', 2),
+            ('https://example.com/page/2', 1),
+        ])
+        self.assertEqual(frontier.dropped, {'depth': 1, 'budget': 1, 'trap': 0})
+        self.assertEqual(len(frontier), 0)
+
+    def test_budgeted_crawl_reaches_linked_pages_before_pagination(self):
+        # /page/2 wird zuerst entdeckt, /wichtig ist aber von drei Seiten verlinkt
+        pages = {
+            'https://example.com/': '<a href="/page/2">2</a><a href="/x">x</a><a href="/y">y</a>',
+            'https://example.com/page/2': '<a href="/page/3">3</a><a href="/wichtig">w</a>',
+            'https://example.com/x': '<a href="/wichtig">w</a>',
+            'https://example.com/y': '<a href="/wichtig">w</a>',
+        }
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            return make_response(pages.get(url, '<title>Blatt</title>'))
+
+        self.mock_get.side_effect = side_effect
+        crawled = {}
+        for scorers in (DEFAULT_SCORERS, BREADTH_FIRST_SCORERS):
+            crawler = WebCrawler("https://example.com/", max_pages=5, delay=0, scorers=scorers)
+            crawler.crawl()
+            crawled[scorers] = crawler.visited
+        self.assertIn('https://example.com/wichtig', crawled[DEFAULT_SCORERS])
+        self.assertNotIn('https://example.com/page/3', crawled[DEFAULT_SCORERS])
+        # reine Breitensuche verbraucht das Budget für die Paginierung
+        self.assertIn('https://example.com/page/3', crawled[BREADTH_FIRST_SCORERS])
+        self.assertNotIn('https://example.com/wichtig', crawled[BREADTH_FIRST_SCORERS])
+
+    def test_cli_rejects_malformed_budget_and_priority(self):
+        for flag, value in (('--path-budget', '/blog'), ('--path-budget', '/blog=x'),
+                            ('--path-priority', 'foo'), ('--path-priority', 'a=zz'), ('--path-priority', '(=1')):
+            with patch('sys.argv', ['webcrawler.py', flag, value]), patch('sys.stderr'), \
+                    self.assertRaises(SystemExit) as ctx:
+                main()
+            self.assertEqual(ctx.exception.code, 2, value)
+
+    def test_trap_detector_blocks_templates_repeats_and_query_explosion(self):
+        traps = TrapDetector(max_per_template=3, max_query_variants=2)
+        frontier = Frontier(traps=traps)
+        added = [frontier.push(f'https://example.com/calendar/2026/{month:02d}') for month in range(1, 7)]
+        self.assertEqual(added, [True, True, True, False, False, False])
+        self.assertEqual(traps.template('https://example.com/s/0123abcd-ef01-4567-89ab-cdef01234567/p2?b=1&a=2'),
+                         ('example.com/s/{id}/p{n}', ['a', 'b']))
+        self.assertFalse(frontier.push('https://example.com/x/y/x/y/x'))
+        self.assertTrue(frontier.push('https://example.com/x/y/x'))
+        facets = ['color=red', 'size=m', 'color=red&size=m', 'color=blue']
+        self.assertEqual([frontier.push(f'https://example.com/shop?{q}') for q in facets], [True, True, False, True])
+        self.assertEqual(frontier.dropped['trap'], 5)
+        summary = traps.get_summary()
+        self.assertEqual(summary['dropped'], {'template': 3, 'repeat': 1, 'query': 1})
+        self.assertEqual(summary['blocked_templates'], {'example.com/calendar/{n}/{n}': 3})
+        self.assertEqual(summary['query_explosion'], {'example.com/shop': 1})
+
+    def test_crawl_tracks_link_depth(self):
+        self.crawler.to_visit.max_depth = 0
+        self.crawler.crawl()
+        self.assertEqual(self.crawler.visited, {'https://example.com/'})
+        self.assertEqual(self.crawler.to_visit.dropped['depth'], 1)
+
+    def test_ingest_sitemaps_index_and_gzip(self):
+        ns = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+        index = (f'<?xml version="1.0"?><sitemapindex {ns}>'
+                 '<sitemap><loc>https://example.com/sitemap-1.xml.gz</loc></sitemap></sitemapindex>')
+        urlset = (f'<?xml version="1.0"?><urlset {ns}>'
+                  '<url><loc>https://example.com/low</loc><priority>0.1</priority></url>'
+                  '<url><loc>https://example.com/high</loc><lastmod>2024-01-01</lastmod><priority>1.0</priority></url>'
+                  '<url><loc>https://other.com/x</loc></url>'
+                  '</urlset>')
+        responses = {
+            'https://example.com/sitemap.xml': make_response(index, headers={'Content-Type': 'application/xml'}),
+            'https://example.com/sitemap-1.xml.gz': make_response('', headers={}),
+        }
+        body = gzip.compress(urlset.encode('utf-8'))
+        responses['https://example.com/sitemap-1.xml.gz'].iter_content.side_effect = lambda chunk_size=1: iter([body[:10], body[10:]])
+        self.mock_get.side_effect = lambda url, **kwargs: responses[url]
+
+        queued = self.crawler.ingest_sitemaps(['https://example.com/sitemap.xml'])
+        self.assertEqual(queued, 2)
+        self.assertEqual(self.crawler.sitemap_stats['sitemaps'], 2)
+        self.assertEqual(self.crawler.to_visit.info['https://example.com/high']['lastmod'], '2024-01-01')
+        # Start-URL (Tiefe 0) zuerst, dann nach Sitemap-Priorität
+        popped = [self.crawler.to_visit.pop()[0] for _ in range(3)]
+        self.assertEqual(popped, ['https://example.com/', 'https://example.com/high', 'https://example.com/low'])
+
+    def test_cluster_partitions_hosts_and_forwards_links(self):
+        pages = {
+            'https://a.example/': '<a href="/1">1</a><a href="https://b.example/">b</a>',
+            'https://a.example/1': '<a href="https://b.example/2">b2</a><a href="https://ignored.example/">x</a>',
+            'https://b.example/': '<a href="https://a.example/1">a1</a>',
+            'https://b.example/2': 'ende',
+        }
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            return make_response(pages[url])
+
+        self.mock_get.side_effect = side_effect
+        self.assertNotEqual(partition_for('a.example', 2), partition_for('b.example', 2))
+        coordinator = ClusterCoordinator(2, ['https://a.example/'], max_pages=10)
+        workers = [
+            ClusterWorker(i, coordinator.address, scope_hosts={'a.example', 'b.example'},
+                          crawler_kwargs={'max_pages': 10, 'delay': 0}, sync_interval=0.01)
+            for i in range(2)
+        ]
+        threads = [threading.Thread(target=w.run) for w in workers]
+        for t in threads:
+            t.start()
+        summary = coordinator.serve()
+        for t in threads:
+            t.join(timeout=10)
+        self.assertEqual(summary['total_pages'], 4)
+        for worker in workers:
+            for host in worker.crawlers:
+                self.assertEqual(partition_for(host, 2), worker.worker_id)
+        visited = set().union(*(c.visited for w in workers for c in w.crawlers.values()))
+        self.assertEqual(visited, set(pages))
+
+    def test_cluster_budget_ignores_pages_from_earlier_runs(self):
+        pages = {'https://a.example/': '<a href="/1">1</a><a href="/2">2</a>', 'https://a.example/1': '', 'https://a.example/2': ''}
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            return make_response(pages[url])
+
+        self.mock_get.side_effect = side_effect
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = os.path.join(tmp, 'crawled.json')
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump([{'url': f'https://a.example/old{i}'} for i in range(20)], f)
+            with patch('webcrawler.os.path.exists', side_effect=lambda path: path == json_file):
+                coordinator = ClusterCoordinator(1, ['https://a.example/'], max_pages=5)
+                worker = ClusterWorker(0, coordinator.address, crawler_kwargs={
+                    'max_pages': 5, 'delay': 0, 'json_file': json_file}, sync_interval=0.01)
+                thread = threading.Thread(target=worker.run)
+                thread.start()
+                summary = coordinator.serve()
+                thread.join(timeout=10)
+        self.assertEqual(summary['total_pages'], 3)
+        self.assertEqual(worker.pages, 3)
+        self.assertEqual(len(worker.crawlers['a.example'].visited), 23)
+
+    def test_host_controller_aimd_and_circuit_breaker(self):
+        controller = HostController(min_delay=0.0, max_concurrency=4, failure_threshold=2, cooldown=10, max_trips=2)
+        for _ in range(10):
+            controller.record_success(0.1)
+        self.assertEqual(controller.allowed_in_flight(), 4)
+        controller.record_throttle(retry_after=5)
+        self.assertEqual(controller.allowed_in_flight(), 2)
+        self.assertGreater(controller.delay, 0)
+        self.assertGreater(controller.wait_time(), 4)
+        controller.record_failure()
+        controller.record_failure()
+        self.assertEqual(controller.stats['circuit_trips'], 1)
+        self.assertEqual(controller.allowed_in_flight(), 1)
+        self.assertGreater(controller.wait_time(), 9)
+        controller.record_failure()
+        self.assertTrue(controller.dead)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120.0)
+        self.assertIsNone(parse_retry_after('bogus'))
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+
+    def test_retryable_responses_are_requeued(self):
+        attempts = []
+
+        def flaky(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            attempts.append(url)
+            if len(attempts) < 3:
+                m = make_response('busy', status=429, headers={'Retry-After': '0'})
+                m.raise_for_status.side_effect = RuntimeError('429')
+                return m
+            return make_response('<title>ok</title>')
+
+        self.mock_get.side_effect = flaky
+        self.crawler.max_pages = 1
+        with patch('webcrawler.backoff_delay', return_value=0.0):
+            data = self.crawler.crawl()
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(self.crawler.retry_stats['requeued'], 2)
+        self.assertEqual(self.crawler.controller.stats['throttled'], 2)
+        self.assertEqual([d['title'] for d in data], ['ok'])
+
+    def test_concurrent_crawl_fetches_all_pages(self):
+        pages = {'https://example.com/': ''.join(f'<a href="/p{i}">p</a>' for i in range(6))}
+        pages.update({f'https://example.com/p{i}': f'<title>{i}</title>' for i in range(6)})
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            return make_response(pages[url])
+
+        self.mock_get.side_effect = side_effect
+        self.crawler.max_pages = 10
+        self.crawler.controller.max_concurrency = 4
+        self.crawler.crawl()
+        self.assertEqual(self.crawler.visited, set(pages))
+        self.assertGreater(self.crawler.controller.window, 1)
+
+    def test_pipeline_crawl_matches_loop_and_applies_backpressure(self):
+        pages = {'https://example.com/': ''.join(f'<a href="/p{i}">p</a>' for i in range(6))}
+        pages.update({f'https://example.com/p{i}': f'<title>{i}</title><a href="/">home</a>' for i in range(6)})
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            return make_response(pages[url])
+
+        self.mock_get.side_effect = side_effect
+        with tempfile.TemporaryDirectory() as tmp:
+            crawler = WebCrawler("https://example.com", max_pages=10, delay=0, save_to_db=True,
+                                 db_path=os.path.join(tmp, 'crawl.db'),
+                                 pipeline_workers={'fetch': 2, 'parse': 2}, pipeline_queue_size=1)
+            save = crawler.save_record_to_db
+
+            def slow_save(record):
+                time.sleep(0.02)
+                save(record)
+
+            crawler.save_record_to_db = slow_save
+            crawler.crawl()
+            self.assertEqual(crawler.visited, set(pages))
+            self.assertEqual(sorted(item.url for item in crawler.data), sorted(pages))
+            conn = sqlite3.connect(crawler.db_path)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM crawled').fetchone()[0], 7)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM link_edges').fetchone()[0], 7)
+            conn.close()
+        stats = crawler.get_summary()['pipeline']
+        self.assertEqual(stats['fetch']['items'], 7)
+        self.assertEqual(stats['persist']['items'], 14)
+        # persist ist der Engpass: enqueue wartet auf Platz, die Queue wächst nicht über ihre Größe
+        self.assertGreater(stats['persist']['backpressure_s'], 0)
+        self.assertLessEqual(stats['persist']['max_queue'], 1)
+        self.assertIsNone(crawler.persist_stage)
+
+    def test_freshness_lifetime_rules(self):
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'max-age=60', 'Age': '10'}), 50.0)
+        self.assertIsNone(freshness_lifetime({'Cache-Control': 'no-store'}))
+        self.assertEqual(freshness_lifetime({'Cache-Control': 'no-cache, max-age=60'}), 0.0)
+        self.assertEqual(freshness_lifetime({
+            'Date': 'Wed, 21 Oct 2015 07:00:00 GMT', 'Expires': 'Wed, 21 Oct 2015 08:00:00 GMT',
+        }), 3600.0)
+        # heuristisch: 10 % der Zeit seit Last-Modified
+        self.assertEqual(freshness_lifetime({
+            'Date': 'Wed, 21 Oct 2015 10:00:00 GMT', 'Last-Modified': 'Wed, 21 Oct 2015 00:00:00 GMT',
+        }), 3600.0)
+
+    def test_http_cache_dedupes_bodies_and_evicts_lru(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HTTPCache(tmp, max_bytes=0)
+            headers = {'Content-Type': 'text/html', 'Cache-Control': 'max-age=60'}
+            cache.store('https://example.com/a', 200, headers, b'same body')
+            cache.store('https://example.com/b', 200, headers, b'same body')
+            self.assertFalse(cache.store('https://example.com/c', 200, {'Cache-Control': 'no-store'}, b'x'))
+            self.assertEqual(len(os.listdir(os.path.join(tmp, 'objects'))), 1)
+            hit = cache.lookup('https://example.com/a')
+            self.assertEqual((hit.body, hit.fresh, hit.headers['Content-Type']), (b'same body', True, 'text/html'))
+
+            # Limit: gemeinsamer Body + neuer Body; der am längsten ungenutzte Eintrag (e) fliegt,
+            # b verschwindet aus dem Index, sein Objekt bleibt für a erhalten
+            cache.store('https://example.com/e', 200, headers, b'e body')
+            cache.lookup('https://example.com/a')
+            cache.max_bytes = len(zlib.compress(b'same body', 6)) + len(zlib.compress(b'f body', 6))
+            cache.store('https://example.com/f', 200, headers, b'f body')
+            self.assertIsNone(cache.lookup('https://example.com/e'))
+            self.assertIsNone(cache.lookup('https://example.com/b'))
+            self.assertEqual(cache.lookup('https://example.com/a').body, b'same body')
+            self.assertEqual(cache.get_summary()['entries'], 2)
+            self.assertEqual(cache.stats['evicted'], 2)
+            cache.close()
+
+    def test_http_cache_skips_oversized_bodies_and_keeps_new_entry(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            headers = {'Cache-Control': 'max-age=60'}
+            small, large = b'small body', os.urandom(4096)
+            cache = HTTPCache(tmp, max_bytes=len(zlib.compress(small, 6)) + 100)
+            self.assertTrue(cache.store('https://example.com/a', 200, headers, small))
+            # größer als das ganze Limit: wird nicht gespeichert und verdrängt nichts
+            self.assertFalse(cache.store('https://example.com/big', 200, headers, large))
+            self.assertEqual(cache.stats['too_large'], 1)
+            self.assertEqual(cache.lookup('https://example.com/a').body, small)
+
+            # passt allein, aber nicht zusammen mit a: a fliegt, der neue Eintrag bleibt
+            cache.max_bytes = len(zlib.compress(large, 6))
+            self.assertTrue(cache.store('https://example.com/big', 200, headers, large))
+            self.assertIsNone(cache.lookup('https://example.com/a'))
+            self.assertEqual(cache.lookup('https://example.com/big').body, large)
+            self.assertEqual(cache.stats['evicted'], 1)
+            cache.close()
+
+    def test_fetch_page_uses_http_cache_and_offline_replay(self):
+        requested = []
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            requested.append(headers.get('If-None-Match'))
+            if headers.get('If-None-Match') == '"v1"':
+                return make_response('', status=304, headers={'Cache-Control': 'max-age=60'})
+            return make_response('<title>cached</title>', headers={
+                'Content-Type': 'text/html', 'ETag': '"v1"', 'Cache-Control': 'no-cache',
+            })
+
+        with tempfile.TemporaryDirectory() as tmp:
+            crawler = WebCrawler("https://example.com", max_pages=3, delay=0, http_cache_dir=tmp)
+            self.mock_get.side_effect = side_effect
+            url = "https://example.com/page"
+            self.assertIn('cached', crawler.fetch_page(url))
+            # no-cache: revalidieren, 304 liefert den gespeicherten Body und macht ihn frisch
+            outcome = {}
+            self.assertIn('cached', crawler.fetch_page(url, outcome))
+            self.assertEqual(outcome['cache'], 'revalidated')
+            outcome = {}
+            self.assertIn('cached', crawler.fetch_page(url, outcome))
+            self.assertEqual(outcome['cache'], 'hit')
+            self.assertEqual(requested, [None, '"v1"'])
+            crawler.http_cache.close()
+
+            self.mock_get.reset_mock()
+            offline = WebCrawler("https://example.com", max_pages=3, delay=0, http_cache_dir=tmp, offline=True)
+            self.assertIn('cached', offline.fetch_page(url))
+            self.assertIsNone(offline.fetch_page("https://example.com/unknown"))
+            self.mock_get.assert_not_called()
+            offline.http_cache.close()
+
+    def test_iter_hrefs_matches_html_parser(self):
+        html = (
+            '<A HREF="/a?x=1&amp;y=2">a</A><a class="x" href=\'/b\'>b</a><a href=/c>c</a>'
+            '<a data-href="/nope" href="/d">d</a><a name="anker">kein href</a>'
+            '<!-- <a href="/kommentar"> --><script>var s = \'<a href="/js">\';</script>'
+        )
+        self.assertEqual(list(iter_hrefs(html)), ['/a?x=1&y=2', '/b', '/c', '/d'])
+
+    def test_discovery_mode_records_only_link_graph(self):
+        pages = {
+            'https://example.com/': '<title>Start</title><p>Text</p><a href="/a">a</a><a href="/kaputt">k</a>',
+            'https://example.com/a': '<a href="/">zurück</a>',
+        }
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url in pages:
+                return make_response(pages[url])
+            m = make_response('weg', status=404)
+            m.raise_for_status.side_effect = RuntimeError('404')
+            return m
+
+        self.mock_get.side_effect = side_effect
+        crawler = WebCrawler("https://example.com", max_pages=5, delay=0, discovery_only=True)
+        with patch.object(crawler, 'extract_content') as extract_content:
+            data = crawler.crawl()
+        extract_content.assert_not_called()
+        by_url = {d['url']: d for d in data}
+        self.assertEqual(by_url['https://example.com/']['outlinks'], ['https://example.com/a', 'https://example.com/kaputt'])
+        self.assertEqual(by_url['https://example.com/kaputt']['status'], 404)
+        self.assertEqual(set(by_url['https://example.com/a']), {'url', 'status', 'outlinks', 'crawled_at'})
+
+    def test_link_graph_pagerank_and_hits(self):
+        import numpy as np
+        # 0 -> 1, 0 -> 2, 1 -> 2, 2 -> 0, 3 -> 2 (3 hat keine Inlinks)
+        graph = LinkGraph(['a', 'b', 'c', 'd'], np.array([0, 2, 3, 4, 5]), np.array([1, 2, 2, 0, 2], dtype=np.int32))
+        rank = graph.pagerank(damping=0.85)
+        # Referenz: dichte Potenziteration
+        m = np.zeros((4, 4))
+        for src, dst in [(0, 1), (0, 2), (1, 2), (2, 0), (3, 2)]:
+            m[dst, src] = 1.0
+        m /= m.sum(axis=0)
+        expected = np.full(4, 0.25)
+        for _ in range(200):
+            expected = 0.85 * m @ expected + 0.15 / 4
+        np.testing.assert_allclose(rank, expected / expected.sum(), atol=1e-8)
+        self.assertEqual(int(rank.argmax()), 2)
+        hubs, authorities = graph.hits()
+        self.assertEqual(int(authorities.argmax()), 2)
+        self.assertAlmostEqual(float(authorities[3]), 0.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'graph.npz')
+            graph.save(path)
+            loaded = LinkGraph.load(path)
+            self.assertEqual(loaded.urls, graph.urls)
+            np.testing.assert_array_equal(loaded.indices, graph.indices)
+
+    def test_crawl_persists_edges_and_ranks_pages(self):
+        pages = {
+            'https://example.com/': '<a href="/a">a</a><a href="/b">b</a>',
+            'https://example.com/a': '<a href="/b">b</a>',
+            'https://example.com/b': '<a href="/">start</a>',
+        }
+        self.mock_get.side_effect = lambda url, headers=None, timeout=None, stream=False: make_response(
+            pages.get(url, '<title>x</title>')
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, 'crawl.db')
+            crawler = WebCrawler("https://example.com", max_pages=3, delay=0, save_to_db=True, db_path=db)
+            crawler.crawl()
+            graph = LinkGraph.from_db(db)
+            self.assertEqual((graph.num_nodes, graph.num_edges), (3, 4))
+
+            summary = rank_link_graph(db, os.path.join(tmp, 'graph.npz'))
+            self.assertEqual(summary['updated'][db], 3)
+            conn = sqlite3.connect(db)
+            ranked = [url for url, in conn.execute('SELECT url FROM crawled ORDER BY pagerank DESC')]
+            conn.close()
+            self.assertEqual(ranked[0], 'https://example.com/b')
+
+    def test_recrawl_planner_prefers_frequently_changing_pages(self):
+        day = 86400.0
+        self.assertAlmostEqual(estimate_change_rate(1, 0, 0, default_interval=7 * day), 1 / (7 * day))
+        self.assertEqual(estimate_change_rate(5, 0, 4 * day), 0.0)
+        self.assertGreater(estimate_change_rate(5, 4, 4 * day), estimate_change_rate(5, 1, 4 * day))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            planner = RecrawlPlanner(os.path.join(tmp, 'history.db'), max_interval=30 * day)
+            # /news ändert sich bei jedem täglichen Abruf, /about nie, /old wurde lange nicht abgerufen
+            for i in range(5):
+                self.assertEqual(planner.record('https://example.com/news', f'v{i}', now=i * day),
+                                 'new' if i == 0 else 'changed')
+                planner.record('https://example.com/about', 'same', now=i * day)
+            planner.record('https://example.com/old', 'x', now=-40 * day)
+            planner.record('https://other.org/', 'x', now=0)
+
+            due = planner.due(2, host='example.com', now=5 * day)
+            self.assertEqual([d.url for d in due], ['https://example.com/old', 'https://example.com/news'])
+            self.assertEqual(due[0].probability, 1.0)
+            probabilities = {d.url: d.probability for d in planner.due(10, now=5 * day)}
+            self.assertGreater(probabilities['https://example.com/news'], 0.5)
+            self.assertLess(probabilities['https://example.com/about'], 0.05)
+            # vor weniger als min_interval abgerufen: nicht fällig
+            recent = [d.url for d in planner.due(10, now=4 * day + 60)]
+            self.assertNotIn('https://example.com/news', recent)
+            self.assertNotIn('https://example.com/about', recent)
+
+    def test_recrawl_refetches_due_pages_and_replaces_content(self):
+        version = {'n': 1}
+        self.mock_get.side_effect = lambda url, headers=None, timeout=None, stream=False: make_response(
+            f'<title>v{version["n"]}</title><a href="/neu">neu</a>'
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, 'crawl.db')
+            crawler = WebCrawler("https://example.com", max_pages=1, delay=0, save_to_db=True, db_path=db)
+            crawler.crawl()
+            version['n'] = 2
+            due = [DueURL('https://example.com/', 0.9, 86400.0)]
+            recrawler = WebCrawler("https://example.com", max_pages=1, delay=0, save_to_db=True, db_path=db,
+                                   recrawl_urls=due)
+            data = recrawler.crawl()
+            self.assertEqual([d['title'] for d in data], ['v2'])
+            self.assertEqual(recrawler.history_stats, {'new': 0, 'changed': 1, 'unchanged': 0})
+            conn = sqlite3.connect(db)
+            self.assertEqual(conn.execute('SELECT title FROM crawled').fetchall(), [('v2',)])
+            self.assertEqual(conn.execute('SELECT fetch_count, change_count FROM fetch_history').fetchone(), (2, 1))
+            conn.close()
+
+    def test_crawl_record_is_compact_and_round_trips(self):
+        item = {
+            'url': 'https://example.com/a', 'title': 'A', 'description': 'd',
+            'headings': ['H1'], 'paragraphs': ['p'], 'link_count': 2,
+            'crawled_at': '2026-01-02T03:04:05.123456',
+        }
+        record = CrawlRecord.from_dict(item)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertIsInstance(record.crawled_at, float)
+        self.assertIs(record.host, CrawlRecord('https://example.com/b').host)
+        self.assertEqual(record.to_dict(), item)
+        self.assertEqual((record['title'], record.get('status', 404), 'url' in record), ('A', 404, True))
+        # unvollständige oder fremde Einträge bleiben Dicts
+        self.assertIsNone(CrawlRecord.from_dict({'url': 'https://example.com/', 'title': 'old'}))
+
+    def test_json_output_converts_records_lazily(self):
+        content = self.crawler.extract_content("https://example.com/x", '<title>X</title><h1>H</h1>')
+        self.assertIsInstance(content, CrawlRecord)
+        self.crawler.data = [content]
+        with tempfile.TemporaryDirectory() as tmp:
+            self.crawler.json_file = os.path.join(tmp, 'out.json')
+            self.crawler.save_to_json()
+            with open(self.crawler.json_file, encoding='utf-8') as f:
+                saved = json.load(f)
+        self.assertEqual(saved, [content.to_dict()])
+        self.assertEqual(saved[0]['headings'], ['H'])
+
+    def test_default_profile_matches_previous_extraction(self):
+        html = (
+            '<html><head><title> A &amp; B </title><meta name="description" content=" Info "></head><body>'
+            '<h1>Eins<script>var x = "<h2>nein</h2>";</script></h1><p>a<!-- c --><b>b</b><br/>c</p>'
+            '<h2>Zwei</h2><p>x<p>y</p>z</p><h3><![CDATA[cd]]></h3>'
+            + '<div><a href="/l">L</a></div><!-- <a href="/k"> -->' * 200
+            + '<script>var s = "<a href=/js>";</script><style/><a href="/ende">E</a></body></html>'
+        )
+        with patch('webcrawler.PARSE_CHUNK_SIZE', 64):
+            record = self.crawler.extract_content("https://example.com/x", html)
+        # gleiche Werte wie die frühere BeautifulSoup-Extraktion
+        self.assertEqual(record.title, 'A & B')
+        self.assertEqual(record.description, 'Info')
+        self.assertEqual(record.headings, ('Eins', 'Zwei', 'cd'))
+        self.assertEqual(record.paragraphs, ('abc', 'xyz', 'y'))
+        self.assertEqual(record.link_count, 201)
+
+    def test_custom_profile_extra_fields_and_head_only(self):
+        profile = {"fields": {
+            "title": {"selector": "h1.main", "default": "-"},
+            "canonical": {"selector": "link[rel=canonical]", "mode": "attr", "attr": "href"},
+            "teaser": {"selector": "div#teaser, p.teaser", "limit": 2},
+            "images": {"selector": "img", "mode": "count"},
+        }}
+        html = (
+            '<head><title>Kopf</title><link rel="canonical" href="https://example.com/c"></head>'
+            '<body><h1>Neben</h1><h1 class="x main">Haupt</h1><div id="teaser">T1</div>'
+            '<p class="teaser">T2</p><p class="teaser">T3</p><img src=a><img src=b></body>'
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'profil.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(profile, f)
+            self.crawler.extraction_profile = ExtractionProfile.load(path)
+        record = self.crawler.extract_content("https://example.com/x", html)
+        self.assertEqual(record.title, 'Haupt')
+        self.assertEqual(record['canonical'], 'https://example.com/c')
+        self.assertEqual(record.to_dict()['teaser'], ['T1', 'T2'])
+        self.assertEqual(record['images'], 2)
+
+        head = ExtractionProfile.load('head').extract('<title>Kopf</title><body><title>Body</title><meta name="description" content="x">')
+        self.assertEqual(head, {'title': 'Kopf', 'description': ''})
+        with self.assertRaises(ValueError):
+            ExtractionProfile({"x": {"selector": "nav a"}})
+
+    def test_term_index_updates_incrementally_and_finds_related_pages(self):
+        pages = {
+            'https://example.com/py': ('Python Tutorial', ['Python Grundlagen'], ['Listen und Schleifen in Python']),
+            'https://example.com/py2': ('Python Schleifen', [], ['Schleifen über Listen']),
+            'https://example.com/koch': ('Kochbuch', ['Rezepte'], ['Zutaten und Gewürze']),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            self.crawler.db_path = os.path.join(tmp, 'crawl.db')
+            self.crawler.init_db()
+            for url, (title, headings, paragraphs) in pages.items():
+                self.crawler.save_record_to_db(CrawlRecord(url, title, '', headings, paragraphs).to_dict())
+            index = TermIndex(self.crawler.db_path)
+            self.assertEqual(index.update(), {'added': 3, 'updated': 0, 'removed': 0})
+            self.assertEqual(index.update(), {'added': 0, 'updated': 0, 'removed': 0})
+            related = index.related('https://example.com/py', k=5)
+            self.assertEqual([page.url for page in related], ['https://example.com/py2'])
+            self.assertEqual(related[0].title, 'Python Schleifen')
+            self.assertIsNone(index.related('https://example.com/fehlt'))
+
+            # geänderte Seite wird neu tokenisiert, die Matrix danach neu aufgebaut
+            self.crawler.save_record_to_db(
+                CrawlRecord('https://example.com/koch', 'Python Kochbuch', '', [], ['Python Rezepte']).to_dict()
+            )
+            self.assertEqual(index.update()['updated'], 1)
+            self.assertEqual(
+                {page.url for page in index.related('https://example.com/py')},
+                {'https://example.com/py2', 'https://example.com/koch'},
+            )
+
+    def test_export_streams_filtered_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.crawler.db_path = os.path.join(tmp, 'crawl.db')
+            self.crawler.init_db()
+            for url in ('https://example.com/a', 'https://example.com/b', 'https://example.com.evil/', 'https://other.org/'):
+                self.crawler.save_record_to_db(CrawlRecord(url, 'T', '', ['H'], ['P']).to_dict())
+            path = os.path.join(tmp, 'out.jsonl')
+            summary = export_crawled(self.crawler.db_path, path, host='Example.com', batch_size=1)
+            self.assertEqual(summary['rows'], 2)
+            with open(path, encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+            self.assertEqual([row['url'] for row in rows], ['https://example.com/a', 'https://example.com/b'])
+            self.assertEqual(rows[0]['headings'], ['H'])
+            self.assertEqual(rows[0]['status_code'], 200)
+
+            csv_path = os.path.join(tmp, 'out.csv')
+            self.assertEqual(export_crawled(self.crawler.db_path, csv_path, until='2000-01-01')['rows'], 0)
+            self.assertEqual(export_crawled(self.crawler.db_path, csv_path, statuses=[200])['rows'], 4)
+            with open(csv_path, encoding='utf-8') as f:
+                self.assertTrue(f.readline().startswith('id,url,title'))
+
+    def test_compact_dedupes_json_and_crawled_table(self):
+        normalize = URLCanonicalizer().normalize
+        items = [{'url': f'https://example.com/{i % 7}' + ('?utm_source=x' if i % 2 else ''), 'n': i} for i in range(40)]
+        items.insert(3, {'title': 'ohne URL'})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(items, f, indent=2)
+            # winziges Budget erzwingt mehrere Partitionsdateien
+            stats = dedupe_json_file(path, normalize, memory_mb=0.001)
+            self.assertGreater(stats['partitions'], 1)
+            self.assertEqual((stats['kept'], stats['duplicates'], stats['without_url']), (7, 33, 1))
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            self.assertEqual(json.loads(text), items[:3] + items[4:8])
+            self.assertEqual(text, json.dumps(items[:3] + items[4:8], indent=2))
+            self.assertEqual(os.listdir(tmp), ['out.json'])
+
+            self.crawler.db_path = os.path.join(tmp, 'crawl.db')
+            self.crawler.init_db()
+            for url, crawled_at in (('https://example.com/a?utm_source=x', '2026-01-02'), ('https://example.com/a', '2026-01-01'),
+                                    ('https://example.com/b', '2026-01-01')):
+                self.crawler.save_record_to_db(dict(CrawlRecord(url, 'T', '', [], []).to_dict(), crawled_at=crawled_at))
+            stats = compact_crawled_table(self.crawler.db_path, normalize)
+            self.assertEqual((stats['rows'], stats['duplicates'], stats['vacuum']), (3, 1, 'full'))
+            self.assertEqual(compact_crawled_table(self.crawler.db_path, normalize)['vacuum'], 'incremental')
+            conn = sqlite3.connect(self.crawler.db_path)
+            urls = [row[0] for row in conn.execute('SELECT url FROM crawled ORDER BY url')]
+            conn.close()
+            self.assertEqual(urls, ['https://example.com/a?utm_source=x', 'https://example.com/b'])
+
+    def test_compact_django_table_updates_stats_and_versions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'db.sqlite3')
+            conn = sqlite3.connect(db_path)
+            conn.executescript("""
+                CREATE TABLE crawled (id INTEGER PRIMARY KEY, user_id INTEGER, url TEXT, status_code INTEGER, crawled_at TEXT);
+                CREATE TABLE crawler_app_crawlstat (id INTEGER PRIMARY KEY, user_id INTEGER, dimension TEXT, "key" TEXT,
+                    count INTEGER, last_crawled_at TEXT, UNIQUE (user_id, dimension, "key"));
+                CREATE TABLE crawler_app_userdataversion (user_id INTEGER PRIMARY KEY, results_version INTEGER,
+                    results_changed_at TEXT, logs_version INTEGER, logs_changed_at TEXT);
+                INSERT INTO crawled VALUES (1, 1, 'https://example.com/a?utm_source=x', 200, '2026-01-01'),
+                    (2, 1, 'https://example.com/a', 404, '2026-01-02'), (3, 2, 'https://example.com/a', 200, '2026-01-01');
+                INSERT INTO crawler_app_crawlstat (user_id, dimension, "key", count) VALUES
+                    (1, 'total', '', 2), (1, 'status', '200', 1), (1, 'status', '404', 1), (1, 'host', 'example.com', 2),
+                    (2, 'total', '', 1), (2, 'status', '200', 1), (2, 'host', 'example.com', 1);
+            """)
+            conn.close()
+            stats = compact_crawled_table(db_path, URLCanonicalizer().normalize)
+            self.assertEqual(stats['duplicates'], 1)
+            conn = sqlite3.connect(db_path)
+            counts = dict(((user, dim, key), count) for user, dim, key, count in conn.execute(
+                'SELECT user_id, dimension, "key", count FROM crawler_app_crawlstat'))
+            versions = conn.execute('SELECT user_id, results_version FROM crawler_app_userdataversion').fetchall()
+            conn.close()
+        # die ältere Zeile (Status 200) von Benutzer 1 fällt weg, Benutzer 2 bleibt unberührt
+        self.assertEqual(counts[(1, 'total', '')], 1)
+        self.assertEqual(counts[(1, 'status', '200')], 0)
+        self.assertEqual(counts[(1, 'status', '404')], 1)
+        self.assertEqual(counts[(1, 'host', 'example.com')], 1)
+        self.assertEqual(counts[(2, 'total', '')], 1)
+        self.assertEqual(versions, [(1, 1)])
+
+    def test_profiler_attributes_stages_and_writes_reports(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = CrawlProfiler(output_dir=tmp, profile=True, trace_memory=True, sample_hz=500)
+            profiler.run(self.crawler)
+            self.assertGreater(profiler.stage_stats['fetch_page']['calls'], 0)
+            self.assertGreater(profiler.stage_stats['normalize_url']['calls'], 0)
+            written = os.listdir(tmp)
+            for name in ('crawl.pstats', 'stages.txt', 'memory_top.txt'):
+                self.assertIn(name, written)
+        # Instrumentierung wird nach dem Lauf wieder entfernt
+        self.assertNotIn('fetch_page', self.crawler.__dict__)
+
+    def test_profiler_covers_pipeline_worker_threads(self):
+        pages = {'https://example.com/': ''.join(f'<a href="/p{i}">p</a>' for i in range(6))}
+        pages.update({f'https://example.com/p{i}': f'<title>{i}</title>' for i in range(6)})
+
+        def side_effect(url, headers=None, timeout=None, stream=False):
+            if url.endswith('/robots.txt'):
+                return make_response('', status=404)
+            time.sleep(0.05)
+            return make_response(pages[url])
+
+        self.mock_get.side_effect = side_effect
+        crawler = WebCrawler("https://example.com", max_pages=10, delay=0, pipeline_workers={'fetch': 2})
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = CrawlProfiler(output_dir=tmp, profile=True, sample_hz=500)
+            with self.assertLogs('webcrawler', level='WARNING') as logs:
+                profiler.run(crawler)
+        self.assertIn('nur den Haupt-Thread', logs.output[0])
+        # die Pipeline ruft fetch_body/decode_body/find_hrefs direkt in ihren Worker-Threads auf
+        for stage in ('fetch_body', 'decode_body', 'find_hrefs', 'resolve_links', 'extract_content'):
+            self.assertEqual(profiler.stage_stats[stage]['calls'], 7, stage)
+        self.assertGreater(profiler.stage_stats['fetch_body']['seconds'], 0.3)
+        self.assertGreater(profiler.sample_stages['fetch_body'], 0)
+
 
 if __name__ == '__main__':
     unittest.main()
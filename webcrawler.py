@@ -1,15 +1,31 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from urllib.robotparser import RobotFileParser
-from datetime import datetime
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from datetime import datetime, timezone
 import json
 import time
-from collections import deque
+import heapq
+import math
 import os
 import logging
 import argparse
 import sqlite3
+import sys
+import threading
+import queue
+from functools import wraps, lru_cache
+from collections import Counter, namedtuple, deque
+import re
+import codecs
+import csv
+from array import array
+import zlib
+import hashlib
+import random
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_for_futures
+import gzip
+import io
+from html import unescape as html_unescape
+from html.entities import html5 as html5_entities
+from html.parser import HTMLParser
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,18 +33,1707 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def __getattr__(name):
+    # requests (und bs4) werden erst bei Bedarf importiert; Modi ohne Crawl (--export, --rank, ...)
+    # sparen so den größten Teil der Startzeit. webcrawler.requests bleibt für Aufrufer/Tests erreichbar.
+    if name == "requests":
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ----------------- URL-Normalisierung -----------------
+
+# Query-Parameter, die den Inhalt nicht verändern (Tracking, Sessions); "*" am Ende = Präfix
+DEFAULT_STRIP_PARAMS = (
+    "utm_*", "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "igshid", "ref_src",
+    "sid", "sessionid", "session_id", "phpsessid", "jsessionid", "aspsessionid*", "cfid", "cftoken",
+)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Endungen, die praktisch nie HTML liefern und vor dem Request übersprungen werden
+BINARY_EXTENSIONS = frozenset((
+    ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".exe", ".msi", ".dmg", ".iso", ".apk",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".ico", ".svg", ".tif", ".tiff",
+    ".mp3", ".wav", ".ogg", ".flac", ".m4a", ".mp4", ".m4v", ".avi", ".mov", ".mkv", ".webm", ".wmv",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".ods",
+    ".css", ".js", ".woff", ".woff2", ".ttf", ".eot", ".bin",
+))
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+CanonicalURL = namedtuple("CanonicalURL", ["url", "scheme", "netloc", "path", "query"])
+
+_PCT_ESCAPE_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+_PATH_SESSION_RE = re.compile(r";(?:jsessionid|phpsessid|sid)=[^/?#]*", re.IGNORECASE)
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _normalize_escape(match):
+    # %7e -> ~, %2f bleibt %2F (nur nicht-reservierte Zeichen dekodieren)
+    char = chr(int(match.group(1), 16))
+    if char in _UNRESERVED:
+        return char
+    return "%" + match.group(1).upper()
+
+
+def _remove_dot_segments(path):
+    if "." not in path:
+        return path
+    output = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    # "/a/b/.." und "/a/." enden auf ein Verzeichnis
+    if path.endswith(("/.", "/..")):
+        output.append("")
+    return "/".join(output)
+
+
+class URLCanonicalizer:
+    """Kanonisiert URLs (Host, Port, Pfad, Query) mit begrenztem LRU-Cache."""
+
+    def __init__(self, strip_params=DEFAULT_STRIP_PARAMS, sort_query=True, cache_size=65536):
+        strip_params = [p.lower() for p in (strip_params or ())]
+        self.strip_exact = frozenset(p for p in strip_params if not p.endswith("*"))
+        self.strip_prefixes = tuple(p[:-1] for p in strip_params if p.endswith("*"))
+        self.sort_query = sort_query
+        # Cache pro Instanz, damit verschiedene Konfigurationen sich nicht vermischen
+        self.parse = lru_cache(maxsize=cache_size)(self._canonicalize)
+
+    def normalize(self, url: str) -> str:
+        return self.parse(url).url
+
+    def cache_info(self):
+        return self.parse.cache_info()
+
+    def _keep_param(self, name):
+        name = name.lower()
+        if name in self.strip_exact:
+            return False
+        return not (self.strip_prefixes and name.startswith(self.strip_prefixes))
+
+    def _canonicalize(self, url):
+        try:
+            parts = urlsplit(url.strip())
+            scheme = parts.scheme.lower()
+            host = (parts.hostname or "").rstrip(".")
+            if ":" in host:
+                host = f"[{host}]"  # IPv6
+            netloc = host
+            if parts.port is not None and DEFAULT_PORTS.get(scheme) != parts.port:
+                netloc = f"{host}:{parts.port}"
+            if parts.username is not None:
+                userinfo = parts.username + (f":{parts.password}" if parts.password is not None else "")
+                netloc = f"{userinfo}@{netloc}"
+
+            path = _PATH_SESSION_RE.sub("", parts.path)
+            path = _PCT_ESCAPE_RE.sub(_normalize_escape, path)
+            path = _remove_dot_segments(path) or "/"
+            # abschließenden Slash nur für Nicht-Root-Pfade entfernen
+            if len(path) > 1 and path.endswith("/"):
+                path = path.rstrip("/") or "/"
+
+            query = parts.query
+            if query:
+                pairs = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if self._keep_param(k)]
+                if self.sort_query:
+                    pairs.sort()
+                query = urlencode(pairs)
+
+            return CanonicalURL(urlunsplit((scheme, netloc, path, query, "")), scheme, netloc, path, query)
+        except Exception:
+            return CanonicalURL(url, "", "", "", "")
+
+
+# ----------------- robots.txt -----------------
+
+
+def _robots_escape(value):
+    # Escapes vereinheitlichen, damit Regeln und Pfade gleich kodiert verglichen werden
+    return _PCT_ESCAPE_RE.sub(_normalize_escape, value)
+
+
+class RobotsMatcher:
+    """Kompilierte robots.txt-Regeln (RFC 9309) mit Cache pro Pfad.
+
+    Einfache Präfix-Regeln liegen in einem Zeichen-Trie, Regeln mit ``*`` oder
+    ``$`` werden zu Regexen kompiliert. Es gewinnt die längste passende Regel,
+    bei Gleichstand Allow. Entscheidungen werden pro Pfad gecacht.
+    """
+
+    def __init__(self, cache_size=65536):
+        self.groups = []  # Liste von (agents, rules)
+        self.sitemaps = []
+        self.crawl_delays = {}
+        self.cache_size = cache_size
+        self._compiled = {}
+
+    def parse(self, lines):
+        groups = []
+        agents, rules = [], []
+        in_rules = False
+        for raw in lines:
+            line = raw.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            key, value = key.strip().lower(), value.strip()
+            if key == "user-agent":
+                if in_rules:
+                    groups.append((agents, rules))
+                    agents, rules, in_rules = [], [], False
+                agents.append(value.lower())
+            elif key in ("allow", "disallow"):
+                in_rules = True
+                if agents and value:
+                    rules.append((key == "allow", value))
+            elif key == "crawl-delay":
+                in_rules = True
+                for agent in agents:
+                    try:
+                        self.crawl_delays[agent] = float(value)
+                    except ValueError:
+                        pass
+            elif key == "sitemap":
+                self.sitemaps.append(value)
+        if agents:
+            groups.append((agents, rules))
+        self.groups = groups
+        self._compiled = {}
+
+    def _rules_for(self, useragent):
+        # spezifischste passende Gruppe(n), sonst "*"; gleichnamige Gruppen werden zusammengeführt
+        token = useragent.split("/")[0].lower()
+        specific, default = [], []
+        for agents, rules in self.groups:
+            for agent in agents:
+                if agent == "*":
+                    default.extend(rules)
+                elif agent in token:
+                    specific.extend(rules)
+                    break
+        return specific if specific else default
+
+    def _compile(self, useragent):
+        trie = {}
+        patterns = []
+        for allow, path in self._rules_for(useragent):
+            path = _robots_escape(path)
+            if "*" in path or path.endswith("$"):
+                anchored = path.endswith("$")
+                body = path[:-1] if anchored else path
+                regex = ".*".join(re.escape(part) for part in body.split("*"))
+                patterns.append((re.compile(regex + ("$" if anchored else "")), len(path), allow))
+            else:
+                node = trie
+                for char in path:
+                    node = node.setdefault(char, {})
+                # bei Allow+Disallow mit gleichem Pfad gewinnt Allow
+                node[None] = node.get(None, False) or allow
+        patterns.sort(key=lambda p: -p[1])
+
+        @lru_cache(maxsize=self.cache_size)
+        def allowed(target):
+            best_len, best_allow = -1, True
+            node, depth = trie, 0
+            if None in node:
+                best_len, best_allow = 0, node[None]
+            for char in target:
+                node = node.get(char)
+                if node is None:
+                    break
+                depth += 1
+                if None in node:
+                    best_len, best_allow = depth, node[None]
+            for regex, length, allow in patterns:
+                # Muster sind absteigend nach Länge sortiert
+                if length < best_len:
+                    break
+                if regex.match(target) and (length > best_len or allow):
+                    best_len, best_allow = length, allow
+            return best_allow
+
+        return allowed
+
+    def allowed(self, useragent, target):
+        """Prüft einen Pfad inkl. Query (z.B. "/a?b=1") für den User-Agent."""
+        matcher = self._compiled.get(useragent)
+        if matcher is None:
+            matcher = self._compiled[useragent] = self._compile(useragent)
+        if target == "/robots.txt":
+            return True
+        return matcher(_robots_escape(target) or "/")
+
+    def can_fetch(self, useragent, url):
+        # gleiche Signatur wie urllib.robotparser.RobotFileParser.can_fetch
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        return self.allowed(useragent, target)
+
+    def cache_info(self, useragent):
+        matcher = self._compiled.get(useragent)
+        return matcher.cache_info() if matcher else None
+
+
+# ----------------- Zeichensatz-Erkennung -----------------
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_HEADER_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+?charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+# wie im WHATWG-Encoding-Standard: Latin-1/ASCII-Labels bedeuten windows-1252
+_ENCODING_ALIASES = {"iso-8859-1": "cp1252", "iso8859-1": "cp1252", "latin1": "cp1252", "latin-1": "cp1252",
+                     "us-ascii": "cp1252", "ascii": "cp1252"}
+META_SNIFF_BYTES = 4096
+
+
+def _lookup_encoding(label):
+    if not label:
+        return None
+    label = label.strip().lower()
+    label = _ENCODING_ALIASES.get(label, label)
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def _detect_encoding(body):
+    # teure Vollerkennung nur als letzter Ausweg
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(body).best()
+        return best.encoding if best else None
+    except ImportError:
+        pass
+    try:
+        import chardet
+        return chardet.detect(body).get("encoding")
+    except ImportError:
+        return None
+
+
+def decode_html(body: bytes, content_type: str = ""):
+    """Dekodiert HTML-Bytes: BOM, HTTP-Header, <meta charset>, UTF-8, dann Erkennung.
+
+    Liefert (text, encoding, quelle), quelle ist einer von
+    "bom", "header", "meta", "utf-8", "detect" oder "default".
+    """
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return body[len(bom):].decode(encoding, errors="replace"), encoding, "bom"
+
+    match = _HEADER_CHARSET_RE.search(content_type or "")
+    encoding = _lookup_encoding(match.group(1)) if match else None
+    if encoding:
+        return body.decode(encoding, errors="replace"), encoding, "header"
+
+    match = _META_CHARSET_RE.search(body, 0, META_SNIFF_BYTES)
+    encoding = _lookup_encoding(match.group(1).decode("ascii", "ignore")) if match else None
+    # eine UTF-16-Angabe im ASCII-kompatiblen Dokument ist falsch (WHATWG: dann UTF-8)
+    if encoding and encoding.startswith("utf-16"):
+        encoding = "utf-8"
+    if encoding:
+        return body.decode(encoding, errors="replace"), encoding, "meta"
+
+    try:
+        return body.decode("utf-8"), "utf-8", "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    encoding = _lookup_encoding(_detect_encoding(body))
+    if encoding:
+        return body.decode(encoding, errors="replace"), encoding, "detect"
+    return body.decode("cp1252", errors="replace"), "cp1252", "default"
+
+
+# ----------------- Crawler-Fallen -----------------
+
+# Segmente, die als austauschbare ID gelten: Hex/UUID sowie lange Tokens aus Buchstaben und Ziffern
+_ID_SEGMENT_RE = re.compile(r"[0-9a-fA-F]{8,}(?:-[0-9a-fA-F]{4,})*|(?=[A-Za-z_]*\d)(?=\d*[A-Za-z])[A-Za-z0-9_]{16,}")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+class TrapDetector:
+    """Erkennt unendliche URL-Räume (Kalender, Facetten, Session-IDs) beim Einreihen.
+
+    URLs werden auf Vorlagen abgebildet (Host + Pfad mit {n}/{id} statt Zahlen und IDs + sortierte
+    Parameternamen). Pro Vorlage sind max_per_template URLs erlaubt, danach ist die Vorlage gesperrt
+    und weitere URLs werden per Set-Lookup abgewiesen. Zusätzlich begrenzt: wie oft dasselbe
+    Pfadsegment vorkommt, Parameter pro URL und verschiedene Parameterkombinationen pro Pfad.
+    0 schaltet eine Grenze ab.
+    """
+
+    def __init__(self, max_per_template=1000, max_repeated_segments=2, max_query_params=8, max_query_variants=64):
+        self.max_per_template = max_per_template
+        self.max_repeated_segments = max_repeated_segments
+        self.max_query_params = max_query_params
+        self.max_query_variants = max_query_variants
+        self.counts = {}  # Vorlage -> eingereihte URLs (nur Vorlagen mit Platzhalter oder Query)
+        self.blocked = {}  # gesperrte Vorlage -> abgewiesene URLs
+        self.query_variants = {}  # Pfad-Vorlage -> Menge der Parameter-Signaturen
+        self.exploded = {}  # Pfad-Vorlage -> wegen zu vieler Parameter(-kombinationen) abgewiesene URLs
+        self.dropped = {"template": 0, "repeat": 0, "query": 0}
+
+    @staticmethod
+    def _segment(segment):
+        if _ID_SEGMENT_RE.fullmatch(segment):
+            return "{id}"
+        return _DIGITS_RE.sub("{n}", segment)
+
+    def template(self, url):
+        """(Pfad-Vorlage, sortierte Parameternamen) einer normalisierten URL."""
+        parts = urlsplit(url)
+        path = parts.netloc + "/".join(self._segment(segment) for segment in parts.path.split("/"))
+        names = sorted({pair.partition("=")[0] for pair in parts.query.split("&")}) if parts.query else []
+        return path, names
+
+    def _repeats_segments(self, url):
+        segments = [segment for segment in urlsplit(url).path.split("/") if segment]
+        if len(segments) <= self.max_repeated_segments or len(set(segments)) == len(segments):
+            return False
+        counts = {}
+        for segment in segments:
+            counts[segment] = counts.get(segment, 0) + 1
+        return max(counts.values()) > self.max_repeated_segments
+
+    def admit(self, url):
+        """True, wenn url eingereiht werden darf; zählt sie dann zu ihrer Vorlage."""
+        path, names = self.template(url)
+        signature = "&".join(names)
+        key = f"{path}?{signature}" if names else path
+        if key in self.blocked:
+            self.blocked[key] += 1
+            self.dropped["template"] += 1
+            return False
+        if self.max_repeated_segments and self._repeats_segments(url):
+            self.dropped["repeat"] += 1
+            return False
+        if names:
+            variants = self.query_variants.setdefault(path, set())
+            too_many = self.max_query_params and len(names) > self.max_query_params
+            if too_many or (signature not in variants and self.max_query_variants
+                            and len(variants) >= self.max_query_variants):
+                self.exploded[path] = self.exploded.get(path, 0) + 1
+                self.dropped["query"] += 1
+                return False
+            variants.add(signature)
+        elif "{" not in path:
+            # ohne Platzhalter ist die Vorlage die URL selbst, Zählen lohnt nicht
+            return True
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if self.max_per_template and count >= self.max_per_template:
+            logger.warning(f"Crawler-Falle: Vorlage {key} nach {count} URLs gesperrt")
+            del self.counts[key]
+            self.blocked[key] = 0
+        return True
+
+    def get_summary(self, top=10):
+        def worst(counts):
+            return dict(sorted(counts.items(), key=lambda item: -item[1])[:top])
+
+        return {
+            "dropped": dict(self.dropped),
+            "blocked_templates": worst(self.blocked),
+            "query_explosion": worst(self.exploded),
+        }
+
+
+# ----------------- Frontier -----------------
+
+
+def depth_score(url, depth, info):
+    # flache Seiten zuerst
+    return -float(depth)
+
+
+def inlink_score(url, depth, info):
+    # häufig verlinkte Seiten sind meist wichtiger
+    return math.log2(1 + info.get("inlinks", 0))
+
+
+def sitemap_priority_score(url, depth, info):
+    # <priority> aus der Sitemap (0.0 - 1.0), ohne Angabe neutral
+    return info.get("sitemap_priority", 0.5) - 0.5
+
+
+def change_probability_score(url, depth, info):
+    # fällige Seiten eines Recrawls vor neu entdeckten, untereinander nach Änderungswahrscheinlichkeit
+    probability = info.get("change_probability")
+    return 0.0 if probability is None else 10.0 + 10.0 * probability
+
+
+def path_pattern_scorer(patterns):
+    """Erzeugt einen Scorer aus {regex: bonus}; Boni aller passenden Muster werden addiert."""
+    compiled = [(re.compile(pattern), float(bonus)) for pattern, bonus in patterns.items()]
+
+    def score(url, depth, info):
+        return sum(bonus for regex, bonus in compiled if regex.search(url))
+
+    return score
+
+
+# Tiefe und Inlinks bestimmen den Standard (wichtige Seiten vor tiefer Paginierung), Sitemap-Priorität
+# und Recrawl-Fälligkeit greifen nur mit den jeweiligen Angaben; --breadth-first lässt inlink_score weg
+DEFAULT_SCORERS = (
+    (depth_score, 1.0), (inlink_score, 1.0), (sitemap_priority_score, 1.0), (change_probability_score, 1.0),
+)
+BREADTH_FIRST_SCORERS = tuple(scorer for scorer in DEFAULT_SCORERS if scorer[0] is not inlink_score)
+
+
+class Frontier:
+    """Heap-basierte Prioritäts-Queue (Best-First) mit Tiefe pro URL.
+
+    Der Score ist die gewichtete Summe der Scorer ``fn(url, depth, info)``,
+    höhere Scores werden zuerst geliefert, bei Gleichstand gilt FIFO.
+    ``max_depth`` und Budgets pro Pfad-Präfix ({"/blog": 100}) werden beim
+    Einfügen bzw. Entnehmen geprüft, ein optionaler TrapDetector beim Einfügen;
+    alle Operationen sind O(log n).
+    """
+
+    def __init__(self, scorers=DEFAULT_SCORERS, max_depth=None, path_budgets=None, traps=None):
+        self.scorers = list(scorers)
+        self.max_depth = max_depth
+        self.path_budgets = dict(path_budgets or {})
+        self.path_counts = {prefix: 0 for prefix in self.path_budgets}
+        self.traps = traps
+        self.info = {}
+        self.dropped = {"depth": 0, "budget": 0, "trap": 0}
+        self._heap = []
+        self._entries = {}  # url -> aktueller Heap-Eintrag [neg_score, seq, url, depth, gültig]
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def score(self, url, depth):
+        info = self.info.get(url, {})
+        return sum(weight * fn(url, depth, info) for fn, weight in self.scorers)
+
+    def _budget_prefix(self, url):
+        # längstes konfiguriertes Präfix über die Pfadsegmente suchen (O(Segmente))
+        if not self.path_budgets:
+            return None
+        path = urlsplit(url).path
+        best = "/" if "/" in self.path_budgets else None
+        end = path.find("/", 1)
+        while True:
+            prefix = path if end == -1 else path[:end]
+            if prefix in self.path_budgets:
+                best = prefix
+            if end == -1:
+                return best
+            end = path.find("/", end + 1)
+
+    def _budget_exhausted(self, prefix):
+        return prefix is not None and self.path_counts[prefix] >= self.path_budgets[prefix]
+
+    def push(self, url, depth=0, **info):
+        """Fügt eine URL ein; liefert False, wenn sie bereits wartet oder ein Limit greift."""
+        if info:
+            self.info.setdefault(url, {}).update(info)
+        if url in self._entries:
+            return False
+        if self.max_depth is not None and depth > self.max_depth:
+            self.dropped["depth"] += 1
+            return False
+        if self._budget_exhausted(self._budget_prefix(url)):
+            self.dropped["budget"] += 1
+            return False
+        if self.traps is not None and not self.traps.admit(url):
+            self.dropped["trap"] += 1
+            return False
+        self._add(url, depth)
+        return True
+
+    def push_many(self, items):
+        """Bulk-Insert von (url, depth, info)-Tupeln; bei großen Mengen ein heapify statt n Pushes."""
+        added = 0
+        bulk = len(items) > len(self._heap)
+        for url, depth, info in items:
+            if info:
+                self.info.setdefault(url, {}).update(info)
+            if url in self._entries:
+                continue
+            if self.max_depth is not None and depth > self.max_depth:
+                self.dropped["depth"] += 1
+                continue
+            if self._budget_exhausted(self._budget_prefix(url)):
+                self.dropped["budget"] += 1
+                continue
+            if self.traps is not None and not self.traps.admit(url):
+                self.dropped["trap"] += 1
+                continue
+            if bulk:
+                self._seq += 1
+                entry = [-self.score(url, depth), self._seq, url, depth, True]
+                self._entries[url] = entry
+                self._heap.append(entry)
+            else:
+                self._add(url, depth)
+            added += 1
+        if bulk:
+            heapq.heapify(self._heap)
+        return added
+
+    def extend(self, urls, depth=0):
+        return sum(self.push(url, depth) for url in urls)
+
+    def _add(self, url, depth):
+        self._seq += 1
+        entry = [-self.score(url, depth), self._seq, url, depth, True]
+        self._entries[url] = entry
+        heapq.heappush(self._heap, entry)
+
+    def add_inlink(self, url):
+        """Zählt einen weiteren eingehenden Link und hebt die Priorität einer wartenden URL an."""
+        info = self.info.setdefault(url, {})
+        info["inlinks"] = info.get("inlinks", 0) + 1
+        entry = self._entries.get(url)
+        if entry is not None:
+            # alten Eintrag invalidieren statt im Heap zu suchen (lazy deletion)
+            entry[4] = False
+            self._add(url, entry[3])
+
+    def pop(self):
+        """Liefert (url, depth) mit dem höchsten Score oder None, wenn nichts mehr erlaubt ist."""
+        while self._heap:
+            _, _, url, depth, valid = heapq.heappop(self._heap)
+            if not valid:
+                continue
+            del self._entries[url]
+            prefix = self._budget_prefix(url)
+            if self._budget_exhausted(prefix):
+                self.dropped["budget"] += 1
+                continue
+            if prefix is not None:
+                self.path_counts[prefix] += 1
+            self.info.pop(url, None)
+            return url, depth
+        return None
+
+
+# ----------------- Sitemaps -----------------
+
+SITEMAP_BATCH_SIZE = 5000
+
+
+class _ChunkStream(io.RawIOBase):
+    """Datei-artige Sicht auf einen Chunk-Iterator (z.B. response.iter_content)."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def open_sitemap_stream(chunks):
+    """Liefert einen Bytestrom; gzip (.xml.gz) wird anhand der Magic-Bytes erkannt."""
+    stream = io.BufferedReader(_ChunkStream(chunks), buffer_size=65536)
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap(stream):
+    """Parst eine Sitemap oder einen Sitemap-Index inkrementell mit iterparse.
+
+    Liefert Tupel (art, loc, lastmod, priority, changefreq) mit art "url" oder
+    "sitemap"; verarbeitete Elemente werden sofort verworfen.
+    """
+    import xml.etree.ElementTree as ET
+
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag not in ("url", "sitemap"):
+            continue
+        fields = {child.tag.rsplit("}", 1)[-1]: (child.text or "").strip() for child in elem}
+        loc = fields.get("loc")
+        if loc:
+            try:
+                priority = float(fields["priority"]) if fields.get("priority") else None
+            except ValueError:
+                priority = None
+            yield tag, loc, fields.get("lastmod") or None, priority, fields.get("changefreq") or None
+        # bereits verarbeitete Kinder vom Wurzelelement lösen, damit der Speicher konstant bleibt
+        root.clear()
+
+
+# ----------------- Drosselung und Backoff -----------------
+
+THROTTLE_STATUSES = frozenset((429, 503))
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+RETRY_ERRORS = frozenset(("timeout", "connection"))
+MAX_RETRY_AFTER = 600.0
+
+
+def parse_retry_after(value):
+    """Retry-After als Sekunden (Zahl oder HTTP-Datum), None bei fehlendem/ungültigem Wert."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def backoff_delay(attempt, base=1.0, cap=120.0):
+    """Exponentieller Backoff mit Jitter (Hälfte fest, Hälfte zufällig)."""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class HostController:
+    """AIMD-Regler pro Host für Parallelität und Abstand zwischen Requests.
+
+    Gesunde Antworten erhöhen das Fenster additiv (ca. +1 pro Fenster) und
+    senken den Abstand Richtung ``min_delay``; 429/503, Timeouts, 5xx oder
+    stark steigende Latenz halbieren das Fenster und vergrößern den Abstand.
+    ``Retry-After`` sperrt den Host bis zum angegebenen Zeitpunkt. Nach
+    ``failure_threshold`` Fehlern in Folge öffnet ein Circuit Breaker für
+    ``cooldown`` Sekunden (danach ein Probe-Request); nach ``max_trips``
+    Auslösungen gilt der Host als tot.
+    """
+
+    def __init__(self, min_delay=0.0, max_concurrency=1, max_delay=60.0,
+                 failure_threshold=5, cooldown=30.0, max_trips=3):
+        self.min_delay = min_delay
+        self.delay = min_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max(1, max_concurrency)
+        self.window = 1.0
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.latency_ewma = None
+        self.latency_base = None
+        self.next_allowed = 0.0
+        self._previous_allowed = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        self.stats = {"successes": 0, "throttled": 0, "failures": 0, "circuit_trips": 0}
+
+    @property
+    def dead(self):
+        return self.trips >= self.max_trips
+
+    @property
+    def circuit_open(self):
+        return self.consecutive_failures >= self.failure_threshold
+
+    def allowed_in_flight(self):
+        # halb offen: nur ein Probe-Request
+        if self.circuit_open:
+            return 1
+        return min(self.max_concurrency, int(self.window))
+
+    def wait_time(self, now=None):
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.next_allowed - now, self.open_until - now)
+
+    def on_request_start(self):
+        self._previous_allowed = self.next_allowed
+        self.next_allowed = time.monotonic() + self.delay
+
+    def cancel_request(self):
+        """Der gestartete Request ging nicht ans Netz (z. B. Cache-Treffer): kein Abstand nötig."""
+        self.next_allowed = min(self.next_allowed, self._previous_allowed)
+
+    def _decrease(self):
+        self.window = max(1.0, self.window / 2)
+        self.delay = min(self.max_delay, max(self.min_delay, self.delay * 2, 0.25))
+
+    def record_success(self, latency):
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        self.latency_base = self.latency_ewma if self.latency_base is None else min(self.latency_base, self.latency_ewma)
+        if self.latency_ewma > 2 * self.latency_base and self.latency_ewma > 0.5:
+            # Latenz steigt deutlich: der Server ist am Limit
+            self._decrease()
+            self.latency_base = self.latency_ewma / 2
+            return
+        self.window = min(float(self.max_concurrency), self.window + 1.0 / self.window)
+        if self.delay > self.min_delay:
+            self.delay = max(self.min_delay, self.delay * 0.9)
+            if self.delay - self.min_delay < 0.01:
+                self.delay = self.min_delay
+
+    def record_throttle(self, retry_after=None):
+        self.stats["throttled"] += 1
+        self._decrease()
+        if retry_after:
+            self.next_allowed = max(self.next_allowed, time.monotonic() + retry_after)
+
+    def record_failure(self):
+        self.stats["failures"] += 1
+        self._decrease()
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.open_until = time.monotonic() + self.cooldown * (2 ** self.trips)
+            self.trips += 1
+            self.stats["circuit_trips"] += 1
+            logger.warning(
+                f"Circuit Breaker offen für {self.cooldown * (2 ** (self.trips - 1)):.0f}s "
+                f"({self.consecutive_failures} Fehler in Folge)"
+            )
+
+    def get_summary(self):
+        return {
+            **self.stats,
+            "window": round(self.window, 2),
+            "delay": round(self.delay, 3),
+            "latency_ms": round((self.latency_ewma or 0.0) * 1000, 1),
+        }
+
+
+# ----------------- Datensätze -----------------
+
+class CrawlRecord:
+    """Kompakter Datensatz einer gecrawlten Seite.
+
+    ``__slots__`` statt Dict, Host per ``sys.intern`` geteilt, ``crawled_at`` als Unix-Zeitstempel
+    und Überschriften/Absätze als Tupel. Lesender Zugriff wie bei einem Dict (``record["title"]``,
+    ``"url" in record``) bleibt möglich; ``to_dict`` erzeugt das JSON-Format erst bei der Ausgabe.
+    Zusätzliche Felder eines Extraktionsprofils liegen in ``extra`` (sonst None).
+    """
+
+    __slots__ = ("url", "host", "title", "description", "headings", "paragraphs", "link_count", "crawled_at",
+                 "extra")
+    FIELDS = ("url", "title", "description", "headings", "paragraphs", "link_count", "crawled_at")
+
+    def __init__(self, url, title="", description="", headings=(), paragraphs=(), link_count=0,
+                 crawled_at=None, host=None, extra=None):
+        self.url = url
+        self.host = sys.intern(urlsplit(url).netloc if host is None else host)
+        self.title = title
+        self.description = description
+        self.headings = tuple(headings)
+        self.paragraphs = tuple(paragraphs)
+        self.link_count = link_count
+        self.crawled_at = time.time() if crawled_at is None else crawled_at
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, item):
+        """Datensatz aus einem JSON-Eintrag; None, wenn der Eintrag nicht genau diese Felder hat."""
+        if set(item) != set(cls.FIELDS):
+            return None
+        try:
+            crawled_at = datetime.fromisoformat(item["crawled_at"]).timestamp()
+        except (TypeError, ValueError):
+            return None
+        return cls(item["url"], item["title"], item["description"], item["headings"], item["paragraphs"],
+                   item["link_count"], crawled_at)
+
+    def to_dict(self):
+        item = {
+            "url": self.url,
+            "title": self.title,
+            "description": self.description,
+            "headings": list(self.headings),
+            "paragraphs": list(self.paragraphs),
+            "link_count": self.link_count,
+            "crawled_at": datetime.fromtimestamp(self.crawled_at).isoformat(),
+        }
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            if self.extra and key in self.extra:
+                return self.extra[key]
+            raise KeyError(key)
+        if key == "crawled_at":
+            return datetime.fromtimestamp(self.crawled_at).isoformat()
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.FIELDS or bool(self.extra and key in self.extra)
+
+    def keys(self):
+        return self.FIELDS + tuple(self.extra) if self.extra else self.FIELDS
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __repr__(self):
+        return f"CrawlRecord({self.url!r}, title={self.title!r})"
+
+
+# ----------------- Schnelle Link-Erkennung -----------------
+
+# Ein Durchlauf über den Text: Kommentare und script/style-Blöcke werden übersprungen,
+# von <a>-Tags wird nur der href-Wert gelesen (kein DOM, keine Textextraktion)
+_HREF_TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(script|style)\b.*?</\1\s*>"
+    r"|<a\s[^>]*?(?<![\w-])href\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>]+))",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def iter_hrefs(html):
+    """Liefert die href-Werte aller <a>-Tags in Dokumentreihenfolge (Entities aufgelöst)."""
+    for match in _HREF_TOKEN_RE.finditer(html):
+        if match.group(1) or match.group(0).startswith("<!--"):
+            continue
+        value = match.group(2)
+        if value is None:
+            value = match.group(3) if match.group(3) is not None else match.group(4)
+        value = value.strip()
+        yield html_unescape(value) if "&" in value else value
+
+
+# ----------------- Extraktionsprofile -----------------
+
+# wie BeautifulSoup (html.parser): leere Elemente kommen nicht auf den Stack, Text in diesen
+# Containern zählt nicht zu get_text()
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta", "param",
+    "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer",
+))
+NON_TEXT_CONTAINERS = frozenset(("script", "style", "template", "rt", "rp"))
+PARSE_CHUNK_SIZE = 8192
+
+_SIMPLE_SELECTOR_RE = re.compile(r"^([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+|\[[^\]]+\])*)$")
+_SELECTOR_PART_RE = re.compile(r"\.([\w-]+)|#([\w-]+)|\[\s*([\w-]+)\s*(?:(=)\s*[\"']?([^\"'\]]*)[\"']?\s*)?\]")
+EXTRACTION_MODES = ("text", "string", "attr", "count")
+
+
+def parse_selector(text):
+    """Liste einfacher Selektoren (tag, tag.klasse, tag#id, tag[attr], tag[attr=wert]; Komma = oder)."""
+    selectors = []
+    for part in text.split(","):
+        match = _SIMPLE_SELECTOR_RE.match(part.strip())
+        if not match or not part.strip():
+            raise ValueError(f"Nicht unterstützter Selektor: {part.strip()!r}")
+        conditions = []
+        for cls, ident, attr, equals, value in _SELECTOR_PART_RE.findall(match.group(2)):
+            if cls:
+                conditions.append(("class", cls, True))
+            elif ident:
+                conditions.append(("id", ident, False))
+            else:
+                conditions.append((attr.lower(), value if equals else None, False))
+        selectors.append(((match.group(1) or "*").lower(), tuple(conditions)))
+    return tuple(selectors)
+
+
+def _selector_matches(selectors, tag, attrs):
+    for name, conditions in selectors:
+        if name != "*" and name != tag:
+            continue
+        for attr, value, word in conditions:
+            actual = attrs.get(attr)
+            if actual is None:
+                break
+            if value is not None and (value not in actual.split() if word else actual != value):
+                break
+        else:
+            return True
+    return False
+
+
+# Tokenisierung wie html.parser: Tagname bis Leerraum, "/" oder ">", Attributwerte mit Anführungszeichen
+_MARKUP_OPEN_RE = re.compile(r"<(?:!--|!\[CDATA\[|[!?/]|([a-zA-Z]))")
+_START_TAG_RE = re.compile(r"""
+  <([a-zA-Z][^\t\n\r\f />\x00]*)
+  (?:(?:\s|/(?!>))*
+    (?:(?<=['"\s/])[^\s/>][^\s/=>]*
+      (?:\s*=+\s*(?:'[^']*'|"[^"]*"|(?!['"])[^>\s]*)\s*)?(?:\s|/(?!>))*
+     )*
+   )?
+  \s*
+""", re.VERBOSE)
+_COMMENT_CLOSE_RE = re.compile(r"--\s*>")
+_CDATA_CLOSE_RES = {name: re.compile(r"</\s*%s\s*>" % name, re.IGNORECASE) for name in ("script", "style")}
+
+
+def iter_start_tags(html):
+    """(Tagname, Position) der Start-Tags ohne DOM; Kommentare, CDATA und script/style-Inhalte werden übersprungen."""
+    pos = 0
+    while True:
+        match = _MARKUP_OPEN_RE.search(html, pos)
+        if match is None:
+            return
+        start = match.start()
+        token = match.group(0)
+        if token == "<!--":
+            close = _COMMENT_CLOSE_RE.search(html, start + 4)
+            pos = close.end() if close else len(html)
+        elif token == "<![CDATA[":
+            end = html.find("]]>", start)
+            pos = end + 3 if end >= 0 else len(html)
+        elif match.group(1) is None:
+            end = html.find(">", start)
+            pos = end + 1 if end >= 0 else len(html)
+        else:
+            tag = _START_TAG_RE.match(html, start)
+            pos = tag.end()
+            if html.startswith("/>", pos):
+                yield tag.group(1).lower(), start
+                pos += 2
+                continue
+            if not html.startswith(">", pos):
+                # kein vollständiges Tag, html.parser liest es als Text
+                pos = max(pos, start + 1)
+                continue
+            name = tag.group(1).lower()
+            yield name, start
+            pos += 1
+            if name in _CDATA_CLOSE_RES:
+                close = _CDATA_CLOSE_RES[name].search(html, pos)
+                pos = close.end() if close else len(html)
+
+
+class ExtractionProfile:
+    """Deklaratives Extraktionsprofil: welche Felder, mit welchem Selektor, wie viele.
+
+    Ein Feld ist ein Dict mit ``selector`` und optional ``mode`` ("text" = get_text(strip=True),
+    "string" = .string wie BeautifulSoup, "attr" mit ``attr``, "count"), ``limit`` (Liste mit bis zu
+    N Treffern; ohne limit der erste Treffer), ``default`` und ``scope`` ("document" oder "head").
+    """
+
+    def __init__(self, fields):
+        self.fields = {}
+        for name, spec in fields.items():
+            spec = dict(spec, name=name)
+            spec["selectors"] = parse_selector(spec["selector"])
+            spec.setdefault("mode", "text")
+            spec.setdefault("scope", "document")
+            spec.setdefault("default", [] if "limit" in spec else (0 if spec["mode"] == "count" else ""))
+            if spec["mode"] not in EXTRACTION_MODES:
+                raise ValueError(f"Feld {name}: unbekannter mode {spec['mode']!r}")
+            if spec["mode"] == "attr" and not spec.get("attr"):
+                raise ValueError(f"Feld {name}: mode 'attr' braucht 'attr'")
+            tags = frozenset(tag for tag, _ in spec["selectors"])
+            # Rest des Dokuments lässt sich nur ohne "*" vorprüfen, zählen nur bei reinen Tag-Selektoren
+            spec["tags"] = tags if "*" not in tags else None
+            spec["countable"] = spec["tags"] is not None and all(not c for _, c in spec["selectors"])
+            self.fields[name] = spec
+
+    @classmethod
+    def load(cls, name_or_path):
+        """Eingebautes Profil (Name) oder JSON-Datei {"fields": {...}}."""
+        if name_or_path in EXTRACTION_PROFILES:
+            return EXTRACTION_PROFILES[name_or_path]
+        with open(name_or_path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["fields"])
+
+    def extract(self, html):
+        return _ProfileParser(self).run(html)
+
+
+class _Capture:
+    __slots__ = ("parts", "open", "element")
+
+    def __init__(self, element):
+        self.parts = []
+        self.open = True
+        self.element = element
+
+
+class _Element:
+    __slots__ = ("name", "captures", "children", "first_child")
+
+    def __init__(self, name):
+        self.name = name
+        self.captures = None
+        self.children = 0
+        self.first_child = None
+
+
+class _ProfileParser(HTMLParser):
+    """Ereignisbasierter Parser für ein Profil; bildet den Element-Stack von BeautifulSoup nach, baut aber keinen Baum."""
+
+    def __init__(self, profile):
+        # Entities selbst auflösen wie BeautifulSoup, damit Textknoten identisch zerfallen
+        super().__init__(convert_charrefs=False)
+        self.profile = profile
+        self.fields = profile.fields
+        self.results = {name: [] for name in self.fields}  # Captures bzw. Attributwerte
+        self.counts = {name: 0 for name in self.fields}
+        self.stack = []
+        self.text_captures = []  # offene Captures im Textmodus
+        self.excluded = 0  # Anzahl offener script/style/...-Container
+        self.data = []
+        self.closed_void = []  # leere Elemente, deren spätere End-Tags ignoriert werden
+        self.in_head = True
+
+    # --- Knoten ---
+    def _add_child(self, node):
+        if self.stack:
+            parent = self.stack[-1]
+            parent.children += 1
+            if parent.children == 1:
+                parent.first_child = node
+
+    def _flush(self, cdata=False):
+        if not self.data:
+            return
+        text = "".join(self.data)
+        self.data = []
+        self._add_child(("str", text))
+        # CDATA behält in BeautifulSoup seinen Typ und zählt auch in script/style zum Text
+        if self.text_captures and (cdata or not self.excluded):
+            stripped = text.strip()
+            if stripped:
+                for capture in self.text_captures:
+                    capture.parts.append(stripped)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_charref(self, name):
+        self.data.append(html_unescape(f"&#{name};"))
+
+    def handle_entityref(self, name):
+        self.data.append(html_unescape(f"&{name};") if f"{name};" in html5_entities else f"&{name}")
+
+    def handle_comment(self, data):
+        self._flush()
+        self._add_child(("other", data))
+
+    def handle_decl(self, decl):
+        self._flush()
+        self._add_child(("other", decl[len("DOCTYPE "):]))
+
+    def handle_pi(self, data):
+        self._flush()
+        self._add_child(("other", data))
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self.data.append(data[6:])
+            self._flush(cdata=True)
+        else:
+            self._add_child(("other", data))
+
+    def handle_starttag(self, tag, attrs, startend=False):
+        self._flush()
+        if tag == "body":
+            self.in_head = False
+        attr_map = {}
+        for key, value in attrs:
+            attr_map[key] = "" if value is None else value
+        element = _Element(tag)
+        self._add_child(("el", element))
+        for name, spec in self.fields.items():
+            if spec["scope"] == "head" and not self.in_head:
+                continue
+            if not _selector_matches(spec["selectors"], tag, attr_map):
+                continue
+            mode = spec["mode"]
+            self.counts[name] += 1
+            if mode == "count" or len(self.results[name]) >= spec.get("limit", 1):
+                continue
+            if mode == "attr":
+                self.results[name].append(attr_map.get(spec["attr"], "").strip())
+            elif tag not in VOID_ELEMENTS:
+                capture = _Capture(element)
+                self.results[name].append(capture)
+                if element.captures is None:
+                    element.captures = []
+                element.captures.append(capture)
+                if mode == "text":
+                    self.text_captures.append(capture)
+            else:
+                # leeres Element: ohne Inhalt
+                capture = _Capture(element)
+                capture.open = False
+                self.results[name].append(capture)
+        if tag in VOID_ELEMENTS:
+            if not startend:
+                self.closed_void.append(tag)
+            return
+        self.stack.append(element)
+        if tag in NON_TEXT_CONTAINERS:
+            self.excluded += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, startend=True)
+        self._flush()
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_void:
+            # überzähliges End-Tag eines leeren Elements: kein neuer Textknoten
+            self.closed_void.remove(tag)
+            return
+        self._flush()
+        if tag == "head":
+            self.in_head = False
+        if tag in VOID_ELEMENTS:
+            return
+        # wie BeautifulSoup._popToTag: bis zum zuletzt geöffneten Element dieses Namens schließen
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i].name == tag:
+                break
+        else:
+            return
+        while len(self.stack) > i:
+            self._close(self.stack.pop())
+
+    def _close(self, element):
+        if element.name in NON_TEXT_CONTAINERS:
+            self.excluded -= 1
+        if element.captures:
+            for capture in element.captures:
+                capture.open = False
+                if capture in self.text_captures:
+                    self.text_captures.remove(capture)
+
+    # --- Abbruch ---
+    def _field_state(self, spec):
+        """True (fertig), False (weiterparsen) oder "scan" (fertig, falls im Rest kein passendes Tag folgt)."""
+        head_done = spec["scope"] == "head" and not self.in_head
+        if spec["mode"] == "count":
+            return head_done or ("count" if spec["countable"] else False)
+        results = self.results[spec["name"]]
+        if any(c.open for c in results if isinstance(c, _Capture)):
+            return False
+        if head_done or len(results) >= spec.get("limit", 1):
+            return True
+        return "scan" if spec["tags"] is not None else False
+
+    def run(self, html):
+        pos = 0
+        resume_at = 0
+        while pos < len(html):
+            self.feed(html[pos:pos + PARSE_CHUNK_SIZE])
+            pos += PARSE_CHUNK_SIZE
+            if pos >= len(html) or pos < resume_at or self.cdata_elem is not None:
+                continue
+            states = [(spec, self._field_state(spec)) for spec in self.fields.values()]
+            if not all(state for _, state in states):
+                continue
+            wanted = set()
+            for spec, state in states:
+                if state == "scan":
+                    wanted |= spec["tags"]
+            rest = self.rawdata + html[pos:]
+            offset = pos - len(self.rawdata)
+            count_specs = [spec for spec, state in states if state == "count"]
+            extra = [0] * len(count_specs)
+            blocked = None
+            for name, start in iter_start_tags(rest) if (wanted or count_specs) else ():
+                if name in wanted:
+                    blocked = start
+                    break
+                for i, spec in enumerate(count_specs):
+                    if name in spec["tags"]:
+                        extra[i] += 1
+            if blocked is not None:
+                # frühestens hinter dem gefundenen Tag erneut prüfen
+                resume_at = offset + blocked + 1
+                continue
+            for spec, count in zip(count_specs, extra):
+                self.counts[spec["name"]] += count
+            return self._values()
+        self.close()
+        self._flush()
+        return self._values()
+
+    def _string(self, element):
+        # BeautifulSoup .string: genau ein Kind; Text direkt, Element rekursiv
+        while element.children == 1:
+            kind, value = element.first_child
+            if kind != "el":
+                return value
+            element = value
+        return None
+
+    def _value(self, spec, capture):
+        if not isinstance(capture, _Capture):
+            return capture
+        if spec["mode"] == "string":
+            value = self._string(capture.element)
+            return value.strip() if value is not None else None
+        return "".join(capture.parts)
+
+    def _values(self):
+        values = {}
+        for name, spec in self.fields.items():
+            if spec["mode"] == "count":
+                values[name] = self.counts[name]
+            elif "limit" in spec:
+                values[name] = [self._value(spec, c) for c in self.results[name]]
+            else:
+                value = self._value(spec, self.results[name][0]) if self.results[name] else None
+                values[name] = spec["default"] if value is None else value
+        return values
+
+
+EXTRACTION_PROFILES = {
+    # entspricht der bisherigen BeautifulSoup-Extraktion
+    "default": ExtractionProfile({
+        "title": {"selector": "title", "mode": "string", "default": "Kein Titel"},
+        "description": {"selector": "meta[name=description]", "mode": "attr", "attr": "content"},
+        "headings": {"selector": "h1, h2, h3", "limit": 5},
+        "paragraphs": {"selector": "p", "limit": 3},
+        "link_count": {"selector": "a", "mode": "count"},
+    }),
+    # nur Metadaten aus <head>, der Body wird nicht geparst
+    "head": ExtractionProfile({
+        "title": {"selector": "title", "mode": "string", "default": "Kein Titel", "scope": "head"},
+        "description": {"selector": "meta[name=description]", "mode": "attr", "attr": "content", "scope": "head"},
+    }),
+}
+
+
+# ----------------- HTTP-Cache -----------------
+
+# nur vollständige 200-Antworten landen im Cache; diese Header werden mitgespeichert
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Expires", "Date", "Age", "Vary")
+HEURISTIC_FRESHNESS_MAX = 24 * 60 * 60
+
+CachedResponse = namedtuple("CachedResponse", "url status headers body fresh")
+
+
+def parse_cache_control(value):
+    """Cache-Control als Dict (Direktive -> Wert oder True)."""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') if arg else True
+    return directives
+
+
+def _http_date(value):
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers, now=None):
+    """Frische-Dauer in Sekunden nach RFC 7234 (max-age, Expires, sonst 10 % des Alters laut Last-Modified).
+
+    Für Antworten, die nicht gespeichert werden dürfen (no-store, Vary: *), wird None geliefert.
+    """
+    now = time.time() if now is None else now
+    cc = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in cc or (headers.get("Vary") or "").strip() == "*":
+        return None
+    if "no-cache" in cc:
+        return 0.0
+    date = _http_date(headers.get("Date")) or now
+    if "max-age" in cc:
+        try:
+            lifetime = float(cc["max-age"])
+        except (TypeError, ValueError):
+            lifetime = 0.0
+    elif headers.get("Expires"):
+        # ungültiges Expires (z. B. "0") gilt als bereits abgelaufen
+        expires = _http_date(headers.get("Expires"))
+        lifetime = expires - date if expires else 0.0
+    else:
+        last_modified = _http_date(headers.get("Last-Modified"))
+        lifetime = min((date - last_modified) * 0.1, HEURISTIC_FRESHNESS_MAX) if last_modified else 0.0
+    try:
+        age = float(headers.get("Age") or 0)
+    except ValueError:
+        age = 0.0
+    return max(0.0, lifetime - age)
+
+
+class HTTPCache:
+    """Plattencache für Antworten: Bodies komprimiert und inhaltsadressiert, Index in SQLite, LRU bei Größenlimit.
+
+    Layout: ``<cache_dir>/index.sqlite3`` und ``<cache_dir>/objects/ab/abcdef...`` (SHA-256 des Bodys,
+    zlib-komprimiert). Gleiche Bodies unter verschiedenen URLs belegen nur einmal Platz.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.max_bytes = max_bytes
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), timeout=30, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                headers TEXT,
+                digest TEXT,
+                size INTEGER,
+                stored_at REAL,
+                expires_at REAL,
+                last_access REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access);
+            CREATE INDEX IF NOT EXISTS idx_responses_digest ON responses(digest);
+        """)
+        self.conn.commit()
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0, "too_large": 0}
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def lookup(self, url, allow_stale=False):
+        """Gespeicherte Antwort oder None; fresh=False heißt: vor Verwendung revalidieren."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status, headers, digest, expires_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            status, headers, digest, expires_at = row
+            try:
+                with open(self._object_path(digest), "rb") as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                # Objekt fehlt oder ist beschädigt: Eintrag verwerfen
+                self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.conn.commit()
+                self.stats["misses"] += 1
+                return None
+            now = time.time()
+            fresh = expires_at > now
+            self.stats["hits" if fresh or allow_stale else "stale"] += 1
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+            self.conn.commit()
+            return CachedResponse(url, status, json.loads(headers), body, fresh)
+
+    def store(self, url, status, headers, body):
+        """Speichert eine vollständige Antwort, sofern sie laut Cache-Headern speicherbar ist."""
+        subset = {name: headers.get(name) for name in CACHED_HEADERS if headers.get(name)}
+        now = time.time()
+        lifetime = freshness_lifetime(subset, now)
+        if lifetime is None:
+            return False
+        digest = hashlib.sha256(body).hexdigest()
+        data = zlib.compress(body, 6)
+        if self.max_bytes and len(data) > self.max_bytes:
+            # passt allein nicht ins Limit: nicht speichern, statt dafür den ganzen Cache zu leeren
+            with self._lock:
+                self.stats["too_large"] += 1
+            return False
+        path = self._object_path(digest)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            old = self.conn.execute("SELECT digest FROM responses WHERE url = ?", (url,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (url, status, headers, digest, size, stored_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(subset), digest, len(data), now, now + lifetime, now),
+            )
+            if old and old[0] != digest:
+                self._drop_object_if_unused(old[0])
+            self.stats["stored"] += 1
+            self._evict(keep=url)
+            self.conn.commit()
+        return True
+
+    def refresh(self, url, headers):
+        """Nach 304 Not Modified: neue Header übernehmen und die Frische neu berechnen."""
+        with self._lock:
+            row = self.conn.execute("SELECT headers FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            merged = json.loads(row[0])
+            merged.update({name: headers.get(name) for name in CACHED_HEADERS if headers.get(name)})
+            now = time.time()
+            lifetime = freshness_lifetime(merged, now) or 0.0
+            self.conn.execute(
+                "UPDATE responses SET headers = ?, expires_at = ?, last_access = ? WHERE url = ?",
+                (json.dumps(merged), now + lifetime, now, url),
+            )
+            self.conn.commit()
+            self.stats["revalidated"] += 1
+
+    def total_bytes(self):
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM responses GROUP BY digest)"
+        ).fetchone()
+        return row[0]
+
+    def _drop_object_if_unused(self, digest):
+        if self.conn.execute("SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return 0
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
+        return 1
+
+    def _evict(self, keep=None):
+        """Entfernt die am längsten nicht genutzten Einträge (außer keep), bis das Größenlimit eingehalten ist."""
+        if not self.max_bytes:
+            return
+        total = self.total_bytes()
+        while total > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT url, digest, size FROM responses WHERE url IS NOT ? ORDER BY last_access LIMIT 100", (keep,)
+            ).fetchall()
+            if not rows:
+                break
+            for url, digest, size in rows:
+                self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.stats["evicted"] += 1
+                if self._drop_object_if_unused(digest):
+                    total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def get_summary(self):
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {**self.stats, "entries": entries, "bytes": self.total_bytes()}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# ----------------- Recrawl-Planung -----------------
+
+DEFAULT_CHANGE_INTERVAL = 7 * 24 * 3600  # angenommene Änderungsrate für Seiten mit nur einem Abruf
+DueURL = namedtuple("DueURL", "url probability interval")
+
+
+def content_hash(record):
+    """Fingerprint der extrahierten Felder (ohne Zeitstempel), damit dynamisches Markup keine Änderung vortäuscht."""
+    fields = {key: value for key, value in record.items() if key not in ("url", "crawled_at", "status")}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def estimate_change_rate(fetches, changes, observed_seconds, default_interval=DEFAULT_CHANGE_INTERVAL):
+    """Änderungen pro Sekunde nach Cho/Garcia-Molina: -ln((n - X + 0.5) / (n + 0.5)) / mittleres Intervall.
+
+    n ist die Zahl der Abstände zwischen Abrufen, X die Zahl der dabei erkannten Änderungen.
+    """
+    intervals = fetches - 1
+    if intervals <= 0 or observed_seconds <= 0:
+        return 1.0 / default_interval
+    mean_interval = observed_seconds / intervals
+    return -math.log((intervals - changes + 0.5) / (intervals + 0.5)) / mean_interval
+
+
+class RecrawlPlanner:
+    """Fetch-Historie pro URL (Tabelle fetch_history) und Auswahl der fälligen Seiten für einen Recrawl.
+
+    Priorität ist die Wahrscheinlichkeit, dass sich eine Seite seit dem letzten Abruf geändert hat
+    (Poisson-Modell, 1 - exp(-λ·Alter)). Seiten jünger als ``min_interval`` sind nie fällig,
+    älter als ``max_interval`` immer.
+    """
+
+    def __init__(self, db_path, default_interval=DEFAULT_CHANGE_INTERVAL, min_interval=3600,
+                 max_interval=30 * 24 * 3600):
+        self.db_path = db_path
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fetch_history (
+                url TEXT PRIMARY KEY,
+                first_fetch REAL,
+                last_fetch REAL,
+                last_change REAL,
+                fetch_count INTEGER,
+                change_count INTEGER,
+                content_hash TEXT,
+                status INTEGER
+            )
+            """
+        )
+        conn.commit()
+        conn.close()
+
+    def record(self, url, digest, status=200, now=None):
+        """Trägt einen Abruf ein; liefert "new", "changed" oder "unchanged"."""
+        now = time.time() if now is None else now
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT content_hash FROM fetch_history WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO fetch_history VALUES (?, ?, ?, ?, 1, 0, ?, ?)", (url, now, now, now, digest, status)
+                )
+                result = "new"
+            elif row[0] != digest:
+                conn.execute(
+                    "UPDATE fetch_history SET last_fetch = ?, last_change = ?, fetch_count = fetch_count + 1, "
+                    "change_count = change_count + 1, content_hash = ?, status = ? WHERE url = ?",
+                    (now, now, digest, status, url),
+                )
+                result = "changed"
+            else:
+                conn.execute(
+                    "UPDATE fetch_history SET last_fetch = ?, fetch_count = fetch_count + 1, status = ? WHERE url = ?",
+                    (now, status, url),
+                )
+                result = "unchanged"
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+
+    def change_probability(self, first_fetch, last_fetch, fetch_count, change_count, now):
+        age = now - last_fetch
+        if age < self.min_interval:
+            return 0.0
+        if age >= self.max_interval:
+            return 1.0
+        rate = max(
+            estimate_change_rate(fetch_count, change_count, last_fetch - first_fetch, self.default_interval),
+            1.0 / self.max_interval,
+        )
+        return 1.0 - math.exp(-rate * age)
+
+    def due(self, budget, host=None, now=None, min_probability=0.0):
+        """Bis zu budget fällige URLs, absteigend nach Änderungswahrscheinlichkeit."""
+        now = time.time() if now is None else now
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT url, first_fetch, last_fetch, fetch_count, change_count FROM fetch_history"
+            ).fetchall()
+        finally:
+            conn.close()
+        candidates = []
+        for url, first_fetch, last_fetch, fetch_count, change_count in rows:
+            if host is not None and urlsplit(url).netloc != host:
+                continue
+            probability = self.change_probability(first_fetch, last_fetch, fetch_count, change_count, now)
+            if probability > min_probability:
+                rate = estimate_change_rate(fetch_count, change_count, last_fetch - first_fetch, self.default_interval)
+                interval = 1.0 / rate if rate > 0 else float("inf")
+                candidates.append(DueURL(url, probability, interval))
+        return heapq.nlargest(budget, candidates, key=lambda d: d.probability)
+
+
 class WebCrawler:
-    def __init__(self, start_url, max_pages=50, delay=1, json_file="crawled_data.json", save_to_db=False, db_path="crawled_data.db"):
+    def __init__(self, start_url, max_pages=50, delay=1, json_file="crawled_data.json", save_to_db=False, db_path="crawled_data.db",
+                 strip_params=DEFAULT_STRIP_PARAMS, sort_query=True, url_cache_size=65536,
+                 max_page_bytes=5_000_000, skip_binary_extensions=True,
+                 scorers=DEFAULT_SCORERS, max_depth=None, path_budgets=None,
+                 use_sitemaps=False, max_sitemap_urls=100_000,
+                 max_concurrency=1, max_retries=3, circuit_cooldown=30.0,
+                 http_cache_dir=None, http_cache_max_bytes=512 * 1024 * 1024, offline=False,
+                 discovery_only=False, recrawl_urls=None, extraction_profile=None, term_index=False,
+                 detect_traps=True, trap_limits=None, pipeline_workers=None, pipeline_queue_size=64):
+        self.canonicalizer = URLCanonicalizer(strip_params=strip_params, sort_query=sort_query, cache_size=url_cache_size)
         self.start_url = start_url
         self.max_pages = max_pages
         self.delay = delay
-        self.visited = set()
-        self.to_visit = deque([start_url])
-        self.data = []
+        # visited, data und _data_index (url -> Position in data) entstehen erst beim ersten Zugriff
+        # aus der JSON-Datei, siehe __getattr__
+        # Crawler-Fallen (Kalender, Facetten, Session-IDs) werden schon beim Einreihen abgewiesen
+        self.trap_detector = TrapDetector(**(trap_limits or {})) if detect_traps else None
+        self.to_visit = Frontier(
+            scorers=scorers, max_depth=max_depth, path_budgets=path_budgets, traps=self.trap_detector
+        )
         self.json_file = json_file
         self.save_to_db = save_to_db
         self.db_path = db_path
-        
+        self.max_page_bytes = max_page_bytes
+        self.skip_binary_extensions = skip_binary_extensions
+        # Zähler für Seiten, die vor/beim Download verworfen wurden
+        self.use_sitemaps = use_sitemaps
+        self.max_sitemap_urls = max_sitemap_urls
+        # Drosselung pro Host; delay ist der Mindestabstand zwischen Requests
+        self.controller = HostController(min_delay=delay, max_concurrency=max_concurrency, cooldown=circuit_cooldown)
+        self.max_retries = max_retries
+        self.retry_queue = []  # Heap aus (fällig_ab, seq, url, depth, versuch)
+        self._retry_seq = 0
+        self.retry_stats = {"requeued": 0, "gave_up": 0}
+        # im Cluster-Modus gesammelte Links auf andere Hosts (None = verwerfen)
+        self.external_links = None
+        self.sitemap_stats = {"sitemaps": 0, "urls": 0, "queued": 0}
+        self.skipped = {"extension": 0, "content_type": 0, "too_large": 0, "truncated": 0}
+        # welcher Weg der Zeichensatz-Erkennung pro Seite genommen wurde (Anzahl + Sekunden)
+        self.charset_stats = {}
+        # optionaler Antwort-Cache auf Platte; offline = nur aus dem Cache lesen, nie ins Netz
+        self.http_cache = HTTPCache(http_cache_dir, max_bytes=http_cache_max_bytes) if http_cache_dir else None
+        self.offline = offline
+        # nur den Link-Graphen erfassen: URL, Status und Outlinks, keine Textfelder
+        self.discovery_only = discovery_only
+        self.extraction_profile = extraction_profile or EXTRACTION_PROFILES["default"]
+        # Recrawl: fällige URLs (DueURL) statt start_url; neue Inhalte ersetzen alte Einträge
+        self.recrawl = recrawl_urls is not None
+        self.history = None
+        self.history_stats = {"new": 0, "changed": 0, "unchanged": 0}
+        # TF-IDF-Index für "ähnliche Seiten", wird während des Crawls in Schüben nachgezogen
+        self.use_term_index = term_index and save_to_db
+        self.term_index = None
+        # DB, Fetch-Historie und Term-Index werden erst mit ensure_db() beim Crawlen angelegt
+        self._db_ready = not save_to_db
+        self.term_index_stats = {"added": 0, "updated": 0, "removed": 0}
+        self._unindexed = 0
+        self._write_lock = threading.Lock()
+        # gestufte Pipeline statt Schleife: Worker pro Stufe ({"fetch": 4, "parse": 2, ...}), None = aus
+        self.pipeline_workers = pipeline_workers
+        self.pipeline_queue_size = pipeline_queue_size
+        self.pipeline_stats = None
+        self.persist_stage = None
+
         self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -37,318 +1742,2302 @@ class WebCrawler:
             )
         }
 
-        self.domain = urlparse(start_url).netloc
-        self.domain = urlparse(start_url).netloc
+        start = self.canonicalizer.parse(start_url)
+        self.domain = start.netloc
+
+        # robots.txt wird erst beim ersten Bedarf geladen; crawl() startet den Abruf parallel zur ersten Seite
+        self._robot_parser = None
+        self._robots_loaded = False
+        self._robots_thread = None
+        self._robots_lock = threading.Lock()
+
+        # die Frontier verhindert selbst mehrfache Einträge; URLs werden normalisiert eingereiht
+        if not self.recrawl:
+            self.to_visit.push(self.normalize_url(start_url), depth=0)
+
+        if self.recrawl:
+            for due in recrawl_urls:
+                norm = self.normalize_url(due.url)
+                # bereits gecrawlt, soll aber erneut abgerufen werden
+                self.visited.discard(norm)
+                self.to_visit.push(norm, depth=0, change_probability=due.probability)
+            # max_pages ist beim Recrawl das Budget dieses Laufs, bekannte Seiten zählen nicht mit
+            self.max_pages += len(self.visited)
+
+    def __getattr__(self, name):
+        # Existierende URLs aus JSON erst beim ersten Zugriff laden (Duplikatvermeidung)
+        if name in ("visited", "data", "_data_index") and "json_file" in self.__dict__:
+            try:
+                self.load_existing_data()
+            except Exception:
+                # load_existing_data loggt Fehler selbst; der Zugriff soll trotzdem gelingen
+                logger.exception("Fehler beim Laden vorhandener Daten")
+            if name in self.__dict__:
+                return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def robot_parser(self):
+        """RobotsMatcher der Start-Domain oder None; wartet beim ersten Zugriff auf den Abruf."""
+        if not self._robots_loaded:
+            self.prefetch_robots()
+            thread = self._robots_thread
+            if thread is not None:
+                thread.join()
+        return self._robot_parser
+
+    @robot_parser.setter
+    def robot_parser(self, matcher):
+        self._robot_parser = matcher
+        self._robots_loaded = True
+
+    def prefetch_robots(self):
+        """Startet den robots.txt-Abruf im Hintergrund (höchstens einmal)."""
+        with self._robots_lock:
+            if self._robots_thread is None and not self._robots_loaded:
+                self._robots_thread = threading.Thread(target=self.load_robots, name="robots", daemon=True)
+                self._robots_thread.start()
+
+    def load_robots(self):
+        # robots.txt einlesen (sicher mit timeout, damit es nicht hängt)
+        import requests
+
+        matcher = None
+        start = self.canonicalizer.parse(self.start_url)
+        robots_url = f"{start.scheme or 'https'}://{self.domain}/robots.txt"
+        try:
+            if self.offline:
+                raise RuntimeError("Offline-Modus")
+            resp = requests.get(robots_url, headers=self.headers, timeout=5)
+            if resp.status_code == 200:
+                matcher = RobotsMatcher()
+                # parse erwartet eine Liste von Zeilen
+                matcher.parse(resp.text.splitlines())
+                logger.info(f"robots.txt geladen von {robots_url}")
+            else:
+                logger.info(f"robots.txt nicht gefunden (Status {resp.status_code}), erlauben standardmäßig alles")
+        except Exception as e:
+            logger.warning(f"robots.txt konnte nicht geladen werden: {e}. Erlaube standardmäßig alles.")
+        finally:
+            if not self._robots_loaded:
+                self.robot_parser = matcher
+
+    def ensure_db(self):
+        """Legt SQLite-DB, Fetch-Historie und Term-Index beim ersten Bedarf an."""
+        if self._db_ready:
+            return
+        self._db_ready = True
+        try:
+            self.init_db()
+        except Exception:
+            logger.exception("Fehler beim Initialisieren der SQLite-DB")
+        try:
+            self.history = RecrawlPlanner(self.db_path)
+            if self.use_term_index:
+                self.term_index = TermIndex(self.db_path)
+        except Exception as e:
+            logger.error(f"Fehler beim Öffnen von Fetch-Historie/Term-Index in {self.db_path}: {e}")
+
+    def load_existing_data(self):
+        self.__dict__.setdefault("visited", set())
+        self.__dict__.setdefault("data", [])
+        self.__dict__.setdefault("_data_index", {})
+        if os.path.exists(self.json_file):
+            try:
+                with open(self.json_file, "r", encoding="utf-8") as f:
+                    existing = json.load(f)
+                    # normalize and dedupe existing entries, but only for current domain
+                    seen = set()
+                    deduped = []
+                    for item in existing:
+                        url = item.get("url")
+                        if not url:
+                            continue
+                        canonical = self.canonicalizer.parse(url)
+                        if canonical.netloc != self.domain:
+                            continue  # skip URLs from other domains
+                        norm = canonical.url
+                        if norm in seen:
+                            continue
+                        seen.add(norm)
+                        # vollständige Einträge kompakt halten, alles andere unverändert übernehmen
+                        record = CrawlRecord.from_dict(item)
+                        if record is not None:
+                            item = record
+                        self._data_index[item["url"]] = len(deduped)
+                        deduped.append(item)
+                        self.visited.add(norm)
+                    self.data = deduped
+                logger.info(f"{len(self.visited)} URLs aus {self.json_file} geladen (nur Domain {self.domain}) zum Vermeiden von Duplikaten")
+            except Exception as e:
+                logger.error(f"Fehler beim Laden vorhandener Daten: {e}")
+
+    def normalize_url(self, url: str) -> str:
+        # kanonische Form (ohne Fragment/Tracking-Parameter, sortierte Query), gecacht pro Roh-URL
+        return self.canonicalizer.normalize(url)
+
+    def init_db(self):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cur = conn.cursor()
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crawled (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT UNIQUE,
+                    title TEXT,
+                    description TEXT,
+                    headings TEXT,
+                    paragraphs TEXT,
+                    link_count INTEGER,
+                    crawled_at TEXT
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS discovered (
+                    url TEXT PRIMARY KEY,
+                    status INTEGER,
+                    outlinks TEXT,
+                    crawled_at TEXT
+                )
+                """
+            )
+            # Link-Graph: URLs bekommen ganzzahlige IDs; pro Quellseite eine Zeile mit den
+            # Ziel-IDs als int32-Array (little endian) – entspricht einer CSR-Zeile
+            cur.execute("CREATE TABLE IF NOT EXISTS link_nodes (id INTEGER PRIMARY KEY, url TEXT UNIQUE)")
+            cur.execute("CREATE TABLE IF NOT EXISTS link_edges (src INTEGER PRIMARY KEY, dsts BLOB)")
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sitemap_entries (
+                    url TEXT PRIMARY KEY,
+                    lastmod TEXT,
+                    priority REAL,
+                    changefreq TEXT,
+                    sitemap TEXT
+                )
+                """
+            )
+            conn.commit()
+            conn.close()
+            logger.info(f"SQLite DB initialisiert: {self.db_path}")
+        except Exception as e:
+            logger.error(f"Fehler beim Initialisieren der DB {self.db_path}: {e}")
+
+    def save_record_to_db(self, record: dict):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cur = conn.cursor()
+            headings_json = json.dumps(record.get("headings", []), ensure_ascii=False)
+            paragraphs_json = json.dumps(record.get("paragraphs", []), ensure_ascii=False)
+            cur.execute(
+                """
+                INSERT INTO crawled (url, title, description, headings, paragraphs, link_count, crawled_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    description = excluded.description,
+                    headings = excluded.headings,
+                    paragraphs = excluded.paragraphs,
+                    link_count = excluded.link_count,
+                    crawled_at = excluded.crawled_at
+                """,
+                (
+                    record.get("url"),
+                    record.get("title"),
+                    record.get("description"),
+                    headings_json,
+                    paragraphs_json,
+                    record.get("link_count"),
+                    record.get("crawled_at"),
+                ),
+            )
+            conn.commit()
+            conn.close()
+            logger.debug(f"Datensatz in DB gespeichert: {record.get('url')}")
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern in DB: {e}")
+
+    def save_discovery_to_db(self, record: dict):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                "INSERT OR REPLACE INTO discovered (url, status, outlinks, crawled_at) VALUES (?, ?, ?, ?)",
+                (record["url"], record["status"], json.dumps(record["outlinks"]), record["crawled_at"]),
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern in DB: {e}")
+
+    def save_edges_to_db(self, url, outlinks):
+        """Ersetzt die ausgehenden Kanten von url im Link-Graphen."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            urls = [url] + list(outlinks)
+            conn.executemany("INSERT OR IGNORE INTO link_nodes (url) VALUES (?)", ((u,) for u in urls))
+            ids = {}
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                ids.update(conn.execute(
+                    f"SELECT url, id FROM link_nodes WHERE url IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall())
+            dsts = array("i", sorted({ids[u] for u in outlinks if u != url}))
+            if sys.byteorder == "big":
+                dsts.byteswap()
+            conn.execute(
+                "INSERT OR REPLACE INTO link_edges (src, dsts) VALUES (?, ?)", (ids[url], dsts.tobytes())
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der Links von {url}: {e}")
+
+    def save_sitemap_entries_to_db(self, rows):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO sitemap_entries (url, lastmod, priority, changefreq, sitemap)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der Sitemap-Einträge: {e}")
+
+    def discover_sitemaps(self):
+        """Sitemap-URLs aus robots.txt, sonst /sitemap.xml der Start-Domain."""
+        sitemaps = list(self.robot_parser.sitemaps) if self.robot_parser else []
+        if not sitemaps:
+            scheme = self.canonicalizer.parse(self.start_url).scheme or "https"
+            sitemaps.append(f"{scheme}://{self.domain}/sitemap.xml")
+        return sitemaps
+
+    def ingest_sitemaps(self, sitemap_urls=None):
+        """Liest Sitemaps (inkl. Index und .xml.gz) gestreamt und füllt die Frontier in Batches."""
+        import requests
+
+        if self.offline:
+            logger.info("Offline-Modus: Sitemaps werden nicht geladen.")
+            return
+        pending = deque(sitemap_urls if sitemap_urls is not None else self.discover_sitemaps())
+        seen_sitemaps = set()
+        batch, rows = [], []
+
+        def flush():
+            self.sitemap_stats["queued"] += self.to_visit.push_many(batch)
+            if self.save_to_db and rows:
+                self.save_sitemap_entries_to_db(rows)
+            batch.clear()
+            rows.clear()
+
+        while pending and self.sitemap_stats["urls"] < self.max_sitemap_urls:
+            sitemap_url = pending.popleft()
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+            response = None
+            try:
+                response = requests.get(sitemap_url, headers=self.headers, timeout=10, stream=True)
+                if response.status_code != 200:
+                    logger.info(f"Sitemap nicht gefunden (Status {response.status_code}): {sitemap_url}")
+                    continue
+                self.sitemap_stats["sitemaps"] += 1
+                stream = open_sitemap_stream(response.iter_content(chunk_size=65536))
+                for kind, loc, lastmod, priority, changefreq in iter_sitemap(stream):
+                    if kind == "sitemap":
+                        pending.append(loc)
+                        continue
+                    canonical = self.canonicalizer.parse(loc)
+                    if canonical.netloc != self.domain or not self.is_valid_url(canonical.url):
+                        continue
+                    self.sitemap_stats["urls"] += 1
+                    info = {"lastmod": lastmod}
+                    if priority is not None:
+                        info["sitemap_priority"] = priority
+                    batch.append((canonical.url, 1, info))
+                    rows.append((canonical.url, lastmod, priority, changefreq, sitemap_url))
+                    if len(batch) >= SITEMAP_BATCH_SIZE:
+                        flush()
+                    if self.sitemap_stats["urls"] >= self.max_sitemap_urls:
+                        logger.info(f"Limit von {self.max_sitemap_urls} Sitemap-URLs erreicht")
+                        break
+            except Exception as e:
+                logger.error(f"Fehler beim Lesen der Sitemap {sitemap_url}: {e}")
+            finally:
+                if response is not None:
+                    response.close()
+        flush()
+        logger.info(
+            f"{self.sitemap_stats['queued']} URLs aus {self.sitemap_stats['sitemaps']} Sitemap(s) in die Queue übernommen"
+        )
+        return self.sitemap_stats["queued"]
+
+    def can_fetch(self, url):
+        # wenn kein Robotparser verfügbar ist, erlauben wir das Crawlen
+        try:
+            if not self.robot_parser:
+                return True
+            # Pfad aus dem gecachten Parse; die Entscheidung selbst wird pro Pfad gecacht
+            canonical = self.canonicalizer.parse(url)
+            target = canonical.path + ("?" + canonical.query if canonical.query else "")
+            return self.robot_parser.allowed(self.headers["User-Agent"], target)
+        except Exception:
+            return True
+
+    def is_valid_url(self, url):
+        try:
+            canonical = self.canonicalizer.parse(url)
+            if canonical.scheme not in ("http", "https"):
+                return False
+            if canonical.netloc != self.domain:
+                return False
+            clean = canonical.url
+            if clean in self.visited:
+                return False
+            if self.has_binary_extension(canonical.path):
+                return False
+            return self.can_fetch(clean)
+        except Exception:
+            return False
+
+    def find_hrefs(self, html):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        return [link["href"] for link in soup.find_all("a", href=True)]
+
+    def extract_links(self, url, html, outlinks=None):
+        try:
+            return self.queue_links(url, self.find_hrefs(html), outlinks)
+        except Exception as e:
+            logger.error(f"Fehler beim Extrahieren von Links: {e}")
+            return []
+
+    def resolve_links(self, url, hrefs):
+        """Absolute, normalisierte Link-Ziele ohne Duplikate; greift nicht auf die Frontier zu (thread-sicher)."""
+        return list(dict.fromkeys(self.normalize_url(urljoin(url, href)) for href in hrefs))
+
+    def queue_links(self, url, hrefs, outlinks=None):
+        """Normalisiert hrefs relativ zu url und liefert die neu zu crawlenden Links.
+
+        Ist outlinks eine Liste, werden dort alle (deduplizierten) Ziele der Seite gesammelt.
+        """
+        links = []
+        seen = set()
+        try:
+            for href in hrefs:
+                absolute_url = urljoin(url, href)
+                norm = self.normalize_url(absolute_url)
+                if norm in seen:
+                    continue
+                seen.add(norm)
+                if outlinks is not None:
+                    outlinks.append(norm)
+                # bereits wartende URLs bekommen nur einen weiteren Inlink
+                if norm in self.to_visit:
+                    self.to_visit.add_inlink(norm)
+                elif self.is_valid_url(norm):
+                    links.append(norm)
+                elif self.external_links is not None:
+                    canonical = self.canonicalizer.parse(norm)
+                    if canonical.scheme in ("http", "https") and canonical.netloc != self.domain:
+                        self.external_links.append(norm)
+        except Exception as e:
+            logger.error(f"Fehler beim Extrahieren von Links: {e}")
+        return links
+
+    def extract_content(self, url, html):
+        try:
+            values = self.extraction_profile.extract(html)
+            extra = {name: value for name, value in values.items() if name not in CrawlRecord.FIELDS}
+            fields = {name: value for name, value in values.items() if name in CrawlRecord.FIELDS}
+            # gecrawlte URLs liegen immer auf self.domain
+            return CrawlRecord(url, host=self.domain, extra=extra or None, **fields)
+        except Exception as e:
+            logger.error(f"Fehler beim Extrahieren von Inhalten: {e}")
+            return None
+
+    def has_binary_extension(self, path):
+        if not self.skip_binary_extensions:
+            return False
+        ext = os.path.splitext(path)[1].lower()
+        return ext in BINARY_EXTENSIONS
+
+    def fetch_page(self, url, outcome=None):
+        """Lädt eine Seite; optional werden Status, Latenz, Retry-After und Fehlerart in outcome eingetragen."""
+        fetched = self.fetch_body(url, outcome)
+        return None if fetched is None else self.decode_body(url, *fetched)
+
+    def fetch_body(self, url, outcome=None):
+        """Wie fetch_page, aber ohne Dekodierung: (Bytes, Content-Type) oder None."""
+        import requests
+
+        if outcome is None:
+            outcome = {}
+        # Endung zuerst: übersprungene URLs müssen nicht auf robots.txt warten
+        if self.has_binary_extension(self.canonicalizer.parse(url).path):
+            self.skipped["extension"] += 1
+            outcome["skipped"] = "extension"
+            logger.info(f"Übersprungen (Binär-Endung): {url}")
+            return None
+        if not self.can_fetch(url):
+            outcome["skipped"] = "robots"
+            logger.info(f"Crawling von {url} durch robots.txt verboten.")
+            return None
+        response = None
+        start = time.monotonic()
+        cached = None
+        headers = self.headers
+        if self.http_cache is not None:
+            cached = self.http_cache.lookup(url, allow_stale=self.offline)
+            if cached is not None and (cached.fresh or self.offline):
+                outcome["status"] = cached.status
+                outcome["cache"] = "hit"
+                outcome["latency"] = time.monotonic() - start
+                return cached.body, cached.headers.get("Content-Type") or ""
+            if cached is not None:
+                # veraltet: bedingt anfragen, 304 liefert den gespeicherten Body
+                headers = dict(self.headers)
+                if cached.headers.get("ETag"):
+                    headers["If-None-Match"] = cached.headers["ETag"]
+                if cached.headers.get("Last-Modified"):
+                    headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+        if self.offline:
+            outcome["error"] = "offline"
+            logger.info(f"Offline: {url} nicht im Cache")
+            return None
+        try:
+            response = requests.get(url, headers=headers, timeout=10, stream=True)
+            outcome["status"] = response.status_code
+            outcome["retry_after"] = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 304 and cached is not None:
+                self.http_cache.refresh(url, response.headers)
+                outcome["cache"] = "revalidated"
+                return cached.body, cached.headers.get("Content-Type") or ""
+            response.raise_for_status()
+
+            # Header prüfen, bevor der Body gelesen wird
+            content_type = (response.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                self.skipped["content_type"] += 1
+                logger.info(f"Übersprungen (Content-Type {content_type}): {url}")
+                return None
+            length = response.headers.get("Content-Length")
+            if self.max_page_bytes and length and length.isdigit() and int(length) > self.max_page_bytes:
+                self.skipped["too_large"] += 1
+                logger.info(f"Übersprungen (Content-Length {length} > {self.max_page_bytes}): {url}")
+                return None
+
+            chunks = []
+            received = 0
+            truncated = False
+            for chunk in response.iter_content(chunk_size=65536):
+                chunks.append(chunk)
+                received += len(chunk)
+                if self.max_page_bytes and received >= self.max_page_bytes:
+                    # ohne Content-Length: nach max_page_bytes abschneiden und den Rest nicht laden
+                    if received > self.max_page_bytes:
+                        truncated = True
+                        self.skipped["truncated"] += 1
+                        logger.info(f"Seite nach {self.max_page_bytes} Bytes abgeschnitten: {url}")
+                    break
+            body = b"".join(chunks)
+            if self.max_page_bytes:
+                body = body[: self.max_page_bytes]
+            if self.http_cache is not None and response.status_code == 200 and not truncated:
+                try:
+                    self.http_cache.store(url, response.status_code, response.headers, body)
+                except Exception as e:
+                    logger.error(f"Fehler beim Speichern im HTTP-Cache für {url}: {e}")
+            return body, response.headers.get("Content-Type") or ""
+        except requests.Timeout as e:
+            outcome["error"] = "timeout"
+            logger.error(f"Timeout beim Abrufen von {url}: {e}")
+            return None
+        except requests.ConnectionError as e:
+            outcome["error"] = "connection"
+            logger.error(f"Verbindungsfehler beim Abrufen von {url}: {e}")
+            return None
+        except Exception as e:
+            # Catch all exceptions (network errors, mocked exceptions, etc.)
+            outcome.setdefault("error", "other")
+            logger.error(f"Fehler beim Abrufen von {url}: {e}")
+            return None
+        finally:
+            outcome.setdefault("latency", time.monotonic() - start)
+            if response is not None:
+                response.close()
+
+    def decode_body(self, url, body, content_type=""):
+        start = time.perf_counter()
+        text, encoding, source = decode_html(body, content_type)
+        stats = self.charset_stats.setdefault(source, {"pages": 0, "seconds": 0.0})
+        stats["pages"] += 1
+        stats["seconds"] += time.perf_counter() - start
+        logger.debug(f"Zeichensatz {encoding} ({source}) für {url}")
+        return text
+
+    def has_work(self):
+        return bool(self.retry_queue) or (bool(self.to_visit) and len(self.visited) < self.max_pages)
+
+    def ready_in(self):
+        """Sekunden, bis der nächste Request gestartet werden darf."""
+        now = time.monotonic()
+        gate = self.controller.wait_time(now)
+        if (self.to_visit and len(self.visited) < self.max_pages) or not self.retry_queue:
+            return gate
+        # nur noch Wiederholungen offen: auf die früheste warten
+        return max(gate, self.retry_queue[0][0] - now)
+
+    def _pop_next(self):
+        """Nächste fällige Wiederholung, sonst die beste URL der Frontier: (url, depth, versuch)."""
+        if self.retry_queue and self.retry_queue[0][0] <= time.monotonic():
+            _, _, url, depth, attempt = heapq.heappop(self.retry_queue)
+            return url, depth, attempt
+        while self.to_visit and len(self.visited) < self.max_pages:
+            entry = self.to_visit.pop()
+            if entry is None:
+                return None
+            url, depth = entry
+            norm_url = self.normalize_url(url)
+            if norm_url in self.visited:
+                continue
+            self.visited.add(norm_url)
+            logger.info(f"Crawle ({len(self.visited)}/{self.max_pages}): {norm_url}")
+            return url, depth, 0
+        return None
+
+    def handle_outcome(self, url, depth, attempt, outcome):
+        """Meldet das Ergebnis an den Host-Regler und plant wiederholbare Fehler neu ein."""
+        status = outcome.get("status")
+        error = outcome.get("error")
+        retry_after = outcome.get("retry_after")
+        if outcome.get("cache") == "hit" or error == "offline" or outcome.get("skipped"):
+            # kein Netzwerk-Request: weder Drosselung noch Latenzmessung
+            self.controller.cancel_request()
+            return
+        if status in THROTTLE_STATUSES:
+            self.controller.record_throttle(retry_after)
+        elif error in RETRY_ERRORS or (status is not None and status >= 500):
+            self.controller.record_failure()
+        elif status is not None:
+            self.controller.record_success(outcome.get("latency", 0.0))
+
+        if status not in RETRY_STATUSES and error not in RETRY_ERRORS:
+            return
+        if attempt >= self.max_retries:
+            self.retry_stats["gave_up"] += 1
+            logger.warning(f"Gebe {url} nach {attempt + 1} Versuchen auf")
+            return
+        delay = max(backoff_delay(attempt), retry_after or 0.0)
+        self._retry_seq += 1
+        heapq.heappush(self.retry_queue, (time.monotonic() + delay, self._retry_seq, url, depth, attempt + 1))
+        self.retry_stats["requeued"] += 1
+        logger.info(f"Wiederhole {url} in {delay:.1f}s (Versuch {attempt + 2})")
+
+    def process_page(self, url, depth, html, status=None):
+        if self.discovery_only:
+            outlinks = []
+            links = self.queue_links(url, iter_hrefs(html), outlinks)
+            self.record_discovery(url, status, outlinks)
+            if self.save_to_db:
+                self.persist("edges", url, outlinks)
+                self.persist("history", url, {"outlinks": outlinks}, status)
+            self.to_visit.extend(links, depth=depth + 1)
+            return
+        content = self.extract_content(url, html)
+        if content:
+            self.store_content(url, content, status)
+
+        # Kanten nur sammeln, wenn sie auch gespeichert werden
+        outlinks = [] if self.save_to_db else None
+        links = self.extract_links(url, html, outlinks)
+        if outlinks is not None:
+            self.persist("edges", url, outlinks)
+        self.to_visit.extend(links, depth=depth + 1)
+
+    def apply_page(self, url, depth, status, content, outlinks):
+        """Wie process_page, aber mit bereits extrahiertem Datensatz und Link-Zielen (enqueue-Stufe der Pipeline)."""
+        links = self.queue_links(url, outlinks)
+        if self.discovery_only:
+            self.record_discovery(url, status, outlinks)
+            if self.save_to_db:
+                self.persist("history", url, {"outlinks": outlinks}, status)
+        elif content:
+            self.store_content(url, content, status)
+        if self.save_to_db:
+            self.persist("edges", url, outlinks)
+        self.to_visit.extend(links, depth=depth + 1)
+
+    def store_content(self, url, content, status=None):
+        # Prüfen, ob bereits im data, um Duplikate zu vermeiden (beim Recrawl: ersetzen)
+        index = self._data_index.get(content.url)
+        if index is not None and not self.recrawl:
+            return
+        if index is None:
+            self._data_index[content.url] = len(self.data)
+            self.data.append(content)
+        else:
+            self.data[index] = content
+        if self.save_to_db:
+            self.persist("record", url, content, status)
+
+    def persist(self, kind, *args):
+        """DB-Schreibzugriff; in der Pipeline übernimmt ihn die persist-Stufe."""
+        if self.persist_stage is not None:
+            self.persist_stage.put((kind, args))
+        else:
+            self.write(kind, *args)
+
+    def write(self, kind, *args):
+        {
+            "record": self.write_record,
+            "edges": self.save_edges_to_db,
+            "discovery": self.save_discovery_to_db,
+            "history": self.record_history,
+        }[kind](*args)
+
+    def write_record(self, url, content, status=None):
+        try:
+            self.save_record_to_db(content)
+        except Exception:
+            logger.exception("Fehler beim Speichern eines Eintrags in die DB")
+        self.record_history(url, content, status)
+        if self.term_index is not None:
+            with self._write_lock:
+                self._unindexed += 1
+                due = self._unindexed >= TERM_INDEX_BATCH
+            if due:
+                self.update_term_index()
+
+    def update_term_index(self):
+        with self._write_lock:
+            self._unindexed = 0
+            try:
+                for key, value in self.term_index.update().items():
+                    self.term_index_stats[key] += value
+            except Exception as e:
+                logger.error(f"Fehler beim Aktualisieren des Term-Index: {e}")
+
+    def record_history(self, url, record, status=None):
+        try:
+            result = self.history.record(self.normalize_url(url), content_hash(record), status or 200)
+            self.history_stats[result] += 1
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der Fetch-Historie für {url}: {e}")
+
+    def record_discovery(self, url, status, outlinks):
+        record = {"url": url, "status": status, "outlinks": outlinks, "crawled_at": datetime.now().isoformat()}
+        self.data.append(record)
+        if self.save_to_db:
+            self.persist("discovery", record)
+
+    def record_failure(self, url, outcome):
+        """Im Discovery-Modus endgültige HTTP-Fehler (z. B. 404) als tote Links festhalten."""
+        status = outcome.get("status")
+        if self.discovery_only and status is not None and status >= 400 and status not in RETRY_STATUSES:
+            self.record_discovery(url, status, [])
+
+    def crawl_next(self, wait=True):
+        """Bearbeitet die nächste URL (Wiederholung oder Frontier).
+
+        Liefert None, wenn nichts mehr zu tun ist, sonst True/False, je nachdem,
+        ob eine Seite erfolgreich geladen wurde. Mit wait=False wird nicht auf
+        Delay/Backoff gewartet, sondern sofort False geliefert.
+        """
+        if not self.has_work() or self.controller.dead:
+            return None
+        self.ensure_db()
+        delay = self.ready_in()
+        if delay > 0:
+            if not wait:
+                return False
+            time.sleep(delay)
+        entry = self._pop_next()
+        if entry is None:
+            return False if self.has_work() else None
+        url, depth, attempt = entry
+
+        self.controller.on_request_start()
+        outcome = {}
+        html = self.fetch_page(url, outcome)
+        self.handle_outcome(url, depth, attempt, outcome)
+        if not html:
+            self.record_failure(url, outcome)
+            return False
+        self.process_page(url, depth, html, outcome.get("status"))
+        return True
+
+    def _crawl_concurrent(self):
+        """Wie crawl_next in einer Schleife, aber mit bis zu controller.window parallelen Downloads."""
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.controller.max_concurrency) as pool:
+            while True:
+                while (
+                    not self.controller.dead
+                    and len(in_flight) < self.controller.allowed_in_flight()
+                    and self.ready_in() <= 0
+                ):
+                    entry = self._pop_next()
+                    if entry is None:
+                        break
+                    self.controller.on_request_start()
+                    outcome = {}
+                    future = pool.submit(self.fetch_page, entry[0], outcome)
+                    in_flight[future] = entry + (outcome,)
+                if not in_flight:
+                    if not self.has_work() or self.controller.dead:
+                        break
+                    time.sleep(min(max(self.ready_in(), 0.01), 1.0))
+                    continue
+                done, _ = wait_for_futures(in_flight, timeout=max(self.ready_in(), 0.01), return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth, attempt, outcome = in_flight.pop(future)
+                    html = future.result()
+                    self.handle_outcome(url, depth, attempt, outcome)
+                    if html:
+                        self.process_page(url, depth, html, outcome.get("status"))
+                    else:
+                        self.record_failure(url, outcome)
+
+    def crawl(self):
+        logger.info(f"Starte Crawler mit: {self.start_url}")
+        # robots.txt lädt im Hintergrund, während DB und vorhandene Daten vorbereitet werden;
+        # der erste Request wartet in can_fetch auf das Ergebnis
+        self.prefetch_robots()
+        self.ensure_db()
+        # Wenn Start-URL bereits gecrawlt wurde, nichts tun
+        if not self.recrawl and self.normalize_url(self.start_url) in self.visited:
+            logger.info(f"Start-URL {self.start_url} bereits gecrawlt — Abbruch.")
+            return self.data
+        if self.use_sitemaps:
+            self.ingest_sitemaps()
+        try:
+            if self.pipeline_workers is not None:
+                pipeline = CrawlPipeline(self, self.pipeline_workers, self.pipeline_queue_size)
+                try:
+                    pipeline.run()
+                finally:
+                    self.pipeline_stats = pipeline.get_summary()
+            elif self.controller.max_concurrency > 1:
+                self._crawl_concurrent()
+            else:
+                while self.crawl_next() is not None:
+                    pass
+            if self.controller.dead:
+                logger.error(f"Host {self.domain} antwortet dauerhaft nicht — Crawl abgebrochen.")
+        except KeyboardInterrupt:
+            logger.info("Crawl durch Benutzer abgebrochen (KeyboardInterrupt). Speichere Fortschritt...")
+        except Exception as e:
+            logger.error(f"Unerwarteter Fehler während des Crawls: {e}")
+        if self._unindexed:
+            self.update_term_index()
+
+        logger.info(f"Crawl abgeschlossen! {len(self.visited)} Seiten gecrawlt.")
+        return self.data
+
+    def save_to_json(self):
+        try:
+            # Bestehende Datei laden (falls vorhanden)
+            existing_data = []
+            if os.path.exists(self.json_file):
+                with open(self.json_file, "r", encoding="utf-8") as f:
+                    try:
+                        existing_data = json.load(f)
+                    except json.JSONDecodeError:
+                        existing_data = []
+            # normalize urls in existing and current data, avoid duplicates;
+            # aktuelle Daten ersetzen vorhandene Einträge derselben URL (Recrawl)
+            current = {}
+            for item in self.data:
+                url = item.get("url")
+                if url:
+                    current.setdefault(self.normalize_url(url), item)
+            all_data = [current.pop(self.normalize_url(item.get("url", "")), item) for item in existing_data]
+            all_data += current.values()
+            # Datensätze erst hier in Dicts umwandeln
+            all_data = [item.to_dict() if isinstance(item, CrawlRecord) else item for item in all_data]
+
+            with open(self.json_file, "w", encoding="utf-8") as f:
+                json.dump(all_data, f, indent=2, ensure_ascii=False)
+            logger.info(f"Daten gespeichert in {self.json_file} (gesamt {len(all_data)} Einträge)")
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern: {e}")
+
+    def get_summary(self):
+        return {
+            "total_pages": len(self.visited),
+            "total_items": len(self.data),
+            "domain": self.domain,
+            "start_url": self.start_url,
+            "skipped": dict(self.skipped),
+            "sitemaps": dict(self.sitemap_stats),
+            "controller": self.controller.get_summary(),
+            "retries": dict(self.retry_stats),
+            "frontier": {"queued": len(self.to_visit), **self.to_visit.dropped},
+            "traps": self.trap_detector.get_summary() if self.trap_detector else None,
+            "pipeline": self.pipeline_stats,
+            "http_cache": self.http_cache.get_summary() if self.http_cache else None,
+            "history": dict(self.history_stats) if self.history else None,
+            "term_index": dict(self.term_index_stats) if self.term_index else None,
+            "charset": {
+                source: f"{st['pages']} Seiten, {st['seconds'] * 1000:.1f} ms"
+                for source, st in self.charset_stats.items()
+            },
+        }
+
+
+
+# ----------------- Pipeline -----------------
+
+PIPELINE_STAGES = ("fetch", "decode", "parse", "enqueue", "persist")
+
+
+class PipelineStage:
+    """Stufe mit begrenzter Eingangs-Queue und eigenen Worker-Threads; misst Auslastung und Rückstau."""
+
+    def __init__(self, name, workers, maxsize):
+        self.name = name
+        self.workers = workers
+        self.queue = queue.Queue(maxsize)
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0  # Zeit, die Produzenten auf einen freien Platz gewartet haben
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def put(self, item):
+        start = time.perf_counter()
+        self.queue.put(item)
+        waited = time.perf_counter() - start
+        depth = self.queue.qsize()
+        with self._lock:
+            self.blocked += waited
+            self.max_depth = max(self.max_depth, depth)
+
+    def record(self, seconds):
+        with self._lock:
+            self.items += 1
+            self.busy += seconds
+
+    def start(self, handler):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(handler,), name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self, handler):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            start = time.perf_counter()
+            try:
+                handler(item)
+            except Exception:
+                logger.exception(f"Fehler in der Pipeline-Stufe {self.name}")
+            self.record(time.perf_counter() - start)
+
+    def stop(self):
+        """Arbeitet die Queue ab und beendet die Worker."""
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def get_summary(self, elapsed):
+        capacity = self.workers * elapsed
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_s": round(self.busy, 3),
+            "utilization": f"{self.busy / capacity:.0%}" if capacity else "-",
+            "backpressure_s": round(self.blocked, 3),
+            "max_queue": self.max_depth,
+        }
+
+
+class CrawlPipeline:
+    """Crawl als Stufen fetch → decode → parse → enqueue → persist, verbunden über begrenzte Queues.
+
+    enqueue läuft im aufrufenden Thread und ist als einzige Stufe für Frontier, visited und data
+    zuständig. Neue URLs gibt sie nur aus, solange Host-Regler und fetch-Worker Platz haben; volle
+    Queues halten die vorgelagerten Stufen an (Backpressure), so bleibt der Speicher begrenzt.
+    Datenbank-Schreibzugriffe (WebCrawler.persist) landen in der persist-Stufe.
+    """
+
+    def __init__(self, crawler, workers=None, queue_size=64):
+        workers = dict(workers or {})
+        unknown = set(workers) - set(PIPELINE_STAGES)
+        if unknown:
+            raise ValueError(f"Unbekannte Pipeline-Stufe(n): {', '.join(sorted(unknown))}")
+        if workers.get("enqueue", 1) != 1:
+            raise ValueError("enqueue läuft immer mit genau einem Worker (Frontier ist nicht thread-sicher)")
+        if any(count < 1 for count in workers.values()):
+            raise ValueError("Jede Stufe braucht mindestens einen Worker")
+        self.crawler = crawler
+        fetch_workers = workers.get("fetch", crawler.controller.max_concurrency)
+        self.stages = {
+            # fetch bekommt nur so viele URLs, wie gerade laufen dürfen, ein Put blockiert also nie
+            "fetch": PipelineStage("fetch", fetch_workers, max(queue_size, fetch_workers)),
+            "decode": PipelineStage("decode", workers.get("decode", 1), queue_size),
+            "parse": PipelineStage("parse", workers.get("parse", 1), queue_size),
+            "enqueue": PipelineStage("enqueue", 1, queue_size),
+            "persist": PipelineStage("persist", workers.get("persist", 1), queue_size),
+        }
+        self.in_flight = 0  # an fetch übergeben, Abruf noch nicht gemeldet
+        self.pending = 0  # an fetch übergeben, noch nicht in enqueue angekommen
+        self.elapsed = 0.0
+
+    def _fetch(self, item):
+        url, depth, attempt = item
+        outcome = {}
+        fetched = None
+        try:
+            fetched = self.crawler.fetch_body(url, outcome)
+        finally:
+            self.stages["enqueue"].put(("fetched", url, depth, attempt, outcome, fetched is not None))
+        if fetched is not None:
+            self.stages["decode"].put((url, depth, outcome.get("status"), fetched))
+
+    def _decode(self, item):
+        url, depth, status, (body, content_type) = item
+        html = None
+        try:
+            html = self.crawler.decode_body(url, body, content_type)
+        finally:
+            if html:
+                self.stages["parse"].put((url, depth, status, html))
+            else:
+                self.stages["enqueue"].put(("parsed", url, depth, status, None, None))
+
+    def _parse(self, item):
+        url, depth, status, html = item
+        crawler = self.crawler
+        content = outlinks = None
+        try:
+            if not crawler.discovery_only:
+                content = crawler.extract_content(url, html)
+            hrefs = iter_hrefs(html) if crawler.discovery_only else crawler.find_hrefs(html)
+            outlinks = crawler.resolve_links(url, hrefs)
+        finally:
+            self.stages["enqueue"].put(("parsed", url, depth, status, content, outlinks))
+
+    def _handle(self, event):
+        crawler = self.crawler
+        if event[0] == "fetched":
+            _, url, depth, attempt, outcome, has_body = event
+            self.in_flight -= 1
+            crawler.handle_outcome(url, depth, attempt, outcome)
+            if not has_body:
+                self.pending -= 1
+                crawler.record_failure(url, outcome)
+            return
+        _, url, depth, status, content, outlinks = event
+        self.pending -= 1
+        if outlinks is not None:
+            crawler.apply_page(url, depth, status, content, outlinks)
+
+    def run(self):
+        crawler = self.crawler
+        controller = crawler.controller
+        fetch, inbox = self.stages["fetch"], self.stages["enqueue"]
+        for name, handler in (("fetch", self._fetch), ("decode", self._decode), ("parse", self._parse),
+                              ("persist", lambda item: crawler.write(item[0], *item[1]))):
+            self.stages[name].start(handler)
+        crawler.persist_stage = self.stages["persist"]
+        start = time.perf_counter()
+        finished = False
+        try:
+            while True:
+                limit = min(controller.allowed_in_flight(), fetch.workers)
+                while not controller.dead and self.in_flight < limit and crawler.ready_in() <= 0:
+                    entry = crawler._pop_next()
+                    if entry is None:
+                        break
+                    controller.on_request_start()
+                    fetch.put(entry)
+                    self.in_flight += 1
+                    self.pending += 1
+                if not self.pending and (not crawler.has_work() or controller.dead):
+                    break
+                try:
+                    event = inbox.queue.get(timeout=min(max(crawler.ready_in(), 0.01), 1.0))
+                except queue.Empty:
+                    continue
+                handled = time.perf_counter()
+                self._handle(event)
+                inbox.record(time.perf_counter() - handled)
+            finished = True
+        finally:
+            crawler.persist_stage = None
+            # nach einem Abbruch können fetch/decode/parse an vollen Queues hängen (Daemon-Threads);
+            # persist hängt von niemandem ab und wird immer geleert
+            for name in ("fetch", "decode", "parse", "persist") if finished else ("persist",):
+                self.stages[name].stop()
+            self.elapsed = time.perf_counter() - start
+
+    def get_summary(self):
+        summary = {name: stage.get_summary(self.elapsed) for name, stage in self.stages.items()}
+        summary["seconds"] = round(self.elapsed, 3)
+        return summary
+
+
+def pipeline_report(stats):
+    """Tabelle aus CrawlPipeline.get_summary(): hohe Auslastung = Engpass, Rückstau = Stufe dahinter zu langsam."""
+    lines = [f"{'Stufe':<10} {'Worker':>6} {'Einträge':>9} {'beschäftigt s':>14} {'Auslastung':>11} {'Rückstau s':>11} {'max. Queue':>11}"]
+    for name in PIPELINE_STAGES:
+        st = stats[name]
+        lines.append(
+            f"{name:<10} {st['workers']:>6} {st['items']:>9} {st['busy_s']:>14.3f} {st['utilization']:>11} "
+            f"{st['backpressure_s']:>11.3f} {st['max_queue']:>11}"
+        )
+    return "\n".join(lines)
+
+# ----------------- Profiling -----------------
+
+# Benannte Crawl-Stufen, denen Zeit und Speicher zugeordnet werden; fetch_body/decode_body/find_hrefs/
+# resolve_links ruft die Pipeline direkt auf (in der Schleife stecken sie in fetch_page bzw. extract_links)
+PROFILE_STAGES = (
+    "fetch_page", "fetch_body", "decode_body", "extract_content", "extract_links", "find_hrefs", "resolve_links",
+    "save_record_to_db", "normalize_url",
+)
+
+
+class CrawlProfiler:
+    """Profiliert einen Crawl mit cProfile, tracemalloc und/oder Sampling."""
+
+    def __init__(self, output_dir="profile", profile=False, trace_memory=False, sample_hz=None, top_n=25):
+        self.output_dir = output_dir
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.sample_hz = sample_hz
+        self.top_n = top_n
+        self.stage_stats = {name: {"calls": 0, "seconds": 0.0, "bytes": 0} for name in PROFILE_STAGES}
+        self.samples = {}
+        self.sample_stages = {name: 0 for name in PROFILE_STAGES}
+        self.sample_stages["(andere)"] = 0
+        self.sample_count = 0
+        self.idle_samples = 0
+        self._stats_lock = threading.Lock()
+        self._profiler = None
+        self._start_snapshot = None
+        self._end_snapshot = None
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+
+    @property
+    def enabled(self):
+        return bool(self.profile or self.trace_memory or self.sample_hz)
+
+    def _instrument(self, crawler):
+        # Stufen-Methoden nur auf der Instanz ersetzen, die Klasse bleibt unverändert
+        for name in PROFILE_STAGES:
+            method = getattr(crawler, name, None)
+            if method is None:
+                continue
+            setattr(crawler, name, self._wrap_stage(name, method))
+
+    def _wrap_stage(self, name, method):
+        import tracemalloc
+
+        stats = self.stage_stats[name]
+        trace_memory = self.trace_memory
+        lock = self._stats_lock
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            mem_before = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                # bei parallelen Threads ist der Speicherzuwachs nur eine Näherung (tracemalloc zählt global)
+                mem_delta = tracemalloc.get_traced_memory()[0] - mem_before if trace_memory else 0
+                with lock:
+                    stats["seconds"] += elapsed
+                    stats["calls"] += 1
+                    stats["bytes"] += mem_delta
+
+        return wrapper
+
+    def _uninstrument(self, crawler):
+        for name in PROFILE_STAGES:
+            crawler.__dict__.pop(name, None)
+
+    def _sample_loop(self):
+        # alle Threads abtasten: Pipeline-Stufen und parallele Downloads laufen nicht im Haupt-Thread
+        import concurrent.futures.thread as pool_module
+
+        own = threading.get_ident()
+        idle_files = (threading.__file__, queue.__file__, pool_module.__file__)
+        interval = 1.0 / self.sample_hz
+        while not self._stop_sampling.wait(interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                # Threads, die nur auf Lock/Queue warten, verfälschen die Stufenanteile nicht
+                if frame.f_code.co_filename in idle_files:
+                    self.idle_samples += 1
+                    continue
+                leaf = f"{frame.f_code.co_filename}:{frame.f_lineno} {frame.f_code.co_name}"
+                self.samples[leaf] = self.samples.get(leaf, 0) + 1
+                # innerste benannte Stufe auf dem Stack suchen
+                stage = "(andere)"
+                while frame is not None:
+                    if frame.f_code.co_name in self.stage_stats:
+                        stage = frame.f_code.co_name
+                        break
+                    frame = frame.f_back
+                self.sample_stages[stage] += 1
+                self.sample_count += 1
+
+    def start(self, crawler):
+        import cProfile
+        import tracemalloc
+
+        if self.profile or self.trace_memory:
+            self._instrument(crawler)
+        if self.trace_memory:
+            tracemalloc.start()
+            self._start_snapshot = tracemalloc.take_snapshot()
+        if self.sample_hz:
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+        if self.profile and (crawler.pipeline_workers is not None or crawler.controller.max_concurrency > 1):
+            logger.warning(
+                "cProfile erfasst nur den Haupt-Thread: crawl.pstats enthält die Arbeit der Pipeline- bzw. "
+                "Download-Threads nicht (Stufen-Tabelle und --profile-sample decken alle Threads ab)."
+            )
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self, crawler):
+        import tracemalloc
+
+        if self._profiler:
+            self._profiler.disable()
+        if self._sampler:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._end_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        self._uninstrument(crawler)
+
+    def run(self, crawler):
+        """Führt crawler.crawl() unter Profiling aus und schreibt danach die Reports."""
+        self.start(crawler)
+        try:
+            return crawler.crawl()
+        finally:
+            self.stop(crawler)
+            self.write_reports()
+
+    def stage_report(self):
+        lines = [f"{'Stufe':<20} {'Aufrufe':>9} {'Sekunden':>10} {'ms/Aufruf':>10} {'Bytes (netto)':>14}"]
+        for name, st in self.stage_stats.items():
+            per_call = (st["seconds"] / st["calls"] * 1000) if st["calls"] else 0.0
+            lines.append(f"{name:<20} {st['calls']:>9} {st['seconds']:>10.3f} {per_call:>10.3f} {st['bytes']:>14}")
+        return "\n".join(lines)
+
+    def memory_report(self):
+        import tracemalloc
+
+        if not self._end_snapshot:
+            return ""
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+        end = self._end_snapshot.filter_traces(ignore)
+        start = self._start_snapshot.filter_traces(ignore)
+        lines = [f"Top {self.top_n} Allokationen (Zuwachs während des Crawls):"]
+        for stat in end.compare_to(start, "lineno")[: self.top_n]:
+            lines.append(str(stat))
+        return "\n".join(lines)
+
+    def sample_report(self):
+        if not self.sample_count:
+            return ""
+        lines = [
+            f"{self.sample_count} Samples mit {self.sample_hz} Hz über alle Threads "
+            f"({self.idle_samples} wartende Thread-Samples nicht gezählt)",
+            "", "Stufen:",
+        ]
+        for name, count in sorted(self.sample_stages.items(), key=lambda kv: -kv[1]):
+            lines.append(f"{name:<20} {count:>8} {count / self.sample_count:>7.1%}")
+        lines += ["", f"Top {self.top_n} Frames:"]
+        for leaf, count in sorted(self.samples.items(), key=lambda kv: -kv[1])[: self.top_n]:
+            lines.append(f"{count:>8}  {leaf}")
+        return "\n".join(lines)
+
+    def write_reports(self):
+        """Schreibt pstats-, Stufen-, Speicher- und Sampling-Reports nach output_dir."""
+        if not self.enabled:
+            return []
+        written = []
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            if self._profiler:
+                pstats_path = os.path.join(self.output_dir, "crawl.pstats")
+                self._profiler.dump_stats(pstats_path)
+                written.append(pstats_path)
+            if self.profile or self.trace_memory:
+                written.append(self._write(os.path.join(self.output_dir, "stages.txt"), self.stage_report()))
+            memory = self.memory_report()
+            if memory:
+                written.append(self._write(os.path.join(self.output_dir, "memory_top.txt"), memory))
+            samples = self.sample_report()
+            if samples:
+                written.append(self._write(os.path.join(self.output_dir, "samples.txt"), samples))
+            logger.info(f"Profiling-Reports geschrieben: {', '.join(written)}")
+        except Exception as e:
+            logger.error(f"Fehler beim Schreiben der Profiling-Reports: {e}")
+        return written
+
+    @staticmethod
+    def _write(path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        return path
+
+
+
+# ----------------- Cluster (Host-partitioniert) -----------------
+
+
+def partition_for(host, num_partitions):
+    """Stabile Zuordnung eines Hosts zu einer Partition (unabhängig von PYTHONHASHSEED)."""
+    return zlib.crc32(host.lower().encode("utf-8")) % num_partitions
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+class ClusterCoordinator:
+    """Verteilt URLs nach Host-Hash an N Worker und erkennt das Ende des Crawls.
+
+    Worker verbinden sich über multiprocessing.connection (lokale oder entfernte
+    Sockets) und synchronisieren sich in Batches: sie schicken entdeckte
+    Fremd-Links und erhalten die URLs ihrer Partition zurück.
+    """
+
+    def __init__(self, num_workers, seeds, max_pages, address=("127.0.0.1", 0), authkey=b"webcrawler", lease_size=10):
+        from multiprocessing.connection import Listener
+
+        self.num_workers = num_workers
+        self.max_pages = max_pages
+        # Seitenbudget wird in kleinen Leases vergeben, damit max_pages global exakt gilt
+        self.lease_size = lease_size
+        self.granted = [0] * num_workers
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.inboxes = [[] for _ in range(num_workers)]
+        self.routed = set()
+        self.idle = [False] * num_workers
+        self.pages = [0] * num_workers
+        self.connected = set()
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.route(seeds)
+
+    def route(self, urls):
+        for url in urls:
+            if url in self.routed:
+                continue
+            self.routed.add(url)
+            host = urlsplit(url).netloc
+            self.inboxes[partition_for(host, self.num_workers)].append(url)
+
+    def _lease(self, worker_id, pages, idle):
+        if idle:
+            # ungenutztes Budget freigeben
+            self.granted[worker_id] = pages
+            return pages
+        self.granted[worker_id] = max(self.granted[worker_id], pages)
+        free = self.max_pages - sum(self.granted)
+        want = self.lease_size - (self.granted[worker_id] - pages)
+        self.granted[worker_id] += max(0, min(want, free))
+        return self.granted[worker_id]
+
+    def _is_finished(self):
+        if sum(self.pages) >= self.max_pages:
+            return True
+        return (
+            len(self.connected) == self.num_workers
+            and all(self.idle)
+            and not any(self.inboxes)
+        )
+
+    def _handle(self, conn):
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == "hello":
+                    with self.lock:
+                        self.connected.add(message[1])
+                    conn.send(("welcome", self.num_workers))
+                elif message[0] == "sync":
+                    _, worker_id, outgoing, pages, idle = message
+                    with self.lock:
+                        self.route(outgoing)
+                        self.pages[worker_id] = pages
+                        incoming = self.inboxes[worker_id]
+                        self.inboxes[worker_id] = []
+                        self.idle[worker_id] = idle and not incoming
+                        granted = self._lease(worker_id, pages, idle and not incoming)
+                        stop = self._is_finished()
+                    if stop:
+                        self.finished.set()
+                    conn.send(("sync", incoming, granted, stop or self.finished.is_set()))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def serve(self):
+        """Nimmt genau num_workers Verbindungen an und wartet bis zum Ende des Crawls."""
+        handlers = []
+        try:
+            for _ in range(self.num_workers):
+                conn = self.listener.accept()
+                handler = threading.Thread(target=self._handle, args=(conn,), daemon=True)
+                handler.start()
+                handlers.append(handler)
+            for handler in handlers:
+                handler.join()
+        finally:
+            self.listener.close()
+        return self.get_summary()
+
+    def get_summary(self):
+        return {
+            "workers": self.num_workers,
+            "total_pages": sum(self.pages),
+            "pages_per_worker": list(self.pages),
+            "routed_urls": len(self.routed),
+        }
+
+
+class ClusterWorker:
+    """Crawlt alle Hosts einer Partition; Robots- und Höflichkeits-Zustand pro Host liegen hier."""
+
+    def __init__(self, worker_id, address, authkey=b"webcrawler", scope_hosts=None,
+                 crawler_kwargs=None, sync_interval=0.5, batch_size=500):
+        self.worker_id = worker_id
+        self.address = address
+        self.authkey = authkey
+        self.scope_hosts = set(scope_hosts) if scope_hosts else None
+        self.crawler_kwargs = dict(crawler_kwargs or {})
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self.num_workers = None
+        self.crawlers = {}  # host -> WebCrawler
+        self.outgoing = []
+        self.page_limit = 0  # vom Koordinator gewährtes Seitenbudget
+        # in diesem Lauf abgerufene Seiten; visited enthält auch URLs aus früheren Läufen (JSON-Datei)
+        self.pages = 0
+
+    def in_scope(self, host):
+        return self.scope_hosts is None or host in self.scope_hosts
+
+    def enqueue(self, url):
+        host = urlsplit(url).netloc
+        if not self.in_scope(host):
+            return
+        if partition_for(host, self.num_workers) != self.worker_id:
+            self.outgoing.append(url)
+            return
+        crawler = self.crawlers.get(host)
+        if crawler is None:
+            # erster URL des Hosts wird Start-URL; robots.txt wird einmal pro Host geladen
+            crawler = WebCrawler(start_url=url, **self.crawler_kwargs)
+            crawler.external_links = []
+            # wie beim Recrawl: bekannte Seiten aus früheren Läufen zählen nicht zum Budget
+            crawler.max_pages += len(crawler.visited)
+            self.crawlers[host] = crawler
+        elif crawler.is_valid_url(url):
+            crawler.to_visit.push(crawler.normalize_url(url), depth=1)
+
+    def _has_work(self):
+        return any(c.has_work() and not c.controller.dead for c in self.crawlers.values())
+
+    def step(self):
+        """Bearbeitet eine Seite eines Hosts, dessen Delay abgelaufen ist; True, wenn etwas getan wurde."""
+        if self.pages >= self.page_limit:
+            return False
+        waits = []
+        for host, crawler in self.crawlers.items():
+            if not crawler.has_work() or crawler.controller.dead:
+                continue
+            ready_in = crawler.ready_in()
+            if ready_in > 0:
+                waits.append(ready_in)
+                continue
+            before = len(crawler.visited)
+            fetched = crawler.crawl_next(wait=False)
+            self.pages += len(crawler.visited) - before
+            # Host ans Ende rotieren, damit alle Hosts der Partition abwechselnd drankommen
+            self.crawlers[host] = self.crawlers.pop(host)
+            external, crawler.external_links = crawler.external_links, []
+            for url in external:
+                self.enqueue(url)
+            return fetched is not None
+        if waits:
+            # alle Hosts warten auf Delay oder Backoff
+            time.sleep(min(0.05, min(waits)))
+            return True
+        return False
+
+    def run(self):
+        from multiprocessing.connection import Client
+
+        conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send(("hello", self.worker_id))
+            _, self.num_workers = conn.recv()
+            last_sync = 0.0
+            stop = False
+            while not stop:
+                busy = self.step()
+                idle = not busy and not self._has_work()
+                out_of_budget = self.pages >= self.page_limit
+                if (idle or out_of_budget or len(self.outgoing) >= self.batch_size
+                        or time.monotonic() - last_sync >= self.sync_interval):
+                    outgoing, self.outgoing = self.outgoing, []
+                    conn.send(("sync", self.worker_id, outgoing, self.pages, idle))
+                    _, incoming, self.page_limit, stop = conn.recv()
+                    last_sync = time.monotonic()
+                    for url in incoming:
+                        self.enqueue(url)
+                    if not incoming and not stop and (idle or self.pages >= self.page_limit):
+                        time.sleep(0.05)
+        except KeyboardInterrupt:
+            logger.info(f"Worker {self.worker_id} abgebrochen (KeyboardInterrupt).")
+        finally:
+            conn.close()
+        logger.info(f"Worker {self.worker_id} beendet: {self.pages} Seiten auf {len(self.crawlers)} Host(s)")
+        return {"worker_id": self.worker_id, "pages": self.pages, "hosts": sorted(self.crawlers)}
+
+
+def _run_cluster_worker(worker_id, address, authkey, scope_hosts, crawler_kwargs):
+    ClusterWorker(worker_id, address, authkey, scope_hosts, crawler_kwargs).run()
+
+
+def run_local_cluster(num_workers, seeds, max_pages, scope_hosts, crawler_kwargs, authkey=b"webcrawler"):
+    """Startet Koordinator (Thread) und num_workers Worker-Prozesse auf einem lokalen Socket."""
+    import multiprocessing
+
+    coordinator = ClusterCoordinator(num_workers, seeds, max_pages, authkey=authkey)
+    processes = [
+        multiprocessing.Process(
+            target=_run_cluster_worker,
+            args=(i, coordinator.address, authkey, scope_hosts, crawler_kwargs),
+            daemon=True,
+        )
+        for i in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        summary = coordinator.serve()
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+    return summary
+
+
+# ----------------- Link-Graph und Ranking -----------------
+
+RANK_COLUMNS = ("pagerank", "hub_score", "authority_score")
 
-        # robots.txt einlesen (sicher mit timeout, damit es nicht hängt)
-        self.robot_parser = None
-        robots_url = urljoin(f"https://{self.domain}", "/robots.txt")
-        try:
-            resp = requests.get(robots_url, headers=self.headers, timeout=5)
-            if resp.status_code == 200:
-                from urllib.robotparser import RobotFileParser
 
-                self.robot_parser = RobotFileParser()
-                # parse erwartet eine Liste von Zeilen
-                self.robot_parser.parse(resp.text.splitlines())
-                logger.info(f"robots.txt geladen von {robots_url}")
-            else:
-                logger.info(f"robots.txt nicht gefunden (Status {resp.status_code}), erlauben standardmäßig alles")
-                self.robot_parser = None
-        except Exception as e:
-            logger.warning(f"robots.txt konnte nicht geladen werden: {e}. Erlaube standardmäßig alles.")
-            self.robot_parser = None
+def _require_scipy():
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise RuntimeError("Für das Ranking werden numpy und scipy benötigt (pip install numpy scipy)") from e
+    return np, sparse
 
-        # Set zur Verhinderung mehrfacher Einträge in der Queue
-        # speichere normalisierte URLs in der Queue-Set (frühzeitig initialisieren)
-        self.to_visit_set = {self.normalize_url(u) for u in self.to_visit}
 
-        # optional: SQLite DB initialisieren
-        if self.save_to_db:
-            try:
-                self.init_db()
-            except Exception:
-                logger.exception("Fehler beim Initialisieren der SQLite-DB")
+class LinkGraph:
+    """Gerichteter Link-Graph als CSR: Kanten von Knoten i liegen in indices[indptr[i]:indptr[i + 1]]."""
 
-        # Existierende URLs aus JSON laden zur Duplikatvermeidung
-        try:
-            self.load_existing_data()
-        except Exception:
-            # load_existing_data intern loggt Fehler; wir stellen sicher, dass __init__ weiterläuft
-            logger.exception("Fehler beim Laden vorhandener Daten in __init__")
+    def __init__(self, urls, indptr, indices):
+        self.urls = urls
+        self.indptr = indptr
+        self.indices = indices
 
-    def load_existing_data(self):
-        if os.path.exists(self.json_file):
-            try:
-                with open(self.json_file, "r", encoding="utf-8") as f:
-                    existing = json.load(f)
-                    # normalize and dedupe existing entries, but only for current domain
-                    seen = set()
-                    deduped = []
-                    for item in existing:
-                        url = item.get("url")
-                        if not url:
-                            continue
-                        parsed = urlparse(url)
-                        if parsed.netloc != self.domain:
-                            continue  # skip URLs from other domains
-                        norm = self.normalize_url(url)
-                        if norm in seen:
-                            continue
-                        seen.add(norm)
-                        deduped.append(item)
-                        self.visited.add(norm)
-                    self.data = deduped
-                logger.info(f"{len(self.visited)} URLs aus {self.json_file} geladen (nur Domain {self.domain}) zum Vermeiden von Duplikaten")
-            except Exception as e:
-                logger.error(f"Fehler beim Laden vorhandener Daten: {e}")
+    @property
+    def num_nodes(self):
+        return len(self.urls)
 
-    def normalize_url(self, url: str) -> str:
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @classmethod
+    def from_db(cls, db_path):
+        """Liest link_nodes/link_edges und baut die CSR-Arrays (IDs werden auf 0..n-1 verdichtet)."""
+        np, _ = _require_scipy()
+        conn = sqlite3.connect(db_path)
         try:
-            parsed = urlparse(url)
-            no_frag = parsed._replace(fragment="")
-            norm = no_frag.geturl()
-            # remove trailing slash for non-root paths
-            if norm.endswith('/') and no_frag.path not in ('', '/'):
-                norm = norm.rstrip('/')
-            return norm
-        except Exception:
-            return url
+            nodes = conn.execute("SELECT id, url FROM link_nodes ORDER BY id").fetchall()
+            rows = conn.execute("SELECT src, dsts FROM link_edges").fetchall()
+        finally:
+            conn.close()
+        ids = np.array([node_id for node_id, _ in nodes], dtype=np.int64)
+        urls = [url for _, url in nodes]
+        degree = np.zeros(len(urls), dtype=np.int64)
+        src = np.searchsorted(ids, np.array([row[0] for row in rows], dtype=np.int64))
+        targets = [np.frombuffer(row[1], dtype="<i4") for row in rows]
+        degree[src] = [len(t) for t in targets]
+        indptr = np.zeros(len(urls) + 1, dtype=np.int64)
+        np.cumsum(degree, out=indptr[1:])
+        # Zeilen in Knotenreihenfolge aneinanderhängen, IDs auf 0..n-1 abbilden
+        order = np.argsort(src, kind="stable")
+        dst = np.concatenate([targets[i] for i in order]) if rows else np.zeros(0, dtype=np.int64)
+        return cls(urls, indptr, np.searchsorted(ids, dst).astype(np.int32))
 
-    def init_db(self):
+    def save(self, path):
+        np, _ = _require_scipy()
+        # URLs als ein zeilengetrennter UTF-8-Puffer (kein Pickle nötig)
+        urls = np.frombuffer("\n".join(self.urls).encode("utf-8"), dtype=np.uint8)
+        np.savez(path, indptr=self.indptr, indices=self.indices, urls=urls)
+
+    @classmethod
+    def load(cls, path):
+        np, _ = _require_scipy()
+        with np.load(path) as data:
+            text = data["urls"].tobytes().decode("utf-8")
+            return cls(text.split("\n") if text else [], data["indptr"], data["indices"])
+
+    def adjacency(self):
+        np, sparse = _require_scipy()
+        data = np.ones(self.num_edges, dtype=np.float64)
+        matrix = sparse.csr_matrix((data, self.indices, self.indptr), shape=(self.num_nodes, self.num_nodes))
+        # Mehrfachkanten zählen einmal
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+        return matrix
+
+    def pagerank(self, damping=0.85, tol=1e-10, max_iter=100):
+        """PageRank per Potenziteration; Masse von Seiten ohne Outlinks wird gleichverteilt."""
+        np, _ = _require_scipy()
+        n = self.num_nodes
+        if n == 0:
+            return np.zeros(0)
+        adjacency = self.adjacency()
+        out_degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        dangling = out_degree == 0
+        # Übergangsmatrix transponiert, Zeilen von adjacency durch den Ausgangsgrad geteilt
+        transition = (adjacency.multiply(1.0 / np.where(dangling, 1.0, out_degree)[:, None])).T.tocsr()
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            new = damping * (transition @ rank) + (damping * rank[dangling].sum() + 1.0 - damping) / n
+            converged = np.abs(new - rank).sum() < tol * n
+            rank = new
+            if converged:
+                break
+        return rank / rank.sum()
+
+    def hits(self, tol=1e-10, max_iter=100):
+        """HITS-Hub- und Authority-Scores (L2-normiert)."""
+        np, _ = _require_scipy()
+        n = self.num_nodes
+        if n == 0:
+            return np.zeros(0), np.zeros(0)
+        adjacency = self.adjacency()
+        transposed = adjacency.T.tocsr()
+        hubs = np.full(n, 1.0 / math.sqrt(n))
+        authorities = hubs
+        for _ in range(max_iter):
+            authorities = transposed @ hubs
+            authorities /= np.linalg.norm(authorities) or 1.0
+            new_hubs = adjacency @ authorities
+            new_hubs /= np.linalg.norm(new_hubs) or 1.0
+            converged = np.abs(new_hubs - hubs).sum() < tol * n
+            hubs = new_hubs
+            if converged:
+                break
+        return hubs, authorities
+
+
+def write_rank_scores(db_path, urls, columns):
+    """Schreibt Scores (Spaltenname -> Array parallel zu urls) per URL in die crawled-Tabelle."""
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(crawled)")}
+        if not existing:
+            logger.warning(f"Keine crawled-Tabelle in {db_path}, Scores nicht geschrieben")
+            return 0
+        for column in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE crawled ADD COLUMN {column} REAL")
+        names = list(columns)
+        conn.execute(f"CREATE TEMP TABLE rank_scores (url TEXT PRIMARY KEY, {', '.join(f'{c} REAL' for c in names)})")
+        conn.executemany(
+            f"INSERT OR REPLACE INTO rank_scores VALUES (?{', ?' * len(names)})",
+            zip(urls, *(map(float, columns[c]) for c in names)),
+        )
+        # ein Durchlauf über crawled statt einem UPDATE pro URL
+        assignments = ", ".join(f"{c} = (SELECT s.{c} FROM rank_scores s WHERE s.url = crawled.url)" for c in names)
+        updated = conn.execute(
+            f"UPDATE crawled SET {assignments} WHERE url IN (SELECT url FROM rank_scores)"
+        ).rowcount
+        conn.commit()
+        return updated
+    finally:
+        conn.close()
+
+
+def rank_link_graph(db_path, graph_file=None, targets=None, damping=0.85):
+    """Offline-Job: Graph laden (bzw. aus der DB bauen), PageRank/HITS rechnen, Scores zurückschreiben."""
+    start = time.perf_counter()
+    graph = LinkGraph.from_db(db_path)
+    if graph_file:
+        graph.save(graph_file)
+    loaded = time.perf_counter()
+    pagerank = graph.pagerank(damping=damping)
+    hubs, authorities = graph.hits()
+    ranked = time.perf_counter()
+    summary = {
+        "nodes": graph.num_nodes,
+        "edges": graph.num_edges,
+        "load_seconds": round(loaded - start, 3),
+        "rank_seconds": round(ranked - loaded, 3),
+        "updated": {},
+    }
+    scores = {"pagerank": pagerank, "hub_score": hubs, "authority_score": authorities}
+    for target in targets or [db_path]:
+        summary["updated"][target] = write_rank_scores(target, graph.urls, scores)
+    top = pagerank.argsort()[::-1][:5]
+    summary["top"] = [(graph.urls[i], round(float(pagerank[i]), 5)) for i in top]
+    return summary
+
+
+# ----------------- Term-Index (TF-IDF) -----------------
+
+_TERM_RE = re.compile(r"[^\W_]{2,}")
+STOPWORDS = frozenset("""
+aber als am an auch auf aus bei bis das dass dem den der des die dies diese ein eine einem einen einer eines er es
+für hat im in ist mit nach nicht noch nur oder sich sie sind so über um und vom von vor war wie wir wird zu zum zur
+a an and are as at be by for from has in is it of on or that the this to was with
+""".split())
+# Titel zählen dreifach, Überschriften doppelt
+TERM_FIELD_WEIGHTS = (("title", 3), ("headings", 2), ("paragraphs", 1))
+TERM_INDEX_BATCH = 200
+
+RelatedPage = namedtuple("RelatedPage", "url title score")
+
+
+def tokenize(text):
+    """Kleingeschriebene Wörter ab zwei Zeichen, ohne reine Zahlen und Stoppwörter."""
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in STOPWORDS and not term.isdigit()]
+
+
+def _text_list(value):
+    # headings/paragraphs liegen als JSON-Liste in der DB
+    if not value:
+        return []
+    try:
+        items = json.loads(value)
+    except (TypeError, ValueError):
+        return [value]
+    return items if isinstance(items, list) else [str(items)]
+
+
+def document_terms(title, headings, paragraphs):
+    """Gewichtete Termhäufigkeiten einer Seite."""
+    counts = {}
+    for (_, weight), text in zip(TERM_FIELD_WEIGHTS, (title or "", " ".join(headings), " ".join(paragraphs))):
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + weight
+    return counts
+
+
+def _int32_blob(values):
+    values = array("i", values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def crawled_columns(conn):
+    """SELECT-Ausdrücke je Feld und FROM-Klausel (Alias c) für die crawled-Tabelle.
+
+    Ergebnisse der Django-App verweisen ggf. auf den geteilten Seiten-Cache (crawled_pages); die
+    Tabelle des Crawlers hat keinen Status, dort stehen nur erfolgreich geladene Seiten (200).
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(crawled)")}
+    fields = {name: f"c.{name}" for name in ("id", "url", "title", "description", "headings", "paragraphs",
+                                             "link_count", "crawled_at")}
+    fields["status_code"] = "c.status_code" if "status_code" in columns else "200"
+    if "page_id" not in columns:
+        return fields, "crawled c"
+    fields["description"] = "COALESCE(NULLIF(c.description, ''), p.description, '')"
+    for name in ("headings", "paragraphs"):
+        fields[name] = f"CASE WHEN c.page_id IS NOT NULL THEN p.{name} ELSE c.{name} END"
+    return fields, "crawled c LEFT JOIN crawled_pages p ON p.id = c.page_id"
+
+
+class TermIndex:
+    """TF-IDF-Index über die crawled-Tabelle (Titel, Überschriften, Absätze) für "ähnliche Seiten".
+
+    Pro Zeile von crawled liegen Term-IDs und gewichtete Häufigkeiten als int32-Arrays in term_docs
+    (wie link_edges); update() tokenisiert nur neue oder geänderte Zeilen (crawled_at). Gewichte und
+    Normierung entstehen erst beim Laden als CSR-Matrix, da sich die idf mit jeder Seite ändert.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._cache = None  # (Version, doc_ids, urls, Zeilen je URL, Matrix)
+        conn = sqlite3.connect(db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cur = conn.cursor()
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS crawled (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    url TEXT UNIQUE,
-                    title TEXT,
-                    description TEXT,
-                    headings TEXT,
-                    paragraphs TEXT,
-                    link_count INTEGER,
-                    crawled_at TEXT
-                )
-                """
+            conn.execute("CREATE TABLE IF NOT EXISTS term_vocab (id INTEGER PRIMARY KEY, term TEXT UNIQUE)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS term_docs "
+                "(doc_id INTEGER PRIMARY KEY, url TEXT, crawled_at TEXT, terms BLOB, counts BLOB)"
             )
+            conn.execute("CREATE TABLE IF NOT EXISTS term_meta (key TEXT PRIMARY KEY, value INTEGER)")
             conn.commit()
+        finally:
             conn.close()
-            logger.info(f"SQLite DB initialisiert: {self.db_path}")
-        except Exception as e:
-            logger.error(f"Fehler beim Initialisieren der DB {self.db_path}: {e}")
 
-    def save_record_to_db(self, record: dict):
+    @staticmethod
+    def _content_query(conn):
+        fields, source = crawled_columns(conn)
+        selected = ", ".join(fields[name] for name in ("id", "url", "crawled_at", "title", "headings", "paragraphs"))
+        return f"SELECT {selected} FROM {source} WHERE c.id IN ({{}})"
+
+    def _term_ids(self, conn, terms):
+        terms = list(terms)
+        conn.executemany("INSERT OR IGNORE INTO term_vocab (term) VALUES (?)", ((t,) for t in terms))
+        ids = {}
+        for i in range(0, len(terms), 500):
+            chunk = terms[i:i + 500]
+            ids.update(conn.execute(
+                f"SELECT term, id FROM term_vocab WHERE term IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return ids
+
+    def update(self, batch_size=500):
+        """Indexiert neue und geänderte Seiten, entfernt gelöschte; liefert die Zähler."""
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cur = conn.cursor()
-            headings_json = json.dumps(record.get("headings", []), ensure_ascii=False)
-            paragraphs_json = json.dumps(record.get("paragraphs", []), ensure_ascii=False)
-            cur.execute(
+            if not conn.execute("PRAGMA table_info(crawled)").fetchall():
+                logger.warning(f"Keine crawled-Tabelle in {self.db_path}, Term-Index bleibt leer")
+                return stats
+            stats["removed"] = conn.execute(
+                "DELETE FROM term_docs WHERE doc_id NOT IN (SELECT id FROM crawled)"
+            ).rowcount
+            stale = conn.execute(
                 """
-                INSERT OR IGNORE INTO crawled (url, title, description, headings, paragraphs, link_count, crawled_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    record.get("url"),
-                    record.get("title"),
-                    record.get("description"),
-                    headings_json,
-                    paragraphs_json,
-                    record.get("link_count"),
-                    record.get("crawled_at"),
-                ),
-            )
+                SELECT c.id, d.doc_id IS NOT NULL FROM crawled c LEFT JOIN term_docs d ON d.doc_id = c.id
+                WHERE d.doc_id IS NULL OR d.crawled_at IS NOT c.crawled_at OR d.url IS NOT c.url
+                """
+            ).fetchall()
+            query = self._content_query(conn)
+            for i in range(0, len(stale), batch_size):
+                chunk = [doc_id for doc_id, _ in stale[i:i + batch_size]]
+                rows = conn.execute(query.format(", ".join("?" * len(chunk))), chunk).fetchall()
+                docs = [(row, document_terms(row[3], _text_list(row[4]), _text_list(row[5]))) for row in rows]
+                ids = self._term_ids(conn, {term for _, counts in docs for term in counts})
+                conn.executemany(
+                    "INSERT OR REPLACE INTO term_docs (doc_id, url, crawled_at, terms, counts) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (row[0], row[1], row[2], _int32_blob(ids[t] for t in counts), _int32_blob(counts.values()))
+                        for row, counts in docs
+                    ),
+                )
+            stats["updated"] = sum(1 for _, known in stale if known)
+            stats["added"] = len(stale) - stats["updated"]
+            if stale or stats["removed"]:
+                conn.execute(
+                    "INSERT INTO term_meta (key, value) VALUES ('version', 1) "
+                    "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+                )
             conn.commit()
+            return stats
+        finally:
             conn.close()
-            logger.debug(f"Datensatz in DB gespeichert: {record.get('url')}")
-        except Exception as e:
-            logger.error(f"Fehler beim Speichern in DB: {e}")
 
-    def can_fetch(self, url):
-        # wenn kein Robotparser verfügbar ist, erlauben wir das Crawlen
-        try:
-            if not self.robot_parser:
-                return True
-            return self.robot_parser.can_fetch(self.headers["User-Agent"], self.normalize_url(url))
-        except Exception:
-            return True
+    def matrix(self):
+        """(doc_ids, urls, Matrix) mit L2-normierten TF-IDF-Zeilen; bis zum nächsten update() zwischengespeichert."""
+        _, doc_ids, urls, _, matrix = self._load()
+        return doc_ids, urls, matrix
 
-    def is_valid_url(self, url):
+    def _load(self):
+        np, sparse = _require_scipy()
+        conn = sqlite3.connect(self.db_path)
         try:
-            parsed = urlparse(url)
-            if parsed.scheme not in ("http", "https"):
-                return False
-            if parsed.netloc != self.domain:
-                return False
-            clean = self.normalize_url(url)
-            if clean in self.visited:
-                return False
-            return self.can_fetch(clean)
-        except Exception:
-            return False
+            version = conn.execute("SELECT value FROM term_meta WHERE key = 'version'").fetchone()
+            if self._cache is not None and self._cache[0] == version:
+                return self._cache
+            rows = conn.execute("SELECT doc_id, url, terms, counts FROM term_docs ORDER BY doc_id").fetchall()
+        finally:
+            conn.close()
+        doc_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        urls = [row[1] for row in rows]
+        lengths = np.array([len(row[2]) // 4 for row in rows], dtype=np.int64)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.frombuffer(b"".join(row[2] for row in rows), dtype="<i4")
+        tf = np.frombuffer(b"".join(row[3] for row in rows), dtype="<i4").astype(np.float64)
+        num_terms = int(indices.max()) + 1 if len(indices) else 1
+        # geglättete idf, sublineare tf
+        df = np.bincount(indices, minlength=num_terms)
+        idf = np.log((1.0 + len(rows)) / (1.0 + df)) + 1.0
+        data = (1.0 + np.log(tf)) * idf[indices]
+        row_of = np.repeat(np.arange(len(rows)), lengths)
+        norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(rows)))
+        data /= norms[row_of]
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), num_terms))
+        rows_by_url = {}
+        for i, url in enumerate(urls):
+            rows_by_url.setdefault(url, []).append(i)
+        self._cache = (version, doc_ids, urls, rows_by_url, matrix)
+        return self._cache
 
-    def extract_links(self, url, html):
-        links = []
+    def related(self, url, k=10):
+        """Top-k Seiten nach Kosinus-Ähnlichkeit zu url; None, wenn url nicht im Index ist."""
+        np, _ = _require_scipy()
+        _, doc_ids, urls, rows_by_url, matrix = self._load()
+        rows = rows_by_url.get(url)
+        if rows is None:
+            return None
+        scores = matrix.dot(matrix[rows[0]].T).toarray().ravel()
+        # dieselbe URL kann mehrfach vorkommen (Django: eine Zeile pro Benutzer)
+        scores[rows] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        picked, seen = [], set()
+        for i in order:
+            if urls[i] not in seen:
+                seen.add(urls[i])
+                picked.append(i)
+                if len(picked) == k:
+                    break
+        conn = sqlite3.connect(self.db_path)
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            for link in soup.find_all("a", href=True):
-                absolute_url = urljoin(url, link["href"])
-                norm = self.normalize_url(absolute_url)
-                # nur hinzufügen, wenn gültig und noch nicht in Queue/visited
-                if self.is_valid_url(absolute_url) and norm not in self.to_visit_set:
-                    links.append(absolute_url)
-                    self.to_visit_set.add(norm)
-        except Exception as e:
-            logger.error(f"Fehler beim Extrahieren von Links: {e}")
-        return links
+            ids = [int(doc_ids[i]) for i in picked]
+            titles = dict(conn.execute(
+                f"SELECT id, title FROM crawled WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()) if ids else {}
+        finally:
+            conn.close()
+        return [RelatedPage(urls[i], titles.get(int(doc_ids[i]), ""), round(float(scores[i]), 4)) for i in picked]
 
-    def extract_content(self, url, html):
-        try:
-            soup = BeautifulSoup(html, "html.parser")
-            title_tag = soup.title
-            title = title_tag.string.strip() if title_tag and title_tag.string else "Kein Titel"
-            description = ""
-            meta_desc = soup.find("meta", attrs={"name": "description"})
-            if meta_desc:
-                description = meta_desc.get("content", "").strip()
-            headings = [h.get_text(strip=True) for h in soup.find_all(["h1", "h2", "h3"])]
-            paragraphs = [p.get_text(strip=True) for p in soup.find_all("p")[:3]]
-            link_count = len(soup.find_all("a"))
-            return {
-                "url": url,
-                "title": title,
-                "description": description,
-                "headings": headings[:5],
-                "paragraphs": paragraphs,
-                "link_count": link_count,
-                "crawled_at": datetime.now().isoformat(),
-            }
-        except Exception as e:
-            logger.error(f"Fehler beim Extrahieren von Inhalten: {e}")
-            return None
 
-    def fetch_page(self, url):
-        if not self.can_fetch(url):
-            logger.info(f"Crawling von {url} durch robots.txt verboten.")
-            return None
-        try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            # Catch all exceptions (network errors, mocked exceptions, etc.)
-            logger.error(f"Fehler beim Abrufen von {url}: {e}")
-            return None
+# ----------------- Export -----------------
 
-    def crawl(self):
-        logger.info(f"Starte Crawler mit: {self.start_url}")
-        # Wenn Start-URL bereits gecrawlt wurde, nichts tun
-        if self.normalize_url(self.start_url) in self.visited:
-            logger.info(f"Start-URL {self.start_url} bereits gecrawlt — Abbruch.")
-            return self.data
-        try:
-            while self.to_visit and len(self.visited) < self.max_pages:
-                url = self.to_visit.popleft()
-                # aus Queue-Set entfernen (falls vorhanden) - nutze normalisierte Form
-                self.to_visit_set.discard(self.normalize_url(url))
-                norm_url = self.normalize_url(url)
-                if norm_url in self.visited:
-                    continue
-                self.visited.add(norm_url)
-                logger.info(f"Crawle ({len(self.visited)}/{self.max_pages}): {norm_url}")
+EXPORT_FIELDS = ("id", "url", "title", "description", "headings", "paragraphs", "link_count", "status_code", "crawled_at")
+EXPORT_FORMATS = ("jsonl", "csv", "parquet")
 
-                html = self.fetch_page(url)
-                if not html:
-                    continue
-                content = self.extract_content(url, html)
-                if content:
-                    # Prüfen, ob bereits im data, um Duplikate zu vermeiden
-                    if not any(d["url"] == content["url"] for d in self.data):
-                        self.data.append(content)
-                        if self.save_to_db:
-                            try:
-                                self.save_record_to_db(content)
-                            except Exception:
-                                logger.exception("Fehler beim Speichern eines Eintrags in die DB")
-
-                links = self.extract_links(url, html)
-                self.to_visit.extend(links)
-
-                time.sleep(self.delay)
-        except KeyboardInterrupt:
-            logger.info("Crawl durch Benutzer abgebrochen (KeyboardInterrupt). Speichere Fortschritt...")
-        except Exception as e:
-            logger.error(f"Unerwarteter Fehler während des Crawls: {e}")
 
-        logger.info(f"Crawl abgeschlossen! {len(self.visited)} Seiten gecrawlt.")
-        return self.data
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Für Parquet wird pyarrow benötigt (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
 
-    def save_to_json(self):
+
+def iter_crawled_batches(db_path, host=None, statuses=None, since=None, until=None, batch_size=5000):
+    """Liefert crawled-Zeilen als Listen von Dicts (EXPORT_FIELDS), gefiltert nach Host, Status und Datum.
+
+    Gelesen wird per Keyset (id > letzte id) in kurzen Abfragen: konstanter Speicher, und ein
+    laufender Crawl wird nicht durch eine lange Lesetransaktion blockiert.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        fields, source = crawled_columns(conn)
+        conditions, params = ["c.id > ?"], []
+        if host:
+            # Host exakt: nur Schema://host/... bzw. Schema://host
+            pattern = host.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append(
+                "(c.url LIKE ? ESCAPE '\\' OR c.url LIKE ? ESCAPE '\\' OR c.url IN (?, ?))"
+            )
+            params += [f"http://{pattern}/%", f"https://{pattern}/%", f"http://{host.lower()}", f"https://{host.lower()}"]
+        if statuses:
+            conditions.append(f"{fields['status_code']} IN ({', '.join('?' * len(statuses))})")
+            params += list(statuses)
+        if since:
+            conditions.append("c.crawled_at >= ?")
+            params.append(since)
+        if until:
+            # bis einschließlich des angegebenen Tages bzw. Zeitpunkts
+            if len(until) == 10:
+                conditions.append("c.crawled_at < date(?, '+1 day')")
+            else:
+                conditions.append("c.crawled_at <= ?")
+            params.append(until)
+        query = (
+            f"SELECT {', '.join(fields[name] for name in EXPORT_FIELDS)} FROM {source} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY c.id LIMIT ?"
+        )
+        last_id = 0
+        while True:
+            rows = conn.execute(query, [last_id] + params + [batch_size]).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            batch = []
+            for row in rows:
+                item = dict(zip(EXPORT_FIELDS, row))
+                item["headings"] = _text_list(item["headings"])
+                item["paragraphs"] = _text_list(item["paragraphs"])
+                batch.append(item)
+            yield batch
+    finally:
+        conn.close()
+
+
+def write_export(batches, path, fmt="jsonl"):
+    """Schreibt Zeilen-Batches als JSONL, CSV (Listen als JSON-Text) oder Parquet; "-" = stdout. Liefert die Zeilenzahl."""
+    count = 0
+    if fmt == "parquet":
+        pa, pq = _require_pyarrow()
+        schema = pa.schema([
+            ("id", pa.int64()), ("url", pa.string()), ("title", pa.string()), ("description", pa.string()),
+            ("headings", pa.list_(pa.string())), ("paragraphs", pa.list_(pa.string())),
+            ("link_count", pa.int64()), ("status_code", pa.int64()), ("crawled_at", pa.string()),
+        ])
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in batches:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+        return count
+    stream = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+    try:
+        if fmt == "csv":
+            writer = csv.writer(stream)
+            writer.writerow(EXPORT_FIELDS)
+            for batch in batches:
+                for item in batch:
+                    item["headings"] = json.dumps(item["headings"], ensure_ascii=False)
+                    item["paragraphs"] = json.dumps(item["paragraphs"], ensure_ascii=False)
+                writer.writerows([item[name] for name in EXPORT_FIELDS] for item in batch)
+                count += len(batch)
+        else:
+            for batch in batches:
+                stream.write("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in batch))
+                count += len(batch)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return count
+
+
+def export_crawled(db_path, path, fmt=None, host=None, statuses=None, since=None, until=None, batch_size=5000):
+    """Exportiert die crawled-Tabelle gestreamt; Format aus der Dateiendung, sonst JSONL."""
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lstrip(".").lower()
+        fmt = ext if ext in EXPORT_FORMATS else "jsonl"
+    start = time.perf_counter()
+    rows = write_export(iter_crawled_batches(db_path, host, statuses, since, until, batch_size), path, fmt)
+    seconds = time.perf_counter() - start
+    return {
+        "path": path,
+        "format": fmt,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_minute": int(rows / seconds * 60) if seconds else rows,
+    }
+
+
+# ----------------- Kompaktierung -----------------
+
+COMPACT_MEMORY_MB = 256
+_JSON_SKIP_RE = re.compile(r"[\s,]*")
+_DEDUPE_RECORD = 24  # 16 Byte Fingerabdruck der kanonischen URL + 8 Byte laufende Nummer
+_SEQ_SIZE = 8
+
+
+def iter_json_items(path, chunk_size=1 << 20):
+    """Einträge einer JSON-Array- oder JSONL-Datei nacheinander, ohne die Datei komplett zu laden."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf = f.read(chunk_size)
+        pos = _JSON_SKIP_RE.match(buf).end()
+        if not buf[pos:pos + 1] == "[":
+            # JSONL: ein Objekt pro Zeile
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+        pos += 1
+        eof = False
+        while True:
+            pos = _JSON_SKIP_RE.match(buf, pos).end()
+            if pos == len(buf) or not eof and len(buf) - pos < 64:
+                if eof:
+                    return
+                more = f.read(chunk_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                if end == len(buf) and not eof:
+                    raise ValueError("Eintrag reicht evtl. über das Pufferende")
+            except ValueError:
+                if eof:
+                    raise
+                # Eintrag länger als der Puffer: mindestens so viel nachladen, wie schon da ist
+                more = f.read(max(chunk_size, len(buf) - pos))
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield item
+            pos = end
+
+
+def _read_seqs(path, chunk_size=4096):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size * _SEQ_SIZE)
+            if not chunk:
+                return
+            values = array("q", chunk)
+            if sys.byteorder == "big":
+                values.byteswap()
+            yield from values
+
+
+def dedupe_json_file(path, normalizer, output=None, memory_mb=COMPACT_MEMORY_MB, tmp_dir=None):
+    """
+    Entfernt doppelte URLs (nach normalizer) aus einer JSON-/JSONL-Datei mit begrenztem Speicher.
+    Der erste Eintrag je URL bleibt in ursprünglicher Reihenfolge erhalten, Einträge ohne URL entfallen.
+    """
+    import tempfile
+
+    start = time.perf_counter()
+    output = output or path
+    bytes_before = os.path.getsize(path)
+    # grob 100 Byte pro Fingerabdruck im Set, Einträge mindestens 64 Byte groß
+    partitions = max(1, math.ceil(bytes_before / 64 * 100 / (memory_mb * 1024 * 1024)))
+    stats = {"items": 0, "kept": 0, "duplicates": 0, "without_url": 0}
+    with tempfile.TemporaryDirectory(prefix="compact-", dir=tmp_dir or os.path.dirname(os.path.abspath(output))) as tmp:
+        # 1. Durchlauf: (Fingerabdruck, Nummer) nach Hash auf Partitionsdateien verteilen
+        part_paths = [os.path.join(tmp, f"part-{i}") for i in range(partitions)]
+        part_files = [open(p, "wb", buffering=1 << 16) for p in part_paths]
         try:
-            # Bestehende Datei laden (falls vorhanden)
-            existing_data = []
-            if os.path.exists(self.json_file):
-                with open(self.json_file, "r", encoding="utf-8") as f:
-                    try:
-                        existing_data = json.load(f)
-                    except json.JSONDecodeError:
-                        existing_data = []
-            # normalize urls in existing and current data, avoid duplicates
-            urls_in_existing = {self.normalize_url(item.get("url", "")) for item in existing_data}
-            new_items = []
-            for item in self.data:
-                url = item.get("url")
+            for seq, item in enumerate(iter_json_items(path)):
+                stats["items"] += 1
+                url = item.get("url") if isinstance(item, dict) else None
                 if not url:
+                    stats["without_url"] += 1
                     continue
-                norm = self.normalize_url(url)
-                if norm in urls_in_existing:
+                digest = hashlib.blake2b(normalizer(url).encode("utf-8"), digest_size=16).digest()
+                part_files[int.from_bytes(digest[:4], "little") % partitions].write(
+                    digest + seq.to_bytes(_SEQ_SIZE, "little")
+                )
+        finally:
+            for f in part_files:
+                f.close()
+        # 2. Jede Partition passt in den Speicher: erste Nummer je Fingerabdruck behalten
+        keep_paths = []
+        for part_path in part_paths:
+            seen = set()
+            keep = array("q")
+            with open(part_path, "rb") as f:
+                data = f.read()
+            os.remove(part_path)
+            for offset in range(0, len(data), _DEDUPE_RECORD):
+                digest = data[offset:offset + 16]
+                if digest not in seen:
+                    seen.add(digest)
+                    keep.append(int.from_bytes(data[offset + 16:offset + _DEDUPE_RECORD], "little"))
+            if sys.byteorder == "big":
+                keep.byteswap()
+            keep_paths.append(part_path + ".keep")
+            with open(keep_paths[-1], "wb") as f:
+                keep.tofile(f)
+        # 3. Durchlauf: behaltene Nummern (je Partition aufsteigend) zusammenführen und Einträge schreiben
+        kept = heapq.merge(*(_read_seqs(p) for p in keep_paths))
+        next_seq = next(kept, None)
+        jsonl = os.path.splitext(output)[1].lower() in (".jsonl", ".ndjson")
+        tmp_output = os.path.join(tmp, "output")
+        with open(tmp_output, "w", encoding="utf-8") as out:
+            if not jsonl:
+                out.write("[")
+            for seq, item in enumerate(iter_json_items(path)):
+                if seq != next_seq:
                     continue
-                urls_in_existing.add(norm)
-                new_items.append(item)
-            all_data = existing_data + new_items
+                next_seq = next(kept, None)
+                if jsonl:
+                    out.write(json.dumps(item, ensure_ascii=False) + "\n")
+                else:
+                    # gleiches Layout wie json.dump(..., indent=2)
+                    text = json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                    out.write(("\n  " if not stats["kept"] else ",\n  ") + text)
+                stats["kept"] += 1
+                if next_seq is None:
+                    break
+            if not jsonl:
+                out.write("\n]" if stats["kept"] else "]")
+        os.replace(tmp_output, output)
+    stats["duplicates"] = stats["items"] - stats["without_url"] - stats["kept"]
+    bytes_after = os.path.getsize(output)
+    stats.update(
+        bytes_before=bytes_before,
+        bytes_after=bytes_after,
+        reclaimed_bytes=bytes_before - bytes_after,
+        partitions=partitions,
+        seconds=round(time.perf_counter() - start, 3),
+    )
+    return stats
 
-            with open(self.json_file, "w", encoding="utf-8") as f:
-                json.dump(all_data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Daten gespeichert in {self.json_file} (gesamt {len(all_data)} Einträge)")
-        except Exception as e:
-            logger.error(f"Fehler beim Speichern: {e}")
 
-    def get_summary(self):
-        return {
-            "total_pages": len(self.visited),
-            "total_items": len(self.data),
-            "domain": self.domain,
-            "start_url": self.start_url,
-        }
+def _django_results_deleted(conn, rows):
+    """Wie results_deleted() und UserDataVersion.bump("results") der Django-App, in derselben Transaktion.
+
+    rows sind (user_id, url, status_code) der gelöschten Zeilen; die Zählerschlüssel entsprechen stat_keys().
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "crawler_app_crawlstat" in tables:
+        delta = Counter()
+        for user_id, url, status_code in rows:
+            host = (urlsplit(url or "").hostname or "")[:255]
+            for dimension, key in (("total", ""), ("status", str(status_code)), ("host", host)):
+                delta[(user_id, dimension, key)] += 1
+        conn.executemany(
+            'UPDATE crawler_app_crawlstat SET count = count - ? WHERE user_id = ? AND dimension = ? AND "key" = ?',
+            [(count, user_id, dimension, key) for (user_id, dimension, key), count in delta.items()],
+        )
+    if "crawler_app_userdataversion" in tables:
+        # Format wie Djangos SQLite-Backend (UTC, USE_TZ)
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+        conn.executemany(
+            "INSERT INTO crawler_app_userdataversion (user_id, results_version, results_changed_at, logs_version) "
+            "VALUES (?, 1, ?, 0) ON CONFLICT(user_id) DO UPDATE SET "
+            "results_version = results_version + 1, results_changed_at = excluded.results_changed_at",
+            [(user_id, now) for user_id in sorted({row[0] for row in rows})],
+        )
+
+
+def _db_bytes(conn):
+    return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def compact_crawled_table(db_path, normalizer, vacuum_pages=2000, analysis_limit=1000, full_vacuum=False):
+    """
+    Entfernt Zeilen in crawled, deren URLs kanonisch gleich sind (die zuletzt gecrawlte bleibt unverändert),
+    gibt den Platz frei und aktualisiert die Statistiken.
+
+    Mit auto_vacuum=INCREMENTAL wird der Platz in Schritten von vacuum_pages Seiten zurückgegeben; andere
+    Datenbanken werden dafür einmalig per VACUUM umgestellt. Inkrementell gehen nur ganz leere Seiten zurück;
+    teilweise geleerte Seiten verdichtet erst full_vacuum. ANALYZE läuft nur über crawled und liest höchstens
+    analysis_limit Zeilen je Index.
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
 
+    def canonical(url):
+        try:
+            return normalizer(url) if url else url
+        except Exception:
+            return url
+
+    conn.create_function("canonical_url", 1, canonical, deterministic=True)
+    stats = {"rows": 0, "duplicates": 0}
+    try:
+        stats["bytes_before"] = _db_bytes(conn)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(crawled)")}
+        if columns:
+            # Die Django-Tabelle gehört pro Benutzer: dort nur innerhalb desselben Benutzers zusammenfassen
+            scope = "user_id, " if "user_id" in columns else ""
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS temp.crawled_canon")
+                conn.execute(
+                    f"CREATE TEMP TABLE crawled_canon AS SELECT id, "
+                    f"ROW_NUMBER() OVER (PARTITION BY {scope}canon ORDER BY crawled_at DESC, id DESC) AS rank "
+                    f"FROM (SELECT id, {scope}url, crawled_at, canonical_url(url) AS canon FROM crawled)"
+                )
+                stats["rows"] = conn.execute("SELECT COUNT(*) FROM crawled_canon").fetchone()[0]
+                deleted = []
+                if scope:
+                    # für Dashboard-Zähler und API-Versionen merken, bevor die Zeilen verschwinden
+                    deleted = conn.execute(
+                        "SELECT c.user_id, c.url, c.status_code FROM crawled c "
+                        "JOIN temp.crawled_canon k ON k.id = c.id WHERE k.rank > 1"
+                    ).fetchall()
+                stats["duplicates"] = conn.execute(
+                    "DELETE FROM crawled WHERE id IN (SELECT id FROM temp.crawled_canon WHERE rank > 1)"
+                ).rowcount
+                conn.execute("DROP TABLE temp.crawled_canon")
+                if deleted:
+                    _django_results_deleted(conn, deleted)
+        stats["freed_pages"] = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2 and not full_vacuum:
+            stats["vacuum"] = "incremental"
+            steps = 0
+            free = stats["freed_pages"]
+            while free:
+                # jeder Schritt ist eine eigene kurze Transaktion; executescript, weil execute() nur eine Seite
+                # pro Aufruf freigibt
+                conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+                steps += 1
+                free, previous = conn.execute("PRAGMA freelist_count").fetchone()[0], free
+                if free >= previous:
+                    break
+            stats["vacuum_steps"] = steps
+        else:
+            # einmalige Umstellung, danach genügen inkrementelle Schritte
+            stats["vacuum"] = "full"
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        if columns:
+            conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+            conn.execute("ANALYZE crawled")
+            conn.commit()
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        stats["bytes_after"] = _db_bytes(conn)
+    finally:
+        conn.close()
+    stats["reclaimed_bytes"] = stats["bytes_before"] - stats["bytes_after"]
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
 
 
-def clean_json_file(json_file, normalizer):
+def clean_json_file(json_file, normalizer, memory_mb=COMPACT_MEMORY_MB):
     if not os.path.exists(json_file):
         print(f"Datei {json_file} nicht gefunden.")
         return
     try:
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        seen = set()
-        deduped = []
-        for item in data:
-            url = item.get("url")
-            if not url:
-                continue
-            norm = normalizer(url)
-            if norm in seen:
-                continue
-            seen.add(norm)
-            deduped.append(item)
-        with open(json_file, "w", encoding="utf-8") as f:
-            json.dump(deduped, f, indent=2, ensure_ascii=False)
-        print(f"{len(deduped)} eindeutige Einträge in {json_file} gespeichert.")
+        stats = dedupe_json_file(json_file, normalizer, memory_mb=memory_mb)
+        print(
+            f"{stats['kept']} eindeutige Einträge in {json_file} gespeichert "
+            f"({stats['duplicates']} Duplikate, {stats['reclaimed_bytes']} Bytes frei, {stats['seconds']} s)."
+        )
     except Exception as e:
         print(f"Fehler beim Bereinigen: {e}")
 
+
 def main():
     parser = argparse.ArgumentParser(description="Einfacher Webcrawler")
     parser.add_argument("--start-url", default="https://wikipedia.org", help="Start-URL zum Crawlen")
@@ -359,30 +4048,264 @@ def main():
     parser.add_argument("--db-file", default="crawled_data.db", help="Pfad zur SQLite DB-Datei")
     parser.add_argument("--no-save", action="store_true", help="Speichert die Ergebnisse nicht in der JSON-Datei")
     parser.add_argument("--clean-json", action="store_true", help="Bereinigt die JSON-Datei und beendet das Programm")
+    parser.add_argument("--compact", action="store_true", help="Duplikate (kanonische URL) aus --json-file und der crawled-Tabelle in --db-file entfernen, Platz freigeben und beenden")
+    parser.add_argument("--compact-full-vacuum", action="store_true", help="Bei --compact die DB per VACUUM komplett neu schreiben (verdichtet auch teilweise geleerte Seiten, sperrt länger)")
+    parser.add_argument("--compact-memory", type=int, default=COMPACT_MEMORY_MB, metavar="MB", help="Speicherbudget für --compact/--clean-json; größere Dateien werden über Partitionsdateien dedupliziert")
+    parser.add_argument("--strip-param", action="append", default=[], metavar="NAME", help="Zusätzlicher Query-Parameter, der bei der URL-Normalisierung entfernt wird (Präfix mit *, mehrfach möglich)")
+    parser.add_argument("--keep-tracking-params", action="store_true", help="Standardliste der Tracking-/Session-Parameter nicht entfernen")
+    parser.add_argument("--keep-query-order", action="store_true", help="Reihenfolge der Query-Parameter nicht sortieren")
+    parser.add_argument("--max-page-bytes", type=int, default=5_000_000, help="Maximale Bytes pro Seite (größere Antworten werden verworfen/abgeschnitten, 0 = unbegrenzt)")
+    parser.add_argument("--no-skip-binary", action="store_true", help="URLs mit Binär-Endungen (.pdf, .jpg, ...) nicht vorab überspringen")
+    parser.add_argument("--max-depth", type=int, help="Maximale Link-Tiefe ab der Start-URL")
+    parser.add_argument("--path-budget", action="append", default=[], metavar="PRÄFIX=N", help="Maximal N Seiten unterhalb eines Pfad-Präfixes (mehrfach möglich)")
+    parser.add_argument("--breadth-first", action="store_true", help="Reine Breitensuche: Inlinks nicht gewichten (Standard: häufig verlinkte Seiten zuerst)")
+    parser.add_argument("--path-priority", action="append", default=[], metavar="REGEX=BONUS", help="Score-Bonus für URLs, die auf REGEX passen (mehrfach möglich, negativ = später)")
+    parser.add_argument("--no-trap-detection", action="store_true", help="Crawler-Fallen (Kalender, Facetten, Session-IDs) nicht erkennen")
+    parser.add_argument("--max-urls-per-template", type=int, default=1000, metavar="N", help="Höchstens N URLs pro URL-Vorlage (Zahlen/IDs im Pfad zusammengefasst), danach wird die Vorlage gesperrt (0 = unbegrenzt)")
+    parser.add_argument("--max-repeated-segments", type=int, default=2, metavar="N", help="URLs verwerfen, in deren Pfad ein Segment öfter als N-mal vorkommt (0 = aus)")
+    parser.add_argument("--max-query-variants", type=int, default=64, metavar="N", help="Höchstens N verschiedene Query-Parameterkombinationen pro Pfad (0 = unbegrenzt)")
+    parser.add_argument("--sitemaps", action="store_true", help="Queue vorab aus Sitemaps (robots.txt bzw. /sitemap.xml) füllen")
+    parser.add_argument("--max-sitemap-urls", type=int, default=100_000, help="Maximale Anzahl URLs, die aus Sitemaps übernommen werden")
+    parser.add_argument("--pipeline", action="store_true", help="Crawl als Stufen fetch → decode → parse → enqueue → persist mit begrenzten Queues (Auslastung pro Stufe in der Zusammenfassung)")
+    parser.add_argument("--stage-workers", action="append", default=[], metavar="STUFE=N", help="Worker-Threads einer Pipeline-Stufe (fetch, decode, parse, persist; fetch setzt auch --max-concurrency; mehrfach möglich)")
+    parser.add_argument("--stage-queue-size", type=int, default=64, metavar="N", help="Plätze in jeder Pipeline-Queue (begrenzt Speicher, volle Queues bremsen die Stufe davor)")
+    parser.add_argument("--max-concurrency", type=int, default=1, help="Maximale parallele Requests pro Host (adaptiv per AIMD geregelt)")
+    parser.add_argument("--max-retries", type=int, default=3, help="Wiederholungen bei 429/5xx/Timeouts (exponentieller Backoff mit Jitter)")
+    parser.add_argument("--circuit-cooldown", type=float, default=30.0, help="Pause in Sekunden, wenn ein Host dauerhaft Fehler liefert (verdoppelt sich je Auslösung)")
+    parser.add_argument("--http-cache", metavar="DIR", help="Antworten in DIR zwischenspeichern (RFC-7234-Frische, Revalidierung per ETag/Last-Modified)")
+    parser.add_argument("--http-cache-size", type=int, default=512, metavar="MB", help="Maximale Größe des HTTP-Caches in MB (LRU-Verdrängung, 0 = unbegrenzt)")
+    parser.add_argument("--offline", action="store_true", help="Nur aus dem HTTP-Cache lesen (auch veraltete Einträge), keine Netzwerk-Requests")
+    parser.add_argument("--discover-only", action="store_true", help="Nur Link-Graph erfassen (URL, Status, Outlinks) mit schnellem href-Tokenizer, ohne Textextraktion")
+    parser.add_argument("--extract-profile", default="default", help="Extraktionsprofil: eingebauter Name (default, head) oder JSON-Datei mit {\"fields\": {...}}")
+    parser.add_argument("--term-index", action="store_true", help="TF-IDF-Index für ähnliche Seiten beim Crawlen in --db-file pflegen (mit --save-to-db)")
+    parser.add_argument("--related", metavar="URL", help="Ähnliche Seiten zu URL aus dem Term-Index in --db-file ausgeben (Index wird vorher aktualisiert) und beenden")
+    parser.add_argument("--top-k", type=int, default=10, help="Anzahl ähnlicher Seiten für --related")
+    parser.add_argument("--export", metavar="DATEI", help="crawled-Tabelle aus --db-file gestreamt exportieren (- = stdout) und beenden")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, help="Exportformat (Standard: aus der Dateiendung, sonst jsonl; parquet benötigt pyarrow)")
+    parser.add_argument("--export-host", metavar="HOST", help="Nur Seiten dieses Hosts exportieren")
+    parser.add_argument("--export-status", type=int, action="append", default=[], metavar="CODE", help="Nur Seiten mit diesem HTTP-Status exportieren (mehrfach möglich)")
+    parser.add_argument("--export-since", metavar="DATUM", help="Nur Seiten ab diesem Datum (YYYY-MM-DD oder ISO-Zeitpunkt)")
+    parser.add_argument("--export-until", metavar="DATUM", help="Nur Seiten bis einschließlich diesem Datum (YYYY-MM-DD oder ISO-Zeitpunkt)")
+    parser.add_argument("--recrawl", action="store_true", help="Inkrementeller Recrawl: nur laut Fetch-Historie in --db-file fällige Seiten abrufen (Budget: --max-pages)")
+    parser.add_argument("--recrawl-plan", action="store_true", help="Fällige Seiten mit Änderungswahrscheinlichkeit ausgeben und beenden")
+    parser.add_argument("--recrawl-min-hours", type=float, default=1.0, help="Seiten frühestens nach so vielen Stunden erneut abrufen")
+    parser.add_argument("--recrawl-max-days", type=float, default=30.0, help="Seiten spätestens nach so vielen Tagen erneut abrufen")
+    parser.add_argument("--rank", action="store_true", help="PageRank/HITS aus dem Link-Graphen in --db-file berechnen, Scores in crawled schreiben und beenden")
+    parser.add_argument("--rank-into", action="append", default=[], metavar="DB", help="Scores stattdessen in die crawled-Tabelle dieser DB schreiben (mehrfach möglich, z. B. search_engine_js/db.sqlite3)")
+    parser.add_argument("--graph-file", metavar="NPZ", help="Link-Graph zusätzlich als CSR-Arrays (.npz) speichern")
+    parser.add_argument("--damping", type=float, default=0.85, help="Dämpfungsfaktor für PageRank")
+    parser.add_argument("--workers", type=int, default=0, help="Anzahl Worker (URLs nach Host-Hash partitioniert); 0 = ein Prozess")
+    parser.add_argument("--allow-host", action="append", default=[], metavar="HOST", help="Weiterer Host, der im Cluster-Modus gecrawlt wird (mehrfach möglich)")
+    parser.add_argument("--cluster-listen", metavar="HOST:PORT", help="Nur den Koordinator starten und auf --workers entfernte Worker warten")
+    parser.add_argument("--cluster-join", metavar="HOST:PORT", help="Als Worker mit --worker-id einem Koordinator beitreten")
+    parser.add_argument("--worker-id", type=int, default=0, help="Partition dieses Workers (0 .. workers-1)")
+    parser.add_argument("--cluster-key", default=os.environ.get("WEBCRAWLER_CLUSTER_KEY", "webcrawler"), help="Gemeinsamer Schlüssel für Koordinator und Worker")
+    parser.add_argument("--profile", action="store_true", help="Profiliert den Crawl mit cProfile (pstats + Zeit pro Stufe)")
+    parser.add_argument("--trace-memory", action="store_true", help="Verfolgt Allokationen mit tracemalloc (Top-N-Report + Bytes pro Stufe)")
+    parser.add_argument("--profile-sample", type=float, metavar="HZ", help="Günstiges Sampling-Profiling mit HZ Samples pro Sekunde (für lange Läufe)")
+    parser.add_argument("--profile-dir", default="profile", help="Verzeichnis für Profiling-Reports")
+    parser.add_argument("--profile-top", type=int, default=25, help="Anzahl Einträge in Allokations- und Sampling-Reports")
     args = parser.parse_args()
+    if args.offline and not args.http_cache:
+        parser.error("--offline benötigt --http-cache")
+    if args.recrawl and (args.workers or args.cluster_join):
+        parser.error("--recrawl ist im Cluster-Modus nicht verfügbar")
+    if (args.pipeline or args.stage_workers) and (args.workers or args.cluster_join or args.cluster_listen):
+        parser.error("--pipeline ist im Cluster-Modus nicht verfügbar")
+    stage_workers = None
+    if args.pipeline or args.stage_workers:
+        stage_workers = {}
+        for item in args.stage_workers:
+            stage, _, count = item.partition("=")
+            if stage not in PIPELINE_STAGES or stage == "enqueue" or not count.isdigit() or int(count) < 1:
+                parser.error(f"Ungültige Angabe für --stage-workers: {item} (Stufen: fetch, decode, parse, persist)")
+            stage_workers[stage] = int(count)
+        if "fetch" in stage_workers:
+            args.max_concurrency = stage_workers["fetch"]
+    try:
+        extraction_profile = ExtractionProfile.load(args.extract_profile)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"Ungültiges Extraktionsprofil {args.extract_profile}: {e}")
+
+    path_budgets = {}
+    for item in args.path_budget:
+        prefix, sep, limit = item.rpartition("=")
+        if not sep or not prefix or not limit.isdigit():
+            parser.error(f"Ungültige Angabe für --path-budget: {item} (erwartet PRÄFIX=N, z. B. /blog=100)")
+        path_budgets[prefix.rstrip("/") or "/"] = int(limit)
+    scorers = list(BREADTH_FIRST_SCORERS if args.breadth_first else DEFAULT_SCORERS)
+    if args.path_priority:
+        patterns = {}
+        for item in args.path_priority:
+            pattern, sep, bonus = item.rpartition("=")
+            try:
+                if not sep or not pattern:
+                    raise ValueError("erwartet REGEX=BONUS")
+                patterns[pattern] = float(bonus)
+                re.compile(pattern)
+            except (ValueError, re.error) as e:
+                parser.error(f"Ungültige Angabe für --path-priority: {item} ({e})")
+        scorers.append((path_pattern_scorer(patterns), 1.0))
+
+    strip_params = list(args.strip_param)
+    if not args.keep_tracking_params:
+        strip_params += DEFAULT_STRIP_PARAMS
+    canonicalizer = URLCanonicalizer(strip_params=strip_params, sort_query=not args.keep_query_order)
+
+    if args.rank:
+        summary = rank_link_graph(args.db_file, args.graph_file, args.rank_into or None, args.damping)
+        print("\n=== Ranking ===")
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+        return
+
+    if args.related:
+        index = TermIndex(args.db_file)
+        stats = index.update()
+        related = index.related(args.related, args.top_k)
+        if related is None:
+            related = index.related(canonicalizer.normalize(args.related), args.top_k)
+        if related is None:
+            print(f"{args.related} ist nicht in der crawled-Tabelle von {args.db_file}")
+            return
+        print(f"\n=== Ähnliche Seiten zu {args.related} (Index: {stats}) ===")
+        for page in related:
+            print(f"{page.score:.4f}  {page.url}  {page.title}")
+        return
+
+    if args.export:
+        try:
+            summary = export_crawled(
+                args.db_file, args.export, args.export_format, args.export_host,
+                args.export_status, args.export_since, args.export_until,
+            )
+        except RuntimeError as e:
+            parser.error(str(e))
+        if args.export != "-":
+            print("\n=== Export ===")
+            for key, value in summary.items():
+                print(f"{key}: {value}")
+        return
+
+    if args.recrawl or args.recrawl_plan:
+        planner = RecrawlPlanner(
+            args.db_file, min_interval=args.recrawl_min_hours * 3600, max_interval=args.recrawl_max_days * 86400
+        )
+        due = planner.due(args.max_pages, host=canonicalizer.parse(args.start_url).netloc)
+        if args.recrawl_plan:
+            print(f"\n=== Recrawl-Plan ({len(due)} fällig) ===")
+            for entry in due:
+                print(f"{entry.probability:.3f}  ~{entry.interval / 86400:.1f} Tage  {entry.url}")
+            return
+        logger.info(f"Recrawl: {len(due)} fällige Seiten")
 
     if args.clean_json:
         # Nur die Datei bereinigen und beenden
-        # Wir nutzen die Normalisierungsmethode der Klasse
-        clean_json_file(args.json_file, WebCrawler.normalize_url)
+        # Wir nutzen dieselbe Normalisierung wie der Crawler
+        clean_json_file(args.json_file, canonicalizer.normalize, args.compact_memory)
         return
 
-    crawler = WebCrawler(
-        start_url=args.start_url,
+    if args.compact:
+        for label, path, compact in (
+            ("JSON", args.json_file, lambda p: dedupe_json_file(p, canonicalizer.normalize, memory_mb=args.compact_memory)),
+            ("DB", args.db_file, lambda p: compact_crawled_table(p, canonicalizer.normalize, full_vacuum=args.compact_full_vacuum)),
+        ):
+            if not os.path.exists(path):
+                print(f"{path} nicht gefunden, übersprungen.")
+                continue
+            summary = compact(path)
+            print(f"\n=== Kompaktierung {label}: {path} ===")
+            for key, value in summary.items():
+                print(f"{key}: {value}")
+        return
+
+    crawler_kwargs = dict(
         max_pages=args.max_pages,
         delay=args.delay,
         json_file=args.json_file,
         save_to_db=args.save_to_db,
         db_path=args.db_file,
+        strip_params=strip_params,
+        sort_query=not args.keep_query_order,
+        max_page_bytes=args.max_page_bytes,
+        skip_binary_extensions=not args.no_skip_binary,
+        scorers=scorers,
+        max_depth=args.max_depth,
+        path_budgets=path_budgets,
+        use_sitemaps=args.sitemaps,
+        max_sitemap_urls=args.max_sitemap_urls,
+        max_concurrency=args.max_concurrency,
+        max_retries=args.max_retries,
+        circuit_cooldown=args.circuit_cooldown,
+        http_cache_dir=args.http_cache,
+        http_cache_max_bytes=args.http_cache_size * 1024 * 1024,
+        offline=args.offline,
+        discovery_only=args.discover_only,
+        extraction_profile=extraction_profile,
+        term_index=args.term_index,
+        pipeline_workers=stage_workers,
+        pipeline_queue_size=args.stage_queue_size,
+        detect_traps=not args.no_trap_detection,
+        trap_limits=dict(
+            max_per_template=args.max_urls_per_template,
+            max_repeated_segments=args.max_repeated_segments,
+            max_query_variants=args.max_query_variants,
+        ),
+    )
+    if args.recrawl:
+        # die Historie liegt in der DB, daher immer dorthin schreiben
+        crawler_kwargs["save_to_db"] = True
+
+    if args.workers or args.cluster_join:
+        # Cluster-Modus: Ergebnisse landen in der gemeinsamen crawled-Tabelle, nicht in JSON
+        crawler_kwargs["save_to_db"] = True
+        authkey = args.cluster_key.encode("utf-8")
+        start = canonicalizer.parse(args.start_url)
+        seeds = [start.url] + [f"{start.scheme}://{host}/" for host in args.allow_host]
+        scope_hosts = {canonicalizer.parse(url).netloc for url in seeds}
+        if args.cluster_join:
+            summary = ClusterWorker(
+                args.worker_id, parse_address(args.cluster_join), authkey, scope_hosts, crawler_kwargs
+            ).run()
+        elif args.cluster_listen:
+            coordinator = ClusterCoordinator(
+                args.workers, seeds, args.max_pages, address=parse_address(args.cluster_listen), authkey=authkey
+            )
+            logger.info(f"Koordinator wartet auf {args.workers} Worker an {coordinator.address}")
+            summary = coordinator.serve()
+        else:
+            summary = run_local_cluster(args.workers, seeds, args.max_pages, scope_hosts, crawler_kwargs, authkey)
+        print("\n=== Cluster-Zusammenfassung ===")
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+        return
+
+    crawler = WebCrawler(start_url=args.start_url, recrawl_urls=due if args.recrawl else None, **crawler_kwargs)
+    profiler = CrawlProfiler(
+        output_dir=args.profile_dir,
+        profile=args.profile,
+        trace_memory=args.trace_memory,
+        sample_hz=args.profile_sample,
+        top_n=args.profile_top,
     )
-    data = crawler.crawl()
+    if profiler.enabled:
+        data = profiler.run(crawler)
+    else:
+        data = crawler.crawl()
     if not args.no_save:
         crawler.save_to_json()
 
     print("\n=== Crawl-Zusammenfassung ===")
     summary = crawler.get_summary()
+    pipeline_stats = summary.pop("pipeline")
     for key, value in summary.items():
         print(f"{key}: {value}")
+    if pipeline_stats:
+        print(f"\n=== Pipeline-Auslastung ({pipeline_stats['seconds']} s) ===")
+        print(pipeline_report(pipeline_stats))
+    if args.profile or args.trace_memory:
+        print("\n=== Profil pro Stufe ===")
+        print(profiler.stage_report())
 
 
 if __name__ == "__main__":